@@ -0,0 +1,201 @@
+"""
+Utilidades compartidas por los scripts de benchmarks/: arrancar el servidor
+(gunicorn o uvicorn) en un puerto libre, medir su memoria, hacer peticiones
+HTTP con asyncio, resumir latencias y escribir el informe JSON.
+
+Todos los informes tienen la misma forma, para poder compararlos entre
+commits con benchmarks/compare.py:
+
+    {"meta": {"commit": ..., "python": ..., ...},
+     "results": {"nombre": {"n": ..., "p50_ms": ..., "p95_ms": ..., "p99_ms": ..., "ops_per_s": ...}}}
+"""
+import asyncio
+import json
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+# -------------------------------------------------
+# Latencias e informe
+# -------------------------------------------------
+def summarize(samples_ms, elapsed=None, errors=0):
+    """n, media y percentiles de una lista de latencias en ms; ops/s si se da la duración."""
+    if not samples_ms:
+        return {"n": 0, "errors": errors, "mean_ms": None, "p50_ms": None, "p95_ms": None,
+                "p99_ms": None, "max_ms": None, "ops_per_s": 0}
+    cuts = statistics.quantiles(samples_ms, n=100) if len(samples_ms) > 1 else [samples_ms[0]] * 99
+    total = elapsed if elapsed is not None else sum(samples_ms) / 1000
+    return {
+        "n": len(samples_ms),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "max_ms": round(max(samples_ms), 3),
+        "ops_per_s": round(len(samples_ms) / total, 1) if total else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(benchmark, args, url):
+    return {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": url.split(":", 1)[0],
+        "params": {key: value for key, value in vars(args).items() if key not in ("url", "output")},
+    }
+
+
+def write_report(report, output=None):
+    """Escribe el informe en `output` (o stdout)."""
+    text = json.dumps(report, indent=2)
+    if output and output != "-":
+        with open(output, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+
+def print_results(results):
+    for name, stats in results.items():
+        print(f"   {name:<28} n={stats['n']:<7} p50 {stats['p50_ms']} ms   p95 {stats['p95_ms']} ms   "
+              f"p99 {stats['p99_ms']} ms   {stats['ops_per_s']} ops/s   errores {stats['errors']}")
+
+
+# -------------------------------------------------
+# Servidor
+# -------------------------------------------------
+def server_command(mode, workers, port):
+    if mode == "sync":
+        return ["gunicorn", "wsgi", "--chdir", SRC_DIR, "-w", str(workers), "-b", f"127.0.0.1:{port}"]
+    return ["uvicorn", "asgi:application", "--app-dir", SRC_DIR, "--workers", str(workers),
+            "--port", str(port), "--log-level", "warning", "--no-access-log"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def tree_rss_mb(pid):
+    """RSS del proceso y todos sus descendientes, en MB (Linux, /proc)."""
+    total_kb, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except FileNotFoundError:
+            continue
+    return total_kb / 1024
+
+
+class Server:
+    def __init__(self, mode, workers, env):
+        self.mode = mode
+        self.workers = workers
+        self.port = free_port()
+        self.process = subprocess.Popen(
+            server_command(mode, workers, self.port), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+        )
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                asyncio.run(request("127.0.0.1", self.port, "/api/hotel/room_types"))
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"El servidor {self.mode} no arrancó en {timeout}s")
+
+    def rss_mb(self):
+        return tree_rss_mb(self.process.pid)
+
+    def stop(self):
+        os.killpg(self.process.pid, signal.SIGTERM)
+        self.process.wait(timeout=30)
+
+
+# -------------------------------------------------
+# Cliente HTTP mínimo (una conexión por petición)
+# -------------------------------------------------
+async def request(host, port, path, slow_seconds=0):
+    """GET con Connection: close. Devuelve el código de estado."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n".encode()
+        writer.write(head)
+        await writer.drain()
+        if slow_seconds:
+            await asyncio.sleep(slow_seconds)
+        writer.write(b"Connection: close\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        return int(response.split(b" ", 2)[1])
+    finally:
+        writer.close()
+
+
+async def http_json(host, port, method, path, payload=None, headers=None):
+    """Petición con cuerpo JSON opcional. Devuelve (código, JSON o None)."""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: close", f"Content-Length: {len(body)}"]
+    if payload is not None:
+        lines.append("Content-Type: application/json")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, content = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"transfer-encoding: chunked" in head.lower():
+        content = _dechunk(content)
+    try:
+        return status, json.loads(content) if content else None
+    except ValueError:
+        return status, None
+
+
+def _dechunk(data):
+    out = b""
+    while data:
+        size, _, rest = data.partition(b"\r\n")
+        length = int(size.split(b";")[0], 16)
+        if length == 0:
+            break
+        out += rest[:length]
+        data = rest[length + 2:]
+    return out
@@ -0,0 +1,83 @@
+"""
+Compara dos informes JSON de micro.py o load.py (por ejemplo, antes y
+después de un cambio) e imprime la variación de cada métrica en %.
+
+    $ python benchmarks/compare.py before.json after.json
+    $ python benchmarks/compare.py before.json after.json --metrics p50_ms,p99_ms --fail-above 10
+
+Las latencias empeoran cuando suben y ops_per_s cuando baja. Con
+--fail-above el script termina con código 1 si alguna métrica empeora más
+de ese porcentaje, para usarlo en CI.
+"""
+import argparse
+import json
+import sys
+
+# Métricas en las que un valor más alto es mejor
+HIGHER_IS_BETTER = {"ops_per_s"}
+DEFAULT_METRICS = "p50_ms,p95_ms,p99_ms,ops_per_s"
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as report:
+        return json.load(report)
+
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def regression(metric, pct):
+    """Porcentaje de empeoramiento (positivo = peor)."""
+    return -pct if metric in HIGHER_IS_BETTER else pct
+
+
+def compare(before, after, metrics):
+    """Filas (caso, métrica, antes, después, % cambio, % empeoramiento) de los casos comunes."""
+    rows = []
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        for metric in metrics:
+            pct = change(old.get(metric), new.get(metric))
+            rows.append((name, metric, old.get(metric), new.get(metric), pct,
+                         None if pct is None else regression(metric, pct)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metrics", default=DEFAULT_METRICS, help="Métricas a comparar, separadas por comas")
+    parser.add_argument("--fail-above", type=float, help="Falla si alguna métrica empeora más de este %%")
+    args = parser.parse_args()
+
+    before, after = load_report(args.before), load_report(args.after)
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')} "
+          f"({before['meta'].get('database')} / {after['meta'].get('database')})")
+
+    worst = None
+    for name, metric, old, new, pct, worse in compare(before, after, args.metrics.split(",")):
+        shown = "n/a" if pct is None else f"{pct:+.1f}%"
+        flag = ""
+        if args.fail_above is not None and worse is not None and worse > args.fail_above:
+            flag = "  <-- regresión"
+        print(f"   {name:<28} {metric:<10} {old!s:>10} -> {new!s:<10} {shown:>8}{flag}")
+        if worse is not None and (worst is None or worse > worst):
+            worst = worse
+
+    missing = set(before["results"]) ^ set(after["results"])
+    if missing:
+        print(f"   casos solo en uno de los informes: {', '.join(sorted(missing))}")
+
+    if args.fail_above is not None and worst is not None and worst > args.fail_above:
+        print(f"Empeoramiento máximo {worst:.1f}% > {args.fail_above}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
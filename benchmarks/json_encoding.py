@@ -0,0 +1,118 @@
+"""
+Coste de serializar listados grandes de reservas y bloqueos de
+disponibilidad, desde los objetos del modelo hasta los bytes de la
+respuesta, con tres variantes:
+
+- legacy: lo que se hacía antes, isoformat() y float() campo a campo en
+  serialize() y después el DefaultJSONProvider de Flask (json estándar);
+- json: serialize() con los valores tal cual y FastJSONProvider sin orjson;
+- orjson: serialize() con los valores tal cual y FastJSONProvider con orjson
+  (api/json_provider.py), que es lo que usa la app si está instalado.
+
+No hace falta base de datos: los objetos se crean en memoria.
+
+    $ python benchmarks/json_encoding.py
+    $ python benchmarks/json_encoding.py --rows 20000 --iterations 20 --output json.json
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from common import print_results, summarize, write_report, git_commit  # noqa: E402
+from api import json_provider  # noqa: E402
+from api.json_provider import FastJSONProvider  # noqa: E402
+from api.models import RoomTypes, Rooms, Availability, Bookings  # noqa: E402
+
+
+def build(rows, seed_value=42):
+    rnd = random.Random(seed_value)
+    now = datetime(2025, 1, 1, 12, 30, 15, 123456)
+    room_types = [RoomTypes(id=i, name=f"Tipo {i}") for i in range(1, 11)]
+    rooms = [Rooms(id=i, room_number=str(100 + i), room_type=room_types[i % 10]) for i in range(1, 301)]
+
+    bookings, blocks = [], []
+    for i in range(1, rows + 1):
+        check_in = date(2025, 1, 1) + timedelta(days=rnd.randrange(730))
+        nights = rnd.randint(1, 14)
+        room = rnd.choice(rooms)
+        bookings.append(Bookings(
+            id=i, user_id=None, room_id=room.id, room=room, room_type_id=room.room_type.id,
+            room_type=room.room_type, check_in=check_in, check_out=check_in + timedelta(days=nights),
+            nights=nights, status="confirmed", price_per_night=Decimal("80.00"),
+            total_price=Decimal("80.00") * nights, payment_status="paid", payment_method="stripe",
+            guest_name=f"Huésped {i}", guest_email=f"guest{i}@example.com", guest_phone="600000000",
+            created_at=now, updated_at=now, notes=None,
+        ))
+        blocks.append(Availability(
+            id=i, start_date=check_in, end_date=check_in + timedelta(days=nights), room_id=room.id, room=room,
+            room_type_id=None, closed_manually=True, maintenance_block=False, reason="Mantenimiento",
+            created_at=now,
+        ))
+    return bookings, blocks
+
+
+def legacy(data):
+    """Las conversiones que serialize() hacía antes en Python."""
+    for key, value in data.items():
+        if isinstance(value, (date, datetime)):
+            data[key] = value.isoformat()
+        elif isinstance(value, Decimal):
+            data[key] = float(value)
+    return data
+
+
+def measure(fn, iterations):
+    fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Elementos de cada listado")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--output", help="Fichero del informe JSON (por defecto solo se imprime el resumen)")
+    args = parser.parse_args()
+
+    bookings, blocks = build(args.rows)
+    app = Flask(__name__)
+    default, fast = DefaultJSONProvider(app), FastJSONProvider(app)
+    orjson = json_provider.orjson
+
+    results = {}
+    with app.app_context():
+        for name, items in (("bookings", bookings), ("availability", blocks)):
+            results[f"{name}.legacy"] = measure(
+                lambda: default.response([legacy(item.serialize()) for item in items]), args.iterations)
+
+            json_provider.orjson = None
+            results[f"{name}.json"] = measure(
+                lambda: fast.response([item.serialize() for item in items]), args.iterations)
+            json_provider.orjson = orjson
+
+            if orjson is not None:
+                results[f"{name}.orjson"] = measure(
+                    lambda: fast.response([item.serialize() for item in items]), args.iterations)
+
+    print(f"{args.rows} elementos por listado, codificador de la app: {json_provider.backend()}")
+    print_results(results)
+    if args.output:
+        meta = {"benchmark": "json_encoding", "commit": git_commit(), "params": vars(args)}
+        write_report({"meta": meta, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Asignación automática de habitaciones (api/assignment.py): tiempo y calidad
+del reparto con miles de reservas, comparando el mejor ajuste (best fit) con
+el primer hueco libre (first fit).
+
+Se generan habitaciones y reservas sintéticas sobre el horizonte del almacén
+de ocupación y se reparten en memoria con `assignment.plan`. Para cada
+estrategia se mide:
+
+- tiempo total y por reserva;
+- reservas que se quedan sin habitación;
+- noches libres sueltas: huecos libres más cortos que --min-stay entre dos
+  estancias, que en la práctica ya no se pueden vender.
+
+Con --db también se mide `assign_window` de punta a punta sobre una base de
+datos SQLite temporal (consulta, bloqueo de habitaciones, carga del almacén
+y UPDATE en bloque).
+
+    $ python benchmarks/room_assignment.py
+    $ python benchmarks/room_assignment.py --rooms 300 --bookings 20000 --days 365 --db --json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from api import assignment  # noqa: E402
+from api.occupancy import night_mask  # noqa: E402
+
+Room = namedtuple("Room", ["id", "room_type_id", "floor", "room_number"])
+Stay = namedtuple("Stay", ["id", "room_type_id", "lo", "hi"])
+
+
+def generate(room_types, rooms, bookings, days, occupancy_rate, seed_value=42):
+    """Habitaciones repartidas entre tipos y estancias de 1-10 noches hasta la ocupación pedida."""
+    rnd = random.Random(seed_value)
+    all_rooms = [Room(i, 1 + i % room_types, 1 + i // 20, str(100 + i)) for i in range(1, rooms + 1)]
+
+    capacity = rooms * days * occupancy_rate
+    stays, nights = [], 0
+    while len(stays) < bookings and nights < capacity:
+        length = min(rnd.choice([1, 1, 2, 2, 3, 3, 4, 5, 7, 10]), days - 1)
+        lo = rnd.randrange(days - length)
+        stays.append(Stay(len(stays) + 1, rnd.randint(1, room_types), lo, lo + length))
+        nights += length
+    return all_rooms, stays
+
+
+def first_fit(stays, rooms_by_type, occupied, days, floor=None):
+    """Referencia: la primera habitación libre del tipo, sin mirar el ajuste."""
+    placed, unplaced = {}, []
+    for stay in sorted(stays, key=lambda s: (s.lo, s.lo - s.hi, s.id)):
+        mask = night_mask(stay.lo, stay.hi)
+        room = next((r for r in rooms_by_type.get(stay.room_type_id, ()) if not occupied[r.id] & mask), None)
+        if room is None:
+            unplaced.append(stay.id)
+            continue
+        occupied[room.id] |= mask
+        placed[stay.id] = room.id
+    return placed, unplaced
+
+
+def orphan_nights(occupied, days, min_stay):
+    """Noches de huecos libres más cortos que `min_stay` entre dos noches ocupadas."""
+    total = 0
+    for bits in occupied.values():
+        run, seen = 0, False
+        for night in range(days):
+            if bits >> night & 1:
+                if seen and 0 < run < min_stay:
+                    total += run
+                run, seen = 0, True
+            else:
+                run += 1
+    return total
+
+
+def run_strategy(strategy, rooms, stays, days, min_stay):
+    rooms_by_type = {}
+    for room in rooms:
+        rooms_by_type.setdefault(room.room_type_id, []).append(room)
+    occupied = {room.id: 0 for room in rooms}
+
+    started = time.perf_counter()
+    placed, unplaced = strategy(stays, rooms_by_type, occupied, days)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 4),
+        "us_per_booking": round(elapsed / max(len(stays), 1) * 1e6, 1),
+        "assigned": len(placed),
+        "unplaced": len(unplaced),
+        "orphan_nights": orphan_nights(occupied, days, min_stay),
+    }
+
+
+def run_db(rooms, stays, days):
+    """assign_window sobre SQLite con las mismas habitaciones y reservas sin asignar."""
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "assign.db")
+    from app import app
+    from api.models import db, RoomTypes, Rooms, Bookings
+    from sqlalchemy import insert
+
+    today, now = date.today(), datetime.utcnow()
+    with app.app_context():
+        app.config["OCCUPANCY_HORIZON_DAYS"] = days
+        db.create_all()
+        room_types = sorted({room.room_type_id for room in rooms})
+        db.session.execute(insert(RoomTypes), [
+            {"id": i, "name": f"Tipo {i}", "capacity": 2, "base_price": 80, "total_rooms": len(rooms),
+             "is_active": True, "created_at": now} for i in room_types
+        ])
+        db.session.execute(insert(Rooms), [
+            {"id": r.id, "room_number": r.room_number, "room_type_id": r.room_type_id, "floor": r.floor,
+             "status": "active", "is_available": True, "created_at": now} for r in rooms
+        ])
+        db.session.execute(insert(Bookings), [
+            {"id": s.id, "room_type_id": s.room_type_id,
+             "check_in": today + timedelta(days=s.lo), "check_out": today + timedelta(days=s.hi),
+             "nights": s.hi - s.lo, "status": "confirmed", "price_per_night": 80,
+             "total_price": 80 * (s.hi - s.lo), "created_at": now} for s in stays
+        ])
+        db.session.commit()
+
+        started = time.perf_counter()
+        result = assignment.assign_window(today, today + timedelta(days=days))
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 4),
+        "assigned": len(result["assigned"]),
+        "unplaced": len(result["unplaced"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--room-types", type=int, default=8)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=180, help="Noches del horizonte")
+    parser.add_argument("--occupancy", type=float, default=0.85, help="Ocupación objetivo (0-1)")
+    parser.add_argument("--min-stay", type=int, default=2, help="Huecos más cortos cuentan como noches sueltas")
+    parser.add_argument("--db", action="store_true", help="Medir también assign_window sobre SQLite")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    rooms, stays = generate(args.room_types, args.rooms, args.bookings, args.days, args.occupancy)
+    report = {
+        "rooms": len(rooms),
+        "bookings": len(stays),
+        "days": args.days,
+        "best_fit": run_strategy(assignment.plan, rooms, stays, args.days, args.min_stay),
+        "first_fit": run_strategy(first_fit, rooms, stays, args.days, args.min_stay),
+    }
+    if args.db:
+        report["assign_window"] = run_db(rooms, stays, args.days)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['bookings']} bookings, {report['rooms']} rooms, {report['days']} nights")
+    for name in ("best_fit", "first_fit"):
+        result = report[name]
+        print(f"   {name:<10} {result['seconds']:>8} s  {result['us_per_booking']:>8} us/booking   "
+              f"assigned {result['assigned']}   unplaced {result['unplaced']}   "
+              f"orphan nights {result['orphan_nights']}")
+    if args.db:
+        result = report["assign_window"]
+        print(f"   assign_window (SQLite) {result['seconds']} s   assigned {result['assigned']}   "
+              f"unplaced {result['unplaced']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""add inventory holds and link payments to them
+
+Revision ID: 2a7c6e0f4b93
+Revises: 7e3a9d51c2f8
+Create Date: 2025-11-13 16:05:44.210377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7c6e0f4b93'
+down_revision = '7e3a9d51c2f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_holds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('room_type_id', sa.Integer(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=True),
+    sa.Column('check_in', sa.Date(), nullable=False),
+    sa.Column('check_out', sa.Date(), nullable=False),
+    sa.Column('total_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('guest_name', sa.String(length=150), nullable=True),
+    sa.Column('guest_email', sa.String(length=120), nullable=True),
+    sa.Column('guest_phone', sa.String(length=50), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.id'], ),
+    sa.ForeignKeyConstraint(['room_type_id'], ['room_types.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('inventory_holds', schema=None) as batch_op:
+        batch_op.create_index('ix_inventory_holds_status_expires_at', ['status', 'expires_at'], unique=False)
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hold_id', sa.Integer(), nullable=True))
+        batch_op.alter_column('booking_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+        batch_op.create_foreign_key('fk_payments_hold_id', 'inventory_holds', ['hold_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_payments_hold_id', type_='foreignkey')
+        batch_op.alter_column('booking_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.drop_column('hold_id')
+
+    with op.batch_alter_table('inventory_holds', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_holds_status_expires_at')
+
+    op.drop_table('inventory_holds')
@@ -0,0 +1,32 @@
+"""add room inventory ledger
+
+Revision ID: 3f6c1a9e2b7d
+Revises: d8b0a8383db2
+Create Date: 2025-11-03 10:12:41.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c1a9e2b7d'
+down_revision = 'd8b0a8383db2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('room_inventory',
+    sa.Column('room_type_id', sa.Integer(), nullable=False),
+    sa.Column('night', sa.Date(), nullable=False),
+    sa.Column('sold', sa.Integer(), nullable=False),
+    sa.CheckConstraint('sold >= 0', name='ck_room_inventory_sold_positive'),
+    sa.ForeignKeyConstraint(['room_type_id'], ['room_types.id'], ),
+    sa.PrimaryKeyConstraint('room_type_id', 'night')
+    )
+    # Se carga después con `flask rebuild-inventory --if-empty` (render_build.sh)
+
+
+def downgrade():
+    op.drop_table('room_inventory')
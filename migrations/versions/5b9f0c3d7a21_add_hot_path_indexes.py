@@ -0,0 +1,63 @@
+"""add indexes for hot query predicates and booking overlap constraint
+
+Revision ID: 5b9f0c3d7a21
+Revises: 8d2e4b7c1f30
+Create Date: 2025-11-10 11:02:37.914560
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9f0c3d7a21'
+down_revision = '8d2e4b7c1f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('availability', schema=None) as batch_op:
+        batch_op.create_index('ix_availability_dates', ['start_date', 'end_date'], unique=False)
+        batch_op.create_index('ix_availability_room_id', ['room_id'], unique=False)
+        batch_op.create_index('ix_availability_room_type_id', ['room_type_id'], unique=False)
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_bookings_user_id_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_bookings_type_stay_status', ['room_type_id', 'check_in', 'check_out', 'status'], unique=False)
+
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.create_index('ix_rooms_status_available_type', ['status', 'is_available', 'room_type_id'], unique=False)
+
+    with op.batch_alter_table('pricing_rules', schema=None) as batch_op:
+        batch_op.create_index('ix_pricing_rules_type_active_start', ['room_type_id', 'is_active', 'start_date'], unique=False)
+
+    # Solo PostgreSQL: la base de datos rechaza dos reservas activas de la
+    # misma habitación con noches solapadas
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        op.execute(
+            "ALTER TABLE bookings ADD CONSTRAINT ex_bookings_room_no_overlap "
+            "EXCLUDE USING gist (room_id WITH =, daterange(check_in, check_out) WITH &&) "
+            "WHERE (room_id IS NOT NULL AND status <> 'cancelled')"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE bookings DROP CONSTRAINT IF EXISTS ex_bookings_room_no_overlap')
+
+    with op.batch_alter_table('pricing_rules', schema=None) as batch_op:
+        batch_op.drop_index('ix_pricing_rules_type_active_start')
+
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.drop_index('ix_rooms_status_available_type')
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookings_type_stay_status')
+        batch_op.drop_index('ix_bookings_user_id_id')
+
+    with op.batch_alter_table('availability', schema=None) as batch_op:
+        batch_op.drop_index('ix_availability_room_type_id')
+        batch_op.drop_index('ix_availability_room_id')
+        batch_op.drop_index('ix_availability_dates')
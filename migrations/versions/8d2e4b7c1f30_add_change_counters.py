@@ -0,0 +1,35 @@
+"""add change counters for conditional GET
+
+Revision ID: 8d2e4b7c1f30
+Revises: 3f6c1a9e2b7d
+Create Date: 2025-11-06 17:45:02.530219
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b7c1f30'
+down_revision = '3f6c1a9e2b7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    change_counters = op.create_table('change_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(change_counters, [
+        {'name': name, 'version': 1, 'updated_at': now}
+        for name in ('room_types', 'rooms', 'availability')
+    ])
+
+
+def downgrade():
+    op.drop_table('change_counters')
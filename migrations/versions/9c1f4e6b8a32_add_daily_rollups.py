@@ -0,0 +1,40 @@
+"""add daily rollups for reporting
+
+Revision ID: 9c1f4e6b8a32
+Revises: 2a7c6e0f4b93
+Create Date: 2025-11-17 09:41:27.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1f4e6b8a32'
+down_revision = '2a7c6e0f4b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_rollups',
+    sa.Column('room_type_id', sa.Integer(), nullable=False),
+    sa.Column('night', sa.Date(), nullable=False),
+    sa.Column('rooms_sold', sa.Integer(), nullable=False),
+    sa.Column('rooms_blocked', sa.Integer(), nullable=False),
+    sa.Column('closed', sa.Boolean(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('payments_received', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['room_type_id'], ['room_types.id'], ),
+    sa.PrimaryKeyConstraint('room_type_id', 'night')
+    )
+    with op.batch_alter_table('daily_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_daily_rollups_night', ['night'], unique=False)
+    # Se carga después con `flask rebuild-rollups --if-empty` (render_build.sh)
+
+
+def downgrade():
+    with op.batch_alter_table('daily_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_daily_rollups_night')
+
+    op.drop_table('daily_rollups')
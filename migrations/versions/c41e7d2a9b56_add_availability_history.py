@@ -0,0 +1,42 @@
+"""add availability history for archived blocks
+
+Revision ID: c41e7d2a9b56
+Revises: 5b9f0c3d7a21
+Create Date: 2025-11-10 11:20:37.184502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e7d2a9b56'
+down_revision = '5b9f0c3d7a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('availability_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('original_id', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=True),
+    sa.Column('room_type_id', sa.Integer(), nullable=True),
+    sa.Column('closed_manually', sa.Boolean(), nullable=True),
+    sa.Column('maintenance_block', sa.Boolean(), nullable=True),
+    sa.Column('reason', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('availability_history', schema=None) as batch_op:
+        batch_op.create_index('ix_availability_history_end_date', ['end_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('availability_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_availability_history_end_date')
+
+    op.drop_table('availability_history')
@@ -7,4 +7,12 @@ npm run build
 
 pipenv install
 
+# Versiones .br/.gz de dist/ para no comprimir en cada petición
+pipenv run precompress-static
+
 pipenv run upgrade
+
+# Cargar el libro de inventario y los totales de los informes si la
+# migración acaba de crear sus tablas (si ya tienen filas no hacen nada)
+pipenv run flask rebuild-inventory --if-empty
+pipenv run flask rebuild-rollups --if-empty
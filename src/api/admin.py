@@ -6,7 +6,10 @@ from flask_admin.actions import action
 from flask_admin.form.widgets import DatePickerWidget
 from wtforms.fields import DateField
 from flask import flash, redirect, request, url_for
-from .models import db, User, RoomTypes, Rooms, Availability, Bookings, Payments
+from .models import db, User, RoomTypes, Rooms, Availability, Bookings, Payments, Jobs
+from .blocks import create_blocks
+
+MAINTENANCE_DAYS = 3
 
 
 # =====================================================
@@ -30,6 +33,11 @@ class RoomsAdmin(ModelView):
         "created_at": "Creado el"
     }
 
+    # ⚙️ Acción: cerrar las habitaciones seleccionadas por mantenimiento
+    @action('close_maintenance', 'Cerrar por mantenimiento (3 días)', '¿Cerrar las seleccionadas por mantenimiento?')
+    def action_close_maintenance(self, ids):
+        _close_for_maintenance(room_ids=[int(room_id) for room_id in ids])
+
 
 # =====================================================
 # 🔹 Disponibilidad / Cierres (Availability)
@@ -101,30 +109,36 @@ class AvailabilityAdminView(ModelView):
     page_size = 25
 
     # =====================================================
-    # ⚙️ Acción personalizada: cerrar por mantenimiento X días
+    # ⚙️ Acción personalizada: nuevo cierre de 3 días para las habitaciones/tipos seleccionados
     # =====================================================
-    @action('close_maintenance', 'Cerrar por mantenimiento (3 días)', '¿Cerrar las seleccionadas por mantenimiento?')
+    @action('close_maintenance', 'Cerrar por mantenimiento (3 días)', '¿Cerrar por mantenimiento las habitaciones/tipos de los bloqueos seleccionados?')
     def action_close_maintenance(self, ids):
-        try:
-            for room_id in ids:
-                room = Rooms.query.get(room_id)
-                if room:
-                    block = Availability(
-                        start_date=datetime.utcnow().date(),
-                        end_date=(datetime.utcnow() + timedelta(days=3)).date(),
-                        room_id=room.id,
-                        room_type_id=room.room_type_id,
-                        maintenance_block=True,
-                        closed_manually=True,
-                        reason="Cierre temporal por mantenimiento (acción rápida)"
-                    )
-                    db.session.add(block)
-            db.session.commit()
-            flash(f"Se cerraron {len(ids)} habitaciones por mantenimiento durante 3 días.", "success")
-        except Exception as e:
-            db.session.rollback()
-            flash(f"Error al crear cierres: {str(e)}", "error")
-
+        # Los ids son de bloqueos: se cierran sus habitaciones o tipos (una sola consulta)
+        blocks = Availability.query.filter(Availability.id.in_([int(i) for i in ids])).all()
+        room_ids = {b.room_id for b in blocks if b.room_id}
+        room_type_ids = {b.room_type_id for b in blocks if not b.room_id and b.room_type_id}
+        _close_for_maintenance(room_ids=room_ids, room_type_ids=room_type_ids)
+
+
+def _close_for_maintenance(room_ids=(), room_type_ids=(), days=MAINTENANCE_DAYS):
+    """Cierre de `days` días desde hoy para varias habitaciones/tipos en un único INSERT."""
+    today = datetime.utcnow().date()
+    try:
+        rows, skipped = create_blocks(
+            [(today, today + timedelta(days=days))],
+            room_ids=room_ids,
+            room_type_ids=room_type_ids,
+            closed_manually=True,
+            maintenance_block=True,
+            reason="Cierre temporal por mantenimiento (acción rápida)",
+        )
+        db.session.commit()
+        targets = len(room_ids) + len(room_type_ids)
+        flash(f"Se cerraron {targets} habitaciones/tipos por mantenimiento durante {days} días "
+              f"({len(rows)} bloqueos nuevos, {skipped} noches ya estaban cerradas).", "success")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error al crear cierres: {str(e)}", "error")
 
 
 # =====================================================
@@ -143,6 +157,7 @@ def setup_admin(app):
     admin.add_view(AvailabilityAdminView(Availability, db.session, name="Disponibilidad / Cierres"))
     admin.add_view(ModelView(Bookings, db.session, name="Reservas"))
     admin.add_view(ModelView(Payments, db.session, name="Pagos"))
+    admin.add_view(ModelView(Jobs, db.session, name="Trabajos"))
 
 
 
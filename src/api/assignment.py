@@ -0,0 +1,195 @@
+"""
+Asignación automática de habitación a las reservas hechas por tipo.
+
+Las reservas se crean con `room_type_id` y `room_id` vacío; aquí se les
+asigna una habitación del tipo que esté activa y disponible
+(Rooms.status/is_available) y que no tenga reservas ni bloqueos esas noches,
+usando los mapas de bits de api/occupancy.py.
+
+Entre las habitaciones libres se elige la de mejor ajuste (best fit): la que
+deja menos noches libres sueltas a los lados de la estancia dentro del hueco
+donde cae. Así las estancias se encadenan en las mismas habitaciones y los
+huecos largos quedan enteros para estancias largas, en lugar de repartirse
+en trozos de una o dos noches que ya no se pueden vender. A igual ajuste se
+prefiere la planta pedida y después la planta y el número más bajos.
+
+- `assign_booking(booking)`: una reserva (al crearla o desde recepción).
+  Comprueba la habitación elegida en la base de datos con la fila bloqueada,
+  por si otro worker la ha ocupado desde la última sincronización.
+- `assign_window(first, last)`: todas las reservas sin habitación de un rango
+  de fechas, ordenadas por llegada (y las más largas antes), con una sola
+  UPDATE en bloque. Bloquea las habitaciones de los tipos implicados y
+  recarga el almacén antes de planificar.
+- Trabajo `assign_room` (api/jobs.py): `assign_booking` en segundo plano
+  para las reservas creadas con ROOM_AUTO_ASSIGN, fuera de la petición.
+
+Ninguna hace commit.
+"""
+from sqlalchemy import select, update
+from api.events import record_change
+from api.inventory import RELEASED_STATUSES
+from api.jobs import job
+from api.models import db, Rooms, Bookings
+from api.occupancy import occupancy, refresh_occupancy, reload_occupancy, room_is_free_db, night_mask
+
+
+def fit(occupied, lo, hi, days):
+    """
+    Noches libres que quedarían a izquierda y derecha de [lo, hi) dentro de
+    su hueco. El hueco que llega al borde del horizonte cuenta hasta el borde.
+    """
+    below = occupied & ((1 << lo) - 1)
+    left = lo - below.bit_length()
+    above = occupied >> hi
+    right = (above & -above).bit_length() - 1 if above else days - hi
+    return left, right
+
+
+def _score(room, occupied, lo, hi, days, floor):
+    left, right = fit(occupied, lo, hi, days)
+    return (left + right, room.floor != floor if floor is not None else False, room.floor or 0, room.room_number)
+
+
+def best_room(rooms, occupied, lo, hi, days, floor=None):
+    """
+    Habitaciones de `rooms` libres en [lo, hi) ordenadas de mejor a peor
+    ajuste. `occupied` es {room_id: mapa de bits}.
+    """
+    mask = night_mask(lo, hi)
+    free = [room for room in rooms if occupied.get(room.id) is not None and not occupied[room.id] & mask]
+    return sorted(free, key=lambda room: _score(room, occupied[room.id], lo, hi, days, floor))
+
+
+def plan(bookings, rooms_by_type, occupied, days, floor=None):
+    """
+    Reparte `bookings` (con id, room_type_id, lo, hi) sin tocar la base de
+    datos. Devuelve ({booking_id: room_id}, [booking_id sin hueco]) y deja
+    en `occupied` las noches asignadas.
+    """
+    placed, unplaced = {}, []
+    for booking in sorted(bookings, key=lambda b: (b.lo, b.lo - b.hi, b.id)):
+        candidates = best_room(rooms_by_type.get(booking.room_type_id, ()), occupied,
+                               booking.lo, booking.hi, days, floor)
+        if not candidates:
+            unplaced.append(booking.id)
+            continue
+        room = candidates[0]
+        occupied[room.id] |= night_mask(booking.lo, booking.hi)
+        placed[booking.id] = room.id
+    return placed, unplaced
+
+
+def _stay_span(check_in, check_out):
+    """Bits de la estancia en el almacén; None si ya pasó o termina fuera del horizonte."""
+    if (check_out - occupancy.start).days > occupancy.days:
+        return None
+    return occupancy.span(check_in, check_out)
+
+
+def _sellable_rooms(room_type_ids, lock=False):
+    stmt = select(Rooms.id, Rooms.room_type_id, Rooms.floor, Rooms.room_number).where(
+        Rooms.room_type_id.in_(room_type_ids),
+        Rooms.status == "active",
+        Rooms.is_available == True
+    ).order_by(Rooms.id)
+    if lock:
+        stmt = stmt.with_for_update()
+    return db.session.execute(stmt).all()
+
+
+def assign_booking(booking, floor=None):
+    """
+    Asigna habitación a una reserva ya añadida a la sesión. Devuelve el id
+    de la habitación o None si no hay ninguna libre (o la estancia sale del
+    horizonte del almacén).
+    """
+    refresh_occupancy()
+    span = _stay_span(booking.check_in, booking.check_out)
+    if span is None:
+        return None
+
+    rooms = _sellable_rooms([booking.room_type_id])
+    occupied = {room.id: occupancy.occupied(room.id, exclude_booking_id=booking.id) for room in rooms}
+
+    for room in best_room(rooms, occupied, *span, occupancy.days, floor):
+        # Bloquear la fila y confirmar en la base de datos: el almacén puede ir por detrás
+        db.session.execute(select(Rooms.id).where(Rooms.id == room.id).with_for_update())
+        if room_is_free_db(room.id, booking.check_in, booking.check_out, exclude_booking_id=booking.id):
+            booking.room_id = room.id
+            return room.id
+    return None
+
+
+@job("assign_room")
+def assign_room_job(booking_id):
+    """Asigna habitación a una reserva recién creada; no hace nada si ya la tiene o está cancelada."""
+    booking = db.session.get(Bookings, booking_id)
+    if booking is None or booking.room_id or booking.status in RELEASED_STATUSES:
+        return
+    assign_booking(booking)
+
+
+class _Stay:
+    __slots__ = ("id", "room_type_id", "lo", "hi", "values")
+
+    def __init__(self, row, lo, hi):
+        self.id = row.id
+        self.room_type_id = row.room_type_id
+        self.lo = lo
+        self.hi = hi
+        self.values = dict(row._mapping)
+
+
+def assign_window(first, last, room_type_id=None, floor=None):
+    """
+    Asigna habitación a las reservas activas sin habitación que solapan con
+    [first, last). Devuelve {"assigned": [(booking_id, room_id)], "unplaced":
+    [booking_id]}; las que salen del horizonte cuentan como no asignadas.
+    """
+    stmt = select(
+        Bookings.id, Bookings.room_id, Bookings.room_type_id, Bookings.status,
+        Bookings.check_in, Bookings.check_out,
+    ).where(
+        Bookings.room_id.is_(None),
+        Bookings.status.notin_(RELEASED_STATUSES),
+        Bookings.check_in < last,
+        Bookings.check_out > first,
+    )
+    if room_type_id is not None:
+        stmt = stmt.where(Bookings.room_type_id == room_type_id)
+    rows = db.session.execute(stmt).all()
+    if not rows:
+        return {"assigned": [], "unplaced": []}
+
+    # Bloquear las habitaciones antes de leer la ocupación: otro reparto espera
+    rooms = _sellable_rooms({row.room_type_id for row in rows}, lock=True)
+    # El plan no se comprueba habitación a habitación: leer también las reservas de otros workers
+    reload_occupancy()
+
+    stays, unplaced = [], []
+    for row in rows:
+        span = _stay_span(row.check_in, row.check_out)
+        if span is None:
+            unplaced.append(row.id)
+        else:
+            stays.append(_Stay(row, *span))
+
+    rooms_by_type = {}
+    for room in rooms:
+        rooms_by_type.setdefault(room.room_type_id, []).append(room)
+    occupied = {room.id: occupancy.occupied(room.id) for room in rooms}
+
+    placed, full = plan(stays, rooms_by_type, occupied, occupancy.days, floor)
+    if placed:
+        # UPDATE por clave primaria en bloque (executemany)
+        db.session.execute(update(Bookings), [
+            {"id": booking_id, "room_id": room_id} for booking_id, room_id in placed.items()
+        ])
+        session = db.session()
+        for stay in stays:
+            if stay.id in placed:
+                # La UPDATE masiva no pasa por la unidad de trabajo: avisar al almacén y a los contadores
+                record_change(session, "update", Bookings, {**stay.values, "room_id": placed[stay.id]},
+                              {"room_id": None})
+
+    return {"assigned": sorted(placed.items()), "unplaced": sorted(unplaced + full)}
@@ -0,0 +1,312 @@
+"""
+Rutas de lectura de hotel_bp servidas de forma asíncrona (ASGI).
+
+Con gunicorn síncrono cada worker queda bloqueado mientras espera a la base
+de datos o a un cliente lento. Aquí las rutas más consultadas se atienden en
+el bucle de eventos con sesiones asíncronas de SQLAlchemy, de modo que un
+solo proceso mantiene muchas peticiones en vuelo:
+
+- GET /api/hotel/room_types
+- GET /api/hotel/rooms
+- GET /api/hotel/availability/search
+- GET /api/hotel/quote
+
+El resto (escrituras, reservas, admin, estáticos...) se pasa a la app Flask
+en un pool de hilos con a2wsgi, igual que si corriera bajo gunicorn.
+
+Las consultas, la validación y el formato de las respuestas son los de las
+vistas Flask (api/catalog.py, parse_stay_args, keyset_page), y se usan los
+mismos ETag, caché de respuestas, índice de bloqueos y calendarios de
+precios, así que ambos caminos devuelven lo mismo byte a byte.
+"""
+import logging
+import os
+from urllib.parse import parse_qsl, urlencode
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import http_date, quote_etag
+from werkzeug.sansio.http import is_resource_modified
+from api.availability_index import availability_index, blocks_stmt, DEFAULT_MAX_AGE
+from api.cache import catalog_cache
+from api.catalog import (
+    room_types_stmt, rooms_stmt, available_rooms_stmt, quotable_types_stmt, search_result, quote_result
+)
+from api.compression import compress_body
+from api.database import create_async_db_engine
+from api.holds import start_sweeper
+from api.jobs import start_job_runner
+from api.http_cache import versions_stmt, versions_from_rows, validators
+from api.inventory import free_counts_statements, combine_free_counts
+from api.models import RoomTypes, Rooms
+from api.pricing import price_calendars, active_rules_stmt, group_rules, stay_calendar, TRACKED as PRICING_TABLES
+from api.routes.hotel_routes import sync_availability_index, sync_occupancy
+from api.utils import APIException, keyset_page, split_page, parse_stay_args
+
+logger = logging.getLogger(__name__)
+
+# Hilos para las peticiones que atiende Flask (equivale a --threads de gunicorn)
+DEFAULT_WSGI_THREADS = 10
+
+CORS_EXPOSE_HEADERS = "Link, X-Next-Cursor"
+
+
+class AsyncRequest:
+    def __init__(self, scope):
+        self.path = scope["path"]
+        self.query_string = scope["query_string"].decode("latin-1")
+        self.args = MultiDict(parse_qsl(self.query_string, keep_blank_values=True))
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1")
+                        for name, value in scope["headers"]}
+
+    @property
+    def full_path(self):
+        # Igual que flask.Request.full_path: la clave de caché es la misma
+        return f"{self.path}?{self.query_string}"
+
+
+class AsyncResponse:
+    def __init__(self, body=b"", status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = dict(headers or {})
+
+
+async def _resource_versions(session, names):
+    rows = (await session.execute(versions_stmt(names))).all()
+    return versions_from_rows(names, rows)
+
+
+async def _blocked_ids(session, app, version, check_in, check_out):
+    """Igual que sync_availability_index() + blocked_ids(), recargando sin bloquear el bucle."""
+    max_age = app.config.get("AVAILABILITY_INDEX_MAX_AGE", DEFAULT_MAX_AGE)
+    if availability_index.needs_reload(version, max_age):
+        rows = (await session.execute(blocks_stmt())).all()
+        availability_index.replace(rows, version)
+    return availability_index.blocked_ids(check_in, check_out)
+
+
+async def _active_rules(session, room_types):
+    ids = [rt.id for rt in room_types]
+    return group_rules(ids, (await session.scalars(active_rules_stmt(ids))).all())
+
+
+async def _paginate(session, stmt, columns, request):
+    stmt, limit = keyset_page(stmt, columns, request.args)
+    items = (await session.scalars(stmt)).all()
+    return split_page(items, columns, limit)
+
+
+def _page_headers(request, next_cursor):
+    if not next_cursor:
+        return {}
+    args = {**request.args.to_dict(), "cursor": next_cursor}
+    return {
+        "X-Next-Cursor": next_cursor,
+        "Link": f'<{request.path}?{urlencode(args)}>; rel="next"',
+    }
+
+
+# =====================================================
+# 🔹 Vistas (mismas respuestas que routes/hotel_routes.py)
+# =====================================================
+async def room_types_view(app, session, request, versions):
+    try:
+        room_types, next_cursor = await _paginate(session, room_types_stmt(request.args), [RoomTypes.id], request)
+    except APIException as e:
+        return _json(app, {"error": e.message}, e.status_code)
+    return _json(app, [room.serialize() for room in room_types], headers=_page_headers(request, next_cursor))
+
+
+async def rooms_view(app, session, request, versions):
+    try:
+        rooms, next_cursor = await _paginate(session, rooms_stmt(request.args), [Rooms.id], request)
+    except APIException as e:
+        return _json(app, {"error": e.message}, e.status_code)
+    return _json(app, [room.serialize() for room in rooms], headers=_page_headers(request, next_cursor))
+
+
+async def search_view(app, session, request, versions):
+    try:
+        check_in, check_out, _ = parse_stay_args(request.args)
+    except APIException as e:
+        return _json(app, {"error": e.message}, 400)
+
+    blocked_room_ids, blocked_type_ids = await _blocked_ids(
+        session, app, versions["availability"][0], check_in, check_out)
+    rooms = (await session.scalars(available_rooms_stmt(blocked_room_ids, blocked_type_ids))).all()
+    return _json(app, search_result(rooms))
+
+
+async def quote_view(app, session, request, versions):
+    try:
+        check_in, check_out, guests = parse_stay_args(request.args, with_guests=True)
+    except APIException as e:
+        return _json(app, {"error": e.message}, 400)
+
+    room_types = (await session.scalars(quotable_types_stmt(guests))).all()
+    room_type_ids = [rt.id for rt in room_types]
+
+    versions = await _resource_versions(session, ["availability", *PRICING_TABLES])
+    blocked_room_ids, blocked_type_ids = await _blocked_ids(
+        session, app, versions["availability"][0], check_in, check_out)
+
+    free = {}
+    if room_type_ids:
+        max_sold_stmt, blocked_stmt = free_counts_statements(room_type_ids, check_in, check_out, blocked_room_ids)
+        max_sold = dict((await session.execute(max_sold_stmt)).all())
+        blocked_rooms = dict((await session.execute(blocked_stmt)).all()) if blocked_stmt is not None else {}
+        free = combine_free_counts(room_types, max_sold, blocked_rooms, blocked_type_ids)
+
+    # Igual que PriceCalendarCache.get_many()
+    price_calendars.sync(tuple(versions[name][0] for name in PRICING_TABLES))
+    calendars, missing = price_calendars.lookup(room_types)
+    if missing:
+        calendars.update(price_calendars.build(missing, await _active_rules(session, missing)))
+
+    # Estancias fuera del horizonte: calendario puntual, como quote_stay()
+    outside = [rt for rt in room_types if not calendars[rt.id].covers(check_in, check_out)]
+    rules = await _active_rules(session, outside) if outside else {}
+
+    quotes = {}
+    for room_type in room_types:
+        calendar = calendars[room_type.id]
+        if room_type.id in rules:
+            calendar = stay_calendar(room_type, check_in, check_out, rules[room_type.id])
+        quotes[room_type.id] = calendar.quote(check_in, check_out)
+
+    return _json(app, quote_result(check_in, check_out, guests, room_types, free, quotes))
+
+
+# Ruta -> (vista, tablas de las que depende para ETag y caché; None = sin caché)
+ROUTES = {
+    "/api/hotel/room_types": (room_types_view, ("room_types",)),
+    "/api/hotel/rooms": (rooms_view, ("rooms", "room_types")),
+    "/api/hotel/availability/search": (search_view, ("availability", "rooms", "room_types")),
+    "/api/hotel/quote": (quote_view, None),
+}
+
+
+def _json(app, payload, status=200, headers=None):
+    # Mismo proveedor JSON que jsonify
+    response = app.json.response(payload)
+    return AsyncResponse(response.get_data(), status, {"Content-Type": response.mimetype, **(headers or {})})
+
+
+class HotelASGI:
+    """App ASGI: rutas de lectura asíncronas y el resto a Flask."""
+
+    def __init__(self, flask_app, engine=None, wsgi_threads=None):
+        self.flask_app = flask_app
+        self.engine = engine or create_async_db_engine()
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        threads = wsgi_threads or int(os.getenv("WSGI_THREADS", DEFAULT_WSGI_THREADS))
+        self.fallback = WSGIMiddleware(flask_app, workers=threads)
+        self._stop_sweeper = None
+        self._job_runner = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+
+        route = None
+        if scope["type"] == "http" and scope["method"] == "GET":
+            route = ROUTES.get(scope["path"].rstrip("/"))
+        if route is None:
+            return await self.fallback(scope, receive, send)
+
+        request = AsyncRequest(scope)
+        try:
+            with self.flask_app.app_context():
+                response = await self._dispatch(request, *route)
+        except APIException as e:
+            response = _json(self.flask_app, e.to_dict(), e.status_code)
+        except Exception:
+            logger.exception("Error en la ruta asíncrona %s", request.path)
+            response = AsyncResponse(b'{"message":"Internal Server Error"}\n', 500,
+                                     {"Content-Type": "application/json"})
+        await self._send(request, response, send)
+
+    async def _dispatch(self, request, view, names):
+        async with self.sessions() as session:
+            if names is None:
+                return await view(self.flask_app, session, request, {})
+
+            # Lo mismo que @conditional + @catalog_cache.cached
+            versions = await _resource_versions(session, list(names))
+            etag, last_modified = validators(versions)
+            headers = {"ETag": quote_etag(etag, weak=True), "Cache-Control": "no-cache"}
+            if last_modified:
+                headers["Last-Modified"] = http_date(last_modified)
+
+            if not is_resource_modified(
+                http_if_none_match=request.headers.get("if-none-match"),
+                http_if_modified_since=request.headers.get("if-modified-since"),
+                etag=etag, last_modified=last_modified,
+            ):
+                return AsyncResponse(b"", 304, headers)
+
+            key = catalog_cache.key(request.full_path, etag)
+            hit = catalog_cache.load(key)
+            if hit is not None:
+                cached_headers, body = hit
+                return AsyncResponse(body, 200, {
+                    "Content-Type": "application/json", **cached_headers, **headers, "X-Cache": "HIT"})
+
+            response = await view(self.flask_app, session, request, versions)
+            if response.status != 200:
+                return response
+            catalog_cache.store(key, response.headers, response.body)
+            response.headers.update(headers)
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+    async def _send(self, request, response, send):
+        headers = dict(response.headers)
+        vary = []
+        origin = request.headers.get("origin")
+        if origin:
+            # Misma política que flask_cors en app.py
+            headers["Access-Control-Allow-Origin"] = origin
+            headers["Access-Control-Allow-Credentials"] = "true"
+            headers["Access-Control-Expose-Headers"] = CORS_EXPOSE_HEADERS
+            vary.append("Origin")
+
+        # Misma compresión que el after_request de Flask (api/compression.py)
+        body, encoding, compressible = compress_body(
+            self.flask_app.config, request.headers.get("accept-encoding"), response.status,
+            headers.get("Content-Type"), response.body)
+        if compressible:
+            vary.append("Accept-Encoding")
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if vary:
+            headers["Vary"] = ", ".join(vary)
+        headers["Content-Length"] = str(len(body))
+
+        await send({
+            "type": "http.response.start",
+            "status": response.status,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Cargar el índice de bloqueos y la ocupación al arrancar, como wsgi.py
+                with self.flask_app.app_context():
+                    sync_availability_index()
+                    sync_occupancy()
+                self._stop_sweeper = start_sweeper(self.flask_app)
+                self._job_runner = start_job_runner(self.flask_app)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._stop_sweeper:
+                    self._stop_sweeper.set()
+                if self._job_runner:
+                    self._job_runner.stop()
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
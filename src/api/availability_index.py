@@ -0,0 +1,200 @@
+"""
+Índice en memoria de los bloqueos de disponibilidad (tabla `availability`).
+
+Los bloqueos se guardan como intervalos semiabiertos [start_date, end_date)
+en un árbol de intervalos centrado, de modo que la búsqueda de solapes con
+una estancia cuesta O(log n + k) y no necesita ir a la base de datos.
+
+El índice se carga al arrancar el worker y se mantiene al día con los
+cambios confirmados sobre `Availability` (rutas /availability y
+AvailabilityAdminView). Como cada worker de gunicorn tiene su propia copia,
+se recarga entera cuando supera `AVAILABILITY_INDEX_MAX_AGE` segundos para
+recoger los cambios hechos desde otros procesos.
+"""
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from api.events import on_commit
+from api.http_cache import resource_versions
+from api.models import db, Availability
+
+Block = namedtuple("Block", [
+    "id", "start_date", "end_date", "room_id", "room_type_id",
+    "closed_manually", "maintenance_block",
+])
+
+DEFAULT_MAX_AGE = 300
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left = left
+        self.right = right
+
+
+def _build_tree(intervals):
+    """intervals: lista de (start, end, block) con start/end en ordinales."""
+    if not intervals:
+        return None
+
+    points = sorted({s for s, _, _ in intervals})
+    center = points[len(points) // 2]
+
+    here, left, right = [], [], []
+    for interval in intervals:
+        start, end, _ = interval
+        if end <= center:
+            left.append(interval)
+        elif start > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+
+    return _Node(
+        center,
+        sorted(here, key=lambda i: i[0]),
+        sorted(here, key=lambda i: i[1], reverse=True),
+        _build_tree(left),
+        _build_tree(right),
+    )
+
+
+def _query_tree(node, start, end, out):
+    while node is not None:
+        if end <= node.center:
+            for s, _, block in node.by_start:
+                if s >= end:
+                    break
+                out.append(block)
+            node = node.left
+        elif start > node.center:
+            for _, e, block in node.by_end:
+                if e <= start:
+                    break
+                out.append(block)
+            node = node.right
+        else:
+            out.extend(block for _, _, block in node.by_start)
+            _query_tree(node.left, start, end, out)
+            node = node.right
+
+
+def blocks_stmt():
+    return db.select(
+        Availability.id, Availability.start_date, Availability.end_date,
+        Availability.room_id, Availability.room_type_id,
+        Availability.closed_manually, Availability.maintenance_block,
+    )
+
+
+class AvailabilityIndex:
+    """Árbol de intervalos con los bloqueos, indexado por habitación y tipo."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._blocks = {}
+        self._tree = None
+        self._dirty = False
+        self._loaded_at = None
+        self._version = None
+
+    # -------------------------------------------------
+    # Carga y mantenimiento
+    # -------------------------------------------------
+    def load(self, version=None):
+        """Carga todos los bloqueos desde la base de datos (una sola consulta)."""
+        self.replace(db.session.execute(blocks_stmt()).all(), version)
+
+    def replace(self, rows, version=None):
+        """Sustituye el contenido por las filas de `blocks_stmt()` ya leídas."""
+        with self._lock:
+            self._blocks = {row.id: Block(*row) for row in rows}
+            self._dirty = True
+            self._loaded_at = time.monotonic()
+            self._version = version
+
+    def invalidate(self):
+        """Fuerza una recarga completa en la próxima consulta."""
+        with self._lock:
+            self._loaded_at = None
+
+    def needs_reload(self, version, max_age=DEFAULT_MAX_AGE):
+        """Si la versión de la base de datos es otra o la copia es demasiado antigua."""
+        if version != self._version or self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > max_age
+
+    def sync(self, version):
+        """Recarga si la versión de `availability` en la base de datos es otra."""
+        if version != self._version:
+            self.load(version)
+
+    def upsert(self, block):
+        with self._lock:
+            self._blocks[block.id] = block
+            self._dirty = True
+
+    def remove(self, block_id):
+        with self._lock:
+            if self._blocks.pop(block_id, None) is not None:
+                self._dirty = True
+
+    def _ensure_fresh(self):
+        max_age = current_app.config.get("AVAILABILITY_INDEX_MAX_AGE", DEFAULT_MAX_AGE)
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > max_age:
+            # Con la versión actual: si no, el siguiente sync() volvería a cargarlo
+            self.load(resource_versions("availability")["availability"][0])
+
+        with self._lock:
+            if self._dirty:
+                self._tree = _build_tree([
+                    (b.start_date.toordinal(), b.end_date.toordinal(), b)
+                    for b in self._blocks.values()
+                    if b.end_date > b.start_date
+                ])
+                self._dirty = False
+            return self._tree
+
+    # -------------------------------------------------
+    # Consultas
+    # -------------------------------------------------
+    def overlapping(self, check_in, check_out, room_id=None, room_type_id=None):
+        """Bloqueos que solapan con [check_in, check_out), opcionalmente filtrados."""
+        tree = self._ensure_fresh()
+        found = []
+        _query_tree(tree, check_in.toordinal(), check_out.toordinal(), found)
+
+        if room_id is not None:
+            found = [b for b in found if b.room_id == room_id]
+        if room_type_id is not None:
+            found = [b for b in found if b.room_type_id == room_type_id]
+        return found
+
+    def blocked_ids(self, check_in, check_out):
+        """Devuelve (ids de habitación, ids de tipo) bloqueados en el rango."""
+        room_ids, room_type_ids = set(), set()
+        for block in self.overlapping(check_in, check_out):
+            if block.room_id:
+                room_ids.add(block.room_id)
+            elif block.room_type_id:
+                room_type_ids.add(block.room_type_id)
+        return room_ids, room_type_ids
+
+
+availability_index = AvailabilityIndex()
+
+
+@on_commit(Availability)
+def _sync_availability_index(changes):
+    for change in changes:
+        values = change.values
+        if change.action == "delete":
+            availability_index.remove(values["id"])
+        else:
+            availability_index.upsert(Block(**{field: values.get(field) for field in Block._fields}))
@@ -0,0 +1,175 @@
+"""
+Alta de bloqueos de disponibilidad en bloque (muchas habitaciones, tipos y
+rangos de fechas a la vez), para la ruta POST /availability/bulk y las
+acciones de Flask-Admin.
+
+1. Los rangos pedidos se ordenan y se fusionan los que se solapan o se
+   tocan: [1, 5) + [5, 8) = [1, 8). Igual que en el índice, end_date es
+   exclusivo.
+2. A cada habitación o tipo se le resta lo que ya tiene bloqueado, así que
+   repetir la misma petición no crea filas duplicadas ni solapadas.
+3. Todo se inserta con un único INSERT multi-fila (executemany) dentro de la
+   transacción de la sesión; el commit lo hace quien llama.
+
+Las habitaciones y tipos se comprueban y los bloqueos existentes se leen con
+una consulta cada uno, sin importar cuántos destinos haya.
+"""
+from datetime import datetime
+from sqlalchemy import insert, select, or_
+from api.events import record_change
+from api.models import db, Rooms, RoomTypes, Availability
+from api.utils import APIException
+
+MAX_ROWS = 10000
+
+
+class BlockError(APIException):
+    status_code = 400
+
+
+def parse_ranges(ranges):
+    """Lista de {"start_date", "end_date"} en YYYY-MM-DD a tuplas de fechas."""
+    if not isinstance(ranges, list) or not ranges:
+        raise BlockError("ranges must be a non-empty list of {start_date, end_date}")
+
+    parsed = []
+    for item in ranges:
+        try:
+            start = datetime.strptime(item["start_date"], "%Y-%m-%d").date()
+            end = datetime.strptime(item["end_date"], "%Y-%m-%d").date()
+        except (KeyError, TypeError, ValueError):
+            raise BlockError("Invalid range. Use {start_date, end_date} with YYYY-MM-DD dates")
+        if end <= start:
+            raise BlockError(f"end_date must be after start_date ({start.isoformat()})")
+        parsed.append((start, end))
+    return parsed
+
+
+def parse_ids(values, name):
+    """Lista de ids enteros del body (vacía si no viene)."""
+    if values is None:
+        return []
+    if not isinstance(values, list) or not all(type(value) is int for value in values):
+        raise BlockError(f"{name} must be a list of integers")
+    return values
+
+
+def merge_ranges(ranges):
+    """Fusiona rangos [start, end) que se solapan o son contiguos."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(ranges, taken):
+    """Partes de `ranges` (fusionados) que no cubre ningún rango de `taken`."""
+    result = []
+    taken = merge_ranges(taken)
+    for start, end in ranges:
+        for taken_start, taken_end in taken:
+            if taken_end <= start or taken_start >= end:
+                continue
+            if taken_start > start:
+                result.append((start, taken_start))
+            start = max(start, taken_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def _resolve_targets(room_ids, room_type_ids, floors):
+    """Valida los ids (una consulta por tabla) y devuelve ([room_id], [room_type_id])."""
+    rooms = set()
+    if room_ids or floors:
+        conditions = []
+        if room_ids:
+            conditions.append(Rooms.id.in_(room_ids))
+        if floors:
+            conditions.append(Rooms.floor.in_(floors))
+        rooms = set(db.session.scalars(select(Rooms.id).where(or_(*conditions))))
+        unknown = sorted(set(room_ids) - rooms)
+        if unknown:
+            raise BlockError(f"Unknown room ids: {unknown}", status_code=404)
+
+    if room_type_ids:
+        found = set(db.session.scalars(select(RoomTypes.id).where(RoomTypes.id.in_(room_type_ids))))
+        unknown = sorted(set(room_type_ids) - found)
+        if unknown:
+            raise BlockError(f"Unknown room type ids: {unknown}", status_code=404)
+
+    return sorted(rooms), sorted(set(room_type_ids))
+
+
+def _existing_ranges(room_ids, room_type_ids, start, end):
+    """Bloqueos ya existentes de esos destinos que tocan [start, end), por destino."""
+    conditions = []
+    if room_ids:
+        conditions.append(Availability.room_id.in_(room_ids))
+    if room_type_ids:
+        conditions.append(Availability.room_id.is_(None) & Availability.room_type_id.in_(room_type_ids))
+
+    existing = {}
+    rows = db.session.execute(
+        select(Availability.room_id, Availability.room_type_id, Availability.start_date, Availability.end_date)
+        .where(or_(*conditions), Availability.start_date <= end, Availability.end_date >= start)
+    ).all()
+    for row in rows:
+        key = ("room", row.room_id) if row.room_id else ("type", row.room_type_id)
+        existing.setdefault(key, []).append((row.start_date, row.end_date))
+    return existing
+
+
+def create_blocks(ranges, room_ids=(), room_type_ids=(), floors=(), closed_manually=True,
+                  maintenance_block=False, reason=None):
+    """
+    Crea los bloqueos de `ranges` (tuplas de fechas) para las habitaciones,
+    plantas y tipos indicados. Devuelve (filas insertadas con su id, noches
+    que ya estaban bloqueadas). No hace commit.
+    """
+    if not room_ids and not room_type_ids and not floors:
+        raise BlockError("Provide room_ids, room_type_ids or floors")
+
+    ranges = merge_ranges(ranges)
+    rooms, room_type_ids = _resolve_targets(list(room_ids), list(room_type_ids), list(floors))
+    existing = _existing_ranges(rooms, room_type_ids, ranges[0][0], ranges[-1][1])
+
+    now = datetime.utcnow()
+    rows, skipped = [], 0
+    targets = [("room", room_id) for room_id in rooms] + [("type", type_id) for type_id in room_type_ids]
+    for kind, target_id in targets:
+        free = subtract_ranges(ranges, existing.get((kind, target_id), []))
+        skipped += sum((end - start).days for start, end in ranges) - sum((end - start).days for start, end in free)
+        for start, end in free:
+            rows.append({
+                "start_date": start,
+                "end_date": end,
+                "room_id": target_id if kind == "room" else None,
+                "room_type_id": target_id if kind == "type" else None,
+                "closed_manually": closed_manually,
+                "maintenance_block": maintenance_block,
+                "reason": reason,
+                "created_at": now,
+            })
+
+    if len(rows) > MAX_ROWS:
+        raise BlockError(f"Too many blocks in one request ({len(rows)} > {MAX_ROWS})")
+    if not rows:
+        return [], skipped
+
+    # Un solo INSERT multi-fila; RETURNING da los ids en el orden de `rows`
+    ids = db.session.scalars(
+        insert(Availability).returning(Availability.id, sort_by_parameter_order=True), rows
+    ).all()
+
+    session = db.session()
+    for row, block_id in zip(rows, ids):
+        row["id"] = block_id
+        # El INSERT masivo no pasa por la unidad de trabajo: avisar al índice, caché y contadores
+        record_change(session, "insert", Availability, row)
+    return rows, skipped
@@ -0,0 +1,128 @@
+"""
+Caché de lectura para el catálogo (tipos de habitación, habitaciones y
+búsqueda de disponibilidad).
+
+Guarda las respuestas ya serializadas (bytes JSON + cabeceras) por URL, de
+modo que un acierto no toca la base de datos ni pasa por jsonify. Se vacía
+cuando se confirman cambios en RoomTypes, Rooms o Availability, vengan de
+las rutas REST o de Flask-Admin. La invalidación se hace tras el commit y no
+en el propio after_insert/after_update/after_delete: si se vaciara durante
+el flush, otra petición podría volver a llenarla con datos antiguos antes de
+que la transacción se confirme.
+
+Por defecto la caché es local al proceso (LRU con TTL), así que cada worker
+ve los cambios de otros workers como mucho `CATALOG_CACHE_TTL` segundos
+tarde. Se puede enchufar un backend compartido (Redis, memcached...) con
+`CATALOG_CACHE_BACKEND = "paquete.modulo:Clase"`; la clase recibe la app y
+debe implementar get(key), set(key, value, ttl) y clear().
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request
+from werkzeug.utils import import_string
+from api.events import on_commit
+from api.models import RoomTypes, Rooms, Availability
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 512
+
+# Cabeceras que se guardan junto al cuerpo (paginación)
+CACHED_HEADERS = ("X-Next-Cursor", "Link")
+
+
+class LocalCache:
+    """LRU con caducidad, en memoria del proceso."""
+
+    def __init__(self, app=None, max_entries=DEFAULT_MAX_ENTRIES):
+        if app is not None:
+            max_entries = app.config.get("CATALOG_CACHE_MAX_ENTRIES", max_entries)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    def __init__(self):
+        self.backend = LocalCache()
+        self.ttl = DEFAULT_TTL
+
+    def init_app(self, app):
+        self.ttl = app.config.get("CATALOG_CACHE_TTL", DEFAULT_TTL)
+        backend = app.config.get("CATALOG_CACHE_BACKEND")
+        self.backend = import_string(backend)(app) if backend else LocalCache(app)
+
+    def clear(self):
+        self.backend.clear()
+
+    def key(self, full_path, etag=""):
+        return f"{full_path}#{etag}"
+
+    def load(self, key):
+        """(cabeceras, cuerpo) guardados para `key`, o None."""
+        packed = self.backend.get(key)
+        if packed is None:
+            return None
+        headers, body = packed.split(b"\n", 1)
+        return json.loads(headers), body
+
+    def store(self, key, headers, body):
+        if self.ttl > 0:
+            headers = {name: headers[name] for name in CACHED_HEADERS if name in headers}
+            self.backend.set(key, json.dumps(headers).encode() + b"\n" + body, self.ttl)
+
+    def cached(self, view):
+        """Decorador: sirve la respuesta guardada o guarda la nueva si es un 200."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Con @conditional delante, la versión de los datos forma parte de
+            # la clave y una entrada de otro worker nunca queda obsoleta
+            key = self.key(request.full_path, g.get("etag", ""))
+            hit = self.load(key)
+            if hit is not None:
+                headers, body = hit
+                response = current_app.response_class(body, mimetype="application/json")
+                response.headers.update(headers)
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                self.store(key, response.headers, response.get_data())
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+
+catalog_cache = ResponseCache()
+
+
+@on_commit(RoomTypes, Rooms, Availability)
+def _invalidate_catalog_cache(changes):
+    catalog_cache.clear()
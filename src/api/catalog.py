@@ -0,0 +1,82 @@
+"""
+Consultas y respuestas de las rutas de lectura del catálogo: tipos de
+habitación, habitaciones, búsqueda de disponibilidad y cotización.
+
+Solo construyen sentencias select() y diccionarios, sin tocar la sesión, de
+modo que las comparten las vistas Flask (routes/hotel_routes.py) y las
+asíncronas (async_hotel.py) y ambas devuelven exactamente lo mismo.
+"""
+from sqlalchemy import select
+from api.models import RoomTypes, Rooms
+
+
+def room_types_stmt(args):
+    """Filtros: ?is_active=true|false"""
+    stmt = select(RoomTypes)
+    if "is_active" in args:
+        stmt = stmt.where(RoomTypes.is_active == (args["is_active"].lower() == "true"))
+    return stmt
+
+
+def rooms_stmt(args):
+    """Filtros: ?room_type_id=&status=&floor="""
+    stmt = select(Rooms).options(*Rooms.serialize_options())
+    if args.get("room_type_id"):
+        stmt = stmt.where(Rooms.room_type_id == args.get("room_type_id", type=int))
+    if args.get("status"):
+        stmt = stmt.where(Rooms.status == args["status"])
+    if args.get("floor"):
+        stmt = stmt.where(Rooms.floor == args.get("floor", type=int))
+    return stmt
+
+
+def available_rooms_stmt(blocked_room_ids, blocked_type_ids):
+    """Habitaciones activas y no bloqueadas."""
+    stmt = select(Rooms).options(*Rooms.serialize_options()).where(
+        Rooms.status == "active",
+        Rooms.is_available == True
+    )
+    if blocked_room_ids:
+        stmt = stmt.where(~Rooms.id.in_(blocked_room_ids))
+    if blocked_type_ids:
+        stmt = stmt.where(~Rooms.room_type_id.in_(blocked_type_ids))
+    return stmt
+
+
+def quotable_types_stmt(guests):
+    """Tipos activos con capacidad suficiente, del más barato al más caro."""
+    return select(RoomTypes).where(
+        RoomTypes.is_active == True,
+        RoomTypes.capacity >= guests
+    ).order_by(RoomTypes.base_price)
+
+
+def search_result(rooms):
+    return [
+        {
+            **room.serialize(),
+            "room_type": room.room_type.serialize() if room.room_type else None
+        }
+        for room in rooms
+    ]
+
+
+def quote_result(check_in, check_out, guests, room_types, free, quotes):
+    """`free` y `quotes` van por id de tipo (inventory.free_counts y PriceCalendar.quote)."""
+    results = []
+    for room_type in room_types:
+        quote = quotes[room_type.id]
+        results.append({
+            **room_type.serialize(),
+            "available_rooms": free[room_type.id],
+            "nightly_prices": [{"date": night, "price": price} for night, price in quote.nightly],
+            "total_price": quote.total,
+        })
+
+    return {
+        "check_in": check_in,
+        "check_out": check_out,
+        "nights": (check_out - check_in).days,
+        "guests": guests,
+        "room_types": results,
+    }
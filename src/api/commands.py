@@ -1,5 +1,6 @@
-
+import os
 import click
+from datetime import date, datetime, timedelta
 from api.models import db, User
 
 """
@@ -31,4 +32,207 @@ def setup_commands(app):
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
\ No newline at end of file
+        pass
+
+    """
+    Reconstruye el libro de inventario (room_inventory) a partir de las reservas.
+    Ejecutar si se sospecha de un desajuste; render_build.sh lo ejecuta con
+    --if-empty tras migrar, para cargarlo cuando la tabla se acaba de crear:
+    $ flask rebuild-inventory --since 2025-01-01
+    $ flask rebuild-inventory --if-empty
+    """
+    @app.cli.command("rebuild-inventory")
+    @click.option("--since", default=None, help="Fecha YYYY-MM-DD desde la que reconstruir")
+    @click.option("--if-empty", is_flag=True, help="Solo si la tabla aún no tiene filas")
+    def rebuild_inventory(since, if_empty):
+        from api import inventory
+        from api.models import RoomInventory
+
+        if if_empty and db.session.query(RoomInventory.night).first() is not None:
+            print("Room inventory ledger already loaded, nothing to do")
+            return
+        since_date = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+        print("Rebuilding room inventory ledger")
+        rows = inventory.rebuild(since_date)
+        print(f"{rows} room type nights written")
+
+    """
+    Reconstruye los totales diarios de los informes (daily_rollups) a partir
+    de reservas, pagos y bloqueos. render_build.sh lo ejecuta con --if-empty
+    tras migrar, para cargar el histórico cuando la tabla se acaba de crear:
+    $ flask rebuild-rollups --since 2025-01-01
+    $ flask rebuild-rollups --if-empty
+    """
+    @app.cli.command("rebuild-rollups")
+    @click.option("--since", default=None, help="Fecha YYYY-MM-DD desde la que reconstruir")
+    @click.option("--if-empty", is_flag=True, help="Solo si la tabla aún no tiene filas")
+    def rebuild_rollups(since, if_empty):
+        from api import rollups
+        from api.models import DailyRollups
+
+        if if_empty and db.session.query(DailyRollups.night).first() is not None:
+            print("Daily rollups already loaded, nothing to do")
+            return
+        since_date = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+        print("Rebuilding daily rollups")
+        rows = rollups.rebuild(since_date)
+        print(f"{rows} room type nights written")
+
+    """
+    Exporta reservas o pagos en streaming para contabilidad:
+    $ flask export payments --format csv --from 2025-10-01 --to 2025-11-01 -o pagos.csv
+    """
+    @app.cli.command("export")
+    @click.argument("kind", type=click.Choice(["bookings", "payments"]))
+    @click.option("--format", "fmt", type=click.Choice(["ndjson", "csv"]), default="ndjson")
+    @click.option("--from", "date_from", default=None, help="Fecha YYYY-MM-DD inicial (incluida)")
+    @click.option("--to", "date_to", default=None, help="Fecha YYYY-MM-DD final (excluida)")
+    @click.option("--status", default=None)
+    @click.option("-o", "--output", default="-", help="Fichero de salida (por defecto stdout)")
+    def export(kind, fmt, date_from, date_to, status, output):
+        from api import exports
+
+        rows = exports.iter_rows(
+            kind,
+            date_from=datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else None,
+            date_to=datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None,
+            status=status,
+        )
+        with click.open_file(output, "w", encoding="utf-8") as out:
+            for chunk in exports.stream(kind, fmt, rows):
+                out.write(chunk)
+
+    """
+    Fusiona bloqueos de disponibilidad solapados o contiguos y archiva en
+    availability_history los ya vencidos. Pensado para ejecutarse cada noche:
+    $ flask compact-availability
+    $ flask compact-availability --no-archive --dry-run
+    """
+    @app.cli.command("compact-availability")
+    @click.option("--archive/--no-archive", default=True, help="Archivar los bloqueos vencidos")
+    @click.option("--before", default=None, help="Archivar los que terminan antes de YYYY-MM-DD (por defecto hoy)")
+    @click.option("--dry-run", is_flag=True, help="Mostrar el resultado sin guardar cambios")
+    def compact_availability(archive, before, dry_run):
+        from api import compaction
+
+        today = datetime.strptime(before, "%Y-%m-%d").date() if before else None
+        stats = compaction.compact(archive=archive, today=today)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        print(f"{stats['archived']} blocks archived, {stats['merged']} merged blocks "
+              f"replacing {stats['merged'] + stats['deleted']} rows"
+              + (" (dry run, nothing saved)" if dry_run else ""))
+
+    """
+    Recarga desde la base de datos el almacén de ocupación por habitación y
+    noche (api/occupancy.py) y muestra su tamaño. wsgi.py lo carga al arrancar
+    cada worker; este comando sirve para comprobar la carga:
+    $ flask rebuild-occupancy --days 365
+    """
+    @app.cli.command("rebuild-occupancy")
+    @click.option("--days", type=int, default=None, help="Noches de horizonte (por defecto OCCUPANCY_HORIZON_DAYS)")
+    def rebuild_occupancy(days):
+        from api.occupancy import occupancy
+
+        rooms, bookings, blocks = occupancy.load(days=days)
+        stats = occupancy.stats()
+        print(f"Occupancy loaded from {stats['start']} for {stats['days']} nights: "
+              f"{rooms} rooms, {bookings} active bookings, {blocks} blocks, {stats['booked_nights']} booked room nights")
+
+    """
+    Asigna habitación a las reservas sin habitación de un rango de fechas
+    (por defecto, las que llegan en los próximos 30 días):
+    $ flask assign-rooms
+    $ flask assign-rooms --from 2025-11-01 --to 2025-12-01 --room-type 3 --dry-run
+    """
+    @app.cli.command("assign-rooms")
+    @click.option("--from", "date_from", default=None, help="Fecha YYYY-MM-DD inicial (por defecto hoy)")
+    @click.option("--to", "date_to", default=None, help="Fecha YYYY-MM-DD final (por defecto +30 días)")
+    @click.option("--room-type", type=int, default=None)
+    @click.option("--floor", type=int, default=None, help="Planta preferida")
+    @click.option("--dry-run", is_flag=True, help="Mostrar el resultado sin guardar cambios")
+    def assign_rooms(date_from, date_to, room_type, floor, dry_run):
+        from api import assignment
+
+        first = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else date.today()
+        last = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else first + timedelta(days=30)
+        result = assignment.assign_window(first, last, room_type_id=room_type, floor=floor)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        print(f"{len(result['assigned'])} bookings assigned, {len(result['unplaced'])} without a free room"
+              + (" (dry run, nothing saved)" if dry_run else ""))
+        if result["unplaced"]:
+            print("Unplaced bookings: " + ", ".join(str(booking_id) for booking_id in result["unplaced"]))
+
+    """
+    Borra las claves Idempotency-Key caducadas (pensado para un cron diario):
+    $ flask purge-idempotency-keys
+    """
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        from api import idempotency
+
+        print(f"{idempotency.purge_expired()} expired idempotency keys deleted")
+
+    """
+    Libera los holds de pago caducados y devuelve sus noches al inventario.
+    Cada worker ya lo hace cada INVENTORY_HOLD_SWEEP_SECONDS; esto es para cron:
+    $ flask sweep-holds
+    """
+    @app.cli.command("sweep-holds")
+    def sweep_holds():
+        from api import holds
+
+        print(f"{holds.sweep()} expired holds released")
+
+    """
+    Ejecuta la cola de trabajos en segundo plano (api/jobs.py) como proceso
+    aparte, hasta Ctrl+C o SIGTERM. Con --once ejecuta los ya vencidos y sale (cron):
+    $ flask jobs-worker --workers 4
+    $ flask jobs-worker --once
+    """
+    @app.cli.command("jobs-worker")
+    @click.option("--workers", type=int, default=None, help="Hilos (por defecto JOBS_WORKERS)")
+    @click.option("--once", is_flag=True, help="Ejecutar los trabajos vencidos y salir")
+    def jobs_worker(workers, once):
+        import signal
+        import threading
+        from api.jobs import JobRunner
+
+        runner = JobRunner(app, workers=workers)
+        if once:
+            print(f"{runner.drain()} jobs run")
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        print(f"Job worker running with {runner.workers} threads")
+        runner.start()
+        try:
+            while not stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        print("Stopping, waiting for running jobs")
+        runner.stop(wait=True)
+
+    """
+    Genera las versiones .br/.gz de los estáticos del build de Vite para
+    servirlas sin comprimir en cada petición (render_build.sh lo ejecuta
+    después de `npm run build`):
+    $ flask precompress-static
+    $ flask precompress-static --dir dist --force
+    """
+    @app.cli.command("precompress-static")
+    @click.option("--dir", "directory", default=None, help="Carpeta del build (por defecto dist/)")
+    @click.option("--force", is_flag=True, help="Regenerar aunque estén al día")
+    def precompress_static(directory, force):
+        from api import compression
+
+        directory = directory or os.path.join(app.root_path, "..", "dist")
+        written = compression.precompress_directory(directory, app.config, force=force)
+        print(f"{written} precompressed files written in {os.path.abspath(directory)}")
@@ -0,0 +1,152 @@
+"""
+Compactación de la tabla `availability`.
+
+Con el uso, los bloqueos se solapan o quedan pegados unos a otros (el mismo
+cierre creado dos veces desde el admin, una prórroga añadida como bloqueo
+nuevo...). Cada fila de más alarga los escaneos de solape y el índice en
+memoria, así que aquí:
+
+1. Se fusionan los bloqueos de la misma habitación, tipo, marcas
+   (closed_manually, maintenance_block) y motivo que se solapan o se tocan
+   ([1, 5) + [5, 8) = [1, 8)). Sobrevive una fila por tramo, que se alarga,
+   y el resto se borra.
+2. Se archivan en `availability_history` los bloqueos ya vencidos
+   (end_date <= hoy: su última noche bloqueada fue ayer o antes).
+
+Lo ejecuta `flask compact-availability` (p. ej. cada noche) y, si
+`AVAILABILITY_COMPACT_ON_WRITE` está activo, también cada commit que toque
+bloqueos, limitado a las habitaciones y tipos afectados y sin archivar.
+Todo se hace con sentencias en bloque; los cambios se notifican con
+`record_change` para que el índice, la caché y los contadores se enteren.
+"""
+from datetime import date, datetime
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, or_
+from api.events import before_commit, record_change
+from api.models import db, Availability, AvailabilityHistory
+
+# Lo que debe coincidir para poder fusionar dos bloqueos
+MERGE_KEY = ("room_id", "room_type_id", "closed_manually", "maintenance_block", "reason")
+
+_COLUMNS = (
+    "id", "start_date", "end_date", "room_id", "room_type_id",
+    "closed_manually", "maintenance_block", "reason", "created_at",
+)
+
+
+def _merge_key(block):
+    return tuple(block[field] for field in MERGE_KEY)
+
+
+def coalesce(blocks, prefer=()):
+    """
+    Calcula la fusión de una lista de bloqueos (dicts con _COLUMNS).
+    Devuelve (updates, deletes): los supervivientes con sus nuevas fechas y
+    los ids que sobran. En cada tramo sobrevive, si lo hay, un bloqueo de
+    `prefer` (los recién escritos) y si no el que empieza antes.
+    """
+    updates, deletes = [], []
+    ordered = sorted(blocks, key=lambda b: (tuple(str(v) for v in _merge_key(b)), b["start_date"], b["id"]))
+
+    for _, group in groupby(ordered, key=lambda b: tuple(str(v) for v in _merge_key(b))):
+        runs = []
+        for block in group:
+            if runs and block["start_date"] <= runs[-1]["end_date"]:
+                run = runs[-1]
+                run["end_date"] = max(run["end_date"], block["end_date"])
+                run["blocks"].append(block)
+            else:
+                runs.append({"start_date": block["start_date"], "end_date": block["end_date"], "blocks": [block]})
+
+        for run in runs:
+            if len(run["blocks"]) == 1:
+                continue
+            survivor = next((b for b in run["blocks"] if b["id"] in prefer), run["blocks"][0])
+            updates.append({**survivor, "start_date": run["start_date"], "end_date": run["end_date"]})
+            deletes.extend(b for b in run["blocks"] if b is not survivor)
+
+    return updates, deletes
+
+
+def _load(session, conditions=()):
+    stmt = select(*[getattr(Availability, column) for column in _COLUMNS])
+    if conditions:
+        stmt = stmt.where(or_(*conditions))
+    return [dict(row._mapping) for row in session.execute(stmt)]
+
+
+def _apply(session, updates, deletes):
+    if updates:
+        # UPDATE por clave primaria en bloque (executemany)
+        session.execute(update(Availability), [
+            {"id": b["id"], "start_date": b["start_date"], "end_date": b["end_date"]} for b in updates
+        ])
+    if deletes:
+        session.execute(
+            delete(Availability).where(Availability.id.in_([b["id"] for b in deletes]))
+            .execution_options(synchronize_session=False)
+        )
+
+    for block in updates:
+        record_change(session, "update", Availability, block)
+    for block in deletes:
+        record_change(session, "delete", Availability, block)
+
+
+def archive_expired(session, today=None):
+    """Mueve a `availability_history` los bloqueos con end_date <= today."""
+    today = today or date.today()
+    expired = [
+        dict(row._mapping) for row in session.execute(
+            select(*[getattr(Availability, column) for column in _COLUMNS]).where(Availability.end_date <= today)
+        )
+    ]
+    if not expired:
+        return 0
+
+    now = datetime.utcnow()
+    session.execute(insert(AvailabilityHistory), [
+        {**{k: v for k, v in block.items() if k != "id"}, "original_id": block["id"], "archived_at": now}
+        for block in expired
+    ])
+    session.execute(
+        delete(Availability).where(Availability.id.in_([block["id"] for block in expired]))
+        .execution_options(synchronize_session=False)
+    )
+    for block in expired:
+        record_change(session, "delete", Availability, block)
+    return len(expired)
+
+
+def compact(archive=True, today=None):
+    """
+    Fusiona toda la tabla y archiva lo vencido. No hace commit.
+    Devuelve {"archived", "merged", "deleted"}.
+    """
+    session = db.session()
+    archived = archive_expired(session, today) if archive else 0
+    updates, deletes = coalesce(_load(session))
+    _apply(session, updates, deletes)
+    return {"archived": archived, "merged": len(updates), "deleted": len(deletes)}
+
+
+@before_commit(Availability)
+def _compact_on_write(session, changes):
+    if not current_app.config.get("AVAILABILITY_COMPACT_ON_WRITE"):
+        return
+
+    written = {c.values["id"] for c in changes if c.action != "delete"}
+    room_ids = {c.values.get("room_id") for c in changes} - {None}
+    room_type_ids = {c.values.get("room_type_id") for c in changes if not c.values.get("room_id")} - {None}
+    if not room_ids and not room_type_ids:
+        return
+
+    conditions = []
+    if room_ids:
+        conditions.append(Availability.room_id.in_(room_ids))
+    if room_type_ids:
+        conditions.append(Availability.room_id.is_(None) & Availability.room_type_id.in_(room_type_ids))
+
+    updates, deletes = coalesce(_load(session, conditions), prefer=written)
+    _apply(session, updates, deletes)
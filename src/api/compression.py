@@ -0,0 +1,175 @@
+"""
+Compresión gzip / brotli de las respuestas.
+
+- Respuestas dinámicas (JSON de la API, HTML...): se comprimen al vuelo si
+  el cliente lo acepta (Accept-Encoding), el tipo está en
+  `COMPRESS_MIMETYPES` y el cuerpo ocupa al menos `COMPRESS_MIN_SIZE`
+  bytes; por debajo de eso la cabecera y el coste de CPU no compensan.
+  Brotli solo se usa si el paquete `brotli` está instalado. Se aplica tanto
+  a las vistas Flask (after_request) como a las rutas asíncronas
+  (async_hotel.py). Las respuestas en streaming (exportaciones) y los
+  ficheros se dejan tal cual.
+- Estáticos de Vite (dist/): nunca se comprimen por petición.
+  `flask precompress-static` (en render_build.sh, tras `npm run build`) deja
+  junto a cada fichero su versión `.br` y `.gz`, y `send_static()` sirve la
+  mejor que acepte el cliente con el tipo de contenido del original.
+
+`COMPRESS=0` desactiva la compresión al vuelo.
+"""
+import gzip
+import mimetypes
+import os
+from flask import current_app, request, send_from_directory
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+DEFAULT_MIMETYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/wasm",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+)
+
+# Extensión de los ficheros precomprimidos, en orden de preferencia
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _accepts(accept, encoding):
+    return accept.quality(encoding) > 0
+
+
+def choose_encoding(accept_encoding, available=None):
+    """
+    Mejor codificación que acepta el cliente entre `available` (por defecto
+    las que se pueden generar al vuelo). Acepta la cabecera o un objeto Accept.
+    """
+    if isinstance(accept_encoding, str) or accept_encoding is None:
+        accept_encoding = parse_accept_header(accept_encoding or "")
+    if available is None:
+        available = ("br", "gzip") if brotli is not None else ("gzip",)
+    for encoding in available:
+        if _accepts(accept_encoding, encoding):
+            return encoding
+    return None
+
+
+def compressible(mimetype, config):
+    mimetype = (mimetype or "").split(";")[0].strip().lower()
+    return mimetype in config.get("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+
+
+def compress(body, encoding, config):
+    if encoding == "br":
+        return brotli.compress(body, quality=config.get("COMPRESS_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY))
+    return gzip.compress(body, compresslevel=config.get("COMPRESS_GZIP_LEVEL", DEFAULT_GZIP_LEVEL), mtime=0)
+
+
+def compress_body(config, accept_encoding, status, mimetype, body):
+    """
+    (cuerpo, codificación o None, añadir Vary) para una respuesta ya
+    generada. Lo comparten el after_request de Flask y la app ASGI.
+    """
+    if not config.get("COMPRESS", True) or not compressible(mimetype, config):
+        return body, None, False
+    if status < 200 or status in (204, 206, 304) or len(body) < config.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE):
+        return body, None, True
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return body, None, True
+    compressed = compress(body, encoding, config)
+    if len(compressed) >= len(body):
+        return body, None, True
+    return compressed, encoding, True
+
+
+def _compress_response(response):
+    if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+        return response
+
+    body, encoding, vary = compress_body(
+        current_app.config, request.accept_encodings, response.status_code, response.mimetype, response.get_data())
+    if vary:
+        response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # El cuerpo ya no es el mismo byte a byte: un ETag fuerte pasa a débil
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def send_static(directory, path):
+    """Fichero de `directory` o su versión .br/.gz si existe y el cliente la acepta."""
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    for encoding, extension in PRECOMPRESSED:
+        if _accepts(request.accept_encodings, encoding) and os.path.isfile(os.path.join(directory, path + extension)):
+            response = send_from_directory(directory, path + extension, mimetype=mimetype)
+            response.headers["Content-Encoding"] = encoding
+            response.vary.add("Accept-Encoding")
+            return response
+
+    response = send_from_directory(directory, path)
+    if compressible(mimetype, current_app.config):
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def precompress_directory(directory, config, force=False):
+    """
+    Escribe `fichero.gz` (y `fichero.br` si hay brotli) junto a cada fichero
+    comprimible de `directory` con el nivel máximo. Devuelve cuántos ha escrito.
+    """
+    min_size = config.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE)
+    encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.insert(0, (".br", lambda data: brotli.compress(data, quality=11)))
+
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith((".gz", ".br")):
+                continue
+            source = os.path.join(root, name)
+            if os.path.getsize(source) < min_size or not compressible(mimetypes.guess_type(name)[0], config):
+                continue
+
+            data = None
+            for extension, encode in encoders:
+                target = source + extension
+                if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                    continue
+                if data is None:
+                    with open(source, "rb") as f:
+                        data = f.read()
+                compressed = encode(data)
+                if len(compressed) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                with open(target, "wb") as f:
+                    f.write(compressed)
+                written += 1
+    return written
+
+
+def init_app(app):
+    app.after_request(_compress_response)
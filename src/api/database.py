@@ -0,0 +1,179 @@
+"""
+Configuración del motor de base de datos a partir de variables de entorno.
+
+- DATABASE_URL: si no existe se usa el SQLite local (src/local.db). Las URL
+  `postgres://` de Heroku/Render se convierten a `postgresql://`.
+- DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE y
+  DB_POOL_PRE_PING: tamaño y comportamiento del pool (solo PostgreSQL).
+- DB_STATEMENT_TIMEOUT_MS: statement_timeout de PostgreSQL (0 = sin límite).
+- DB_BUSY_TIMEOUT_MS: espera ante bloqueos en SQLite, que además se abre en
+  modo WAL para que las lecturas no bloqueen a las escrituras.
+
+`create_async_db_engine()` crea el motor equivalente con driver asíncrono
+para el servidor ASGI (asgi.py).
+
+El pool va instrumentado: `pool_metrics()` devuelve cuántas conexiones hay
+prestadas, el desbordamiento y el tiempo total esperado para conseguir una,
+lo necesario para dimensionar workers frente a la base de datos.
+"""
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from api.models import db
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "local.db")
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 0 if timed_out else 1
+            self.timeouts += 1 if timed_out else 0
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto se espera para obtener una conexión."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def database_url():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        return f"sqlite:///{DEFAULT_SQLITE_PATH}"
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def engine_options(url):
+    options = {"poolclass": InstrumentedQueuePool}
+
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url in ("sqlite://", "sqlite:///"):
+            # Una base de datos en memoria no admite pool de varias conexiones
+            options.pop("poolclass")
+        return options
+
+    options.update({
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    })
+
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    if statement_timeout and url.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def _setup_sqlite(engine):
+    busy_timeout = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.close()
+
+
+def setup_database(app):
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == "sqlite":
+            _setup_sqlite(engine)
+        event.listen(engine, "connect", lambda *args: pool_stats.record_connect())
+
+
+def async_database_url(url):
+    """La misma base de datos con driver asíncrono (aiosqlite / asyncpg)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+def async_engine_options(url):
+    options = engine_options(url)
+    # El pool asíncrono lo elige SQLAlchemy (AsyncAdaptedQueuePool)
+    options.pop("poolclass", None)
+    if "connect_args" in options:
+        statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout)}}
+    return options
+
+
+def create_async_db_engine():
+    """Motor asíncrono para el servidor ASGI (asgi.py), con la misma configuración."""
+    url = database_url()
+    engine = create_async_engine(async_database_url(url), **async_engine_options(url))
+    if engine.dialect.name == "sqlite":
+        _setup_sqlite(engine.sync_engine)
+    return engine
+
+
+def pool_metrics():
+    """Estado del pool de este proceso y contadores acumulados."""
+    pool = db.engine.pool
+    metrics = {
+        "pool_class": type(pool).__name__,
+        "checkouts": pool_stats.checkouts,
+        "connects": pool_stats.connects,
+        "timeouts": pool_stats.timeouts,
+        "wait_seconds_total": round(pool_stats.wait_seconds, 6),
+        "wait_seconds_max": round(pool_stats.max_wait_seconds, 6),
+    }
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    return metrics
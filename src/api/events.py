@@ -0,0 +1,154 @@
+"""
+Notificación de cambios confirmados (commit) en los modelos.
+
+Los listeners de mapper (after_insert/after_update/after_delete) se disparan
+durante el flush, antes de saber si la transacción llegará a confirmarse.
+Aquí se toma una foto de cada fila modificada en `after_flush` y se entrega a
+los callbacks registrados solo cuando la sesión hace commit; si hay rollback
+los cambios pendientes se descartan (con un savepoint, solo los hechos dentro
+de él).
+
+Funciona igual para las rutas REST y para las vistas de Flask-Admin, ya que
+ambas usan `db.session`.
+"""
+import logging
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+Change = namedtuple("Change", ["action", "model", "values", "previous"])
+
+_PENDING_KEY = "_pending_model_changes"
+_SAVEPOINTS_KEY = "_pending_model_savepoints"
+_listeners = {}
+_before_commit_listeners = {}
+
+MAX_BEFORE_COMMIT_ROUNDS = 10
+
+
+def on_commit(*models):
+    """
+    Registra un callback que recibirá la lista de `Change` de los modelos
+    indicados cada vez que una sesión confirme cambios sobre ellos.
+    """
+    def decorator(fn):
+        for model in models:
+            _listeners.setdefault(model, []).append(fn)
+        return fn
+    return decorator
+
+
+def before_commit(*models):
+    """
+    Registra un callback `fn(session, changes)` que se ejecuta dentro de la
+    transacción, justo antes del commit, si hay cambios en esos modelos.
+    Puede emitir SQL: lo que haga se confirma (o se deshace) junto con ellos.
+    """
+    def decorator(fn):
+        for model in models:
+            _before_commit_listeners.setdefault(model, []).append(fn)
+        return fn
+    return decorator
+
+
+def record_change(session, action, model, values, previous=None):
+    """
+    Registra un cambio manualmente. Necesario para operaciones masivas
+    (insert().values([...]), update() en bloque) que no pasan por la unidad
+    de trabajo del ORM y por tanto no aparecen en `session.new/dirty/deleted`.
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(
+        Change(action, model, dict(values), dict(previous or {}))
+    )
+
+
+def _snapshot(obj):
+    state = inspect(obj)
+    values = {attr.key: getattr(obj, attr.key) for attr in state.mapper.column_attrs}
+    previous = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.deleted:
+            previous[attr.key] = history.deleted[0]
+    return values, previous
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    if not _listeners and not _before_commit_listeners:
+        return
+
+    for action, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            model = type(obj)
+            if model not in _listeners and model not in _before_commit_listeners:
+                continue
+            if action == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            values, previous = _snapshot(obj)
+            record_change(session, action, model, values, previous)
+
+
+def _group_by_callback(changes, listeners):
+    by_callback = {}
+    for change in changes:
+        for callback in listeners.get(change.model, ()):
+            by_callback.setdefault(callback, []).append(change)
+    return by_callback
+
+
+@event.listens_for(Session, "before_commit")
+def _run_before_commit(session):
+    if not _before_commit_listeners:
+        return
+
+    # Los callbacks pueden provocar más cambios (p. ej. un pago que crea su
+    # reserva): se entregan en otra ronda hasta que no quede ninguno nuevo
+    done = 0
+    for _ in range(MAX_BEFORE_COMMIT_ROUNDS):
+        # El flush final del commit aún no ha ocurrido: se fuerza para ver todos los cambios
+        session.flush()
+        changes = session.info.get(_PENDING_KEY) or []
+        if len(changes) == done:
+            return
+        batch, done = changes[done:], len(changes)
+
+        for callback, callback_changes in _group_by_callback(batch, _before_commit_listeners).items():
+            callback(session, callback_changes)
+    raise RuntimeError("before_commit callbacks keep producing changes")
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    session.info.pop(_SAVEPOINTS_KEY, None)
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+
+    for callback, callback_changes in _group_by_callback(changes, _listeners).items():
+        try:
+            callback(callback_changes)
+        except Exception:
+            # El commit ya está hecho: un fallo aquí no debe romper la petición
+            logger.exception("Error en el listener de cambios %s", callback.__name__)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        marks = session.info.setdefault(_SAVEPOINTS_KEY, {})
+        marks[transaction] = len(session.info.get(_PENDING_KEY) or [])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session, previous_transaction):
+    marks = session.info.get(_SAVEPOINTS_KEY) or {}
+    if previous_transaction.nested:
+        # Deshacer un savepoint solo descarta lo registrado dentro de él
+        mark = marks.pop(previous_transaction, 0)
+        del (session.info.get(_PENDING_KEY) or [])[mark:]
+        return
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_SAVEPOINTS_KEY, None)
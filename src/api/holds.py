@@ -0,0 +1,252 @@
+"""
+Bloqueos temporales de inventario (holds) mientras el huésped paga.
+
+Entre la cotización y el pago otro cliente puede llevarse la última
+habitación, y crear una reserva `pending` para evitarlo ocupa el inventario
+para siempre si el pago no llega. Un hold descuenta las noches del tipo en
+`room_inventory` (mismo UPDATE condicional que una reserva) durante
+`INVENTORY_HOLD_TTL` segundos:
+
+- POST /holds lo crea con el precio ya calculado y POST /holds/<id>/payments
+  crea el pago pendiente asociado (Payments.hold_id).
+- Cuando ese pago pasa a `paid` (pasarela, admin...) el hold se convierte en
+  una reserva confirmada y pagada en la misma transacción, sin volver a
+  tocar el inventario. Si el hold ya había caducado se intenta reservar de
+  nuevo y, si no queda hueco, el cobro se guarda igualmente: el hold queda
+  en `conflict` y se encola `resolve_hold_conflict`, que reintenta la
+  reserva y, si sigue sin hueco, acaba `failed` en la cola de trabajos para
+  que recepción devuelva el cobro o recoloque al huésped.
+- Un barrido libera los caducados: un hilo en cada worker cada
+  `INVENTORY_HOLD_SWEEP_SECONDS` y `flask sweep-holds` para cron. Cada pasada
+  es un UPDATE ... RETURNING sobre el índice (status, expires_at), por lotes,
+  de modo que dos barridos a la vez nunca liberan el mismo hold dos veces.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update
+from api import inventory, jobs
+from api.events import before_commit
+from api.inventory import InventoryError
+from api.models import db, Bookings, Payments, InventoryHolds
+from api.pricing import quote_stay
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+CONVERTED = "converted"
+CONFLICT = "conflict"
+
+DEFAULT_TTL = 15 * 60
+DEFAULT_SWEEP_SECONDS = 60
+SWEEP_BATCH = 500
+
+
+def create_hold(user_id, room_type, check_in, check_out, guest_name=None, guest_email=None,
+                guest_phone=None, notes=None):
+    """Reserva el inventario de la estancia y crea el hold. No hace commit."""
+    quote = quote_stay(room_type, check_in, check_out)
+    inventory.allocate(room_type.id, check_in, check_out)
+
+    now = datetime.utcnow()
+    hold = InventoryHolds(
+        user_id=user_id,
+        room_type_id=room_type.id,
+        check_in=check_in,
+        check_out=check_out,
+        total_price=quote.total,
+        status=ACTIVE,
+        guest_name=guest_name,
+        guest_email=guest_email,
+        guest_phone=guest_phone,
+        notes=notes,
+        created_at=now,
+        expires_at=now + timedelta(seconds=current_app.config.get("INVENTORY_HOLD_TTL", DEFAULT_TTL)),
+    )
+    db.session.add(hold)
+    return hold
+
+
+def release_hold(hold):
+    """Libera un hold activo (el huésped abandona el pago). No hace commit."""
+    result = db.session.execute(
+        update(InventoryHolds)
+        .where(InventoryHolds.id == hold.id, InventoryHolds.status == ACTIVE)
+        .values(status="released")
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        inventory.release(hold.room_type_id, hold.check_in, hold.check_out)
+    db.session.expire(hold)
+    return bool(result.rowcount)
+
+
+def release_expired(now=None, batch=SWEEP_BATCH):
+    """
+    Marca como `expired` hasta `batch` holds vencidos y devuelve sus noches
+    al inventario. No hace commit. Devuelve cuántos ha liberado.
+    """
+    now = now or datetime.utcnow()
+    due = (
+        select(InventoryHolds.id)
+        .where(InventoryHolds.status == ACTIVE, InventoryHolds.expires_at <= now)
+        .order_by(InventoryHolds.expires_at)
+        .limit(batch)
+    )
+    # Solo se liberan las filas que esta sentencia ha pasado de active a expired
+    rows = db.session.execute(
+        update(InventoryHolds)
+        .where(InventoryHolds.id.in_(due.scalar_subquery()), InventoryHolds.status == ACTIVE)
+        .values(status="expired")
+        .returning(InventoryHolds.room_type_id, InventoryHolds.check_in, InventoryHolds.check_out)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # Un UPDATE del libro por estancia distinta, no por hold
+    for (room_type_id, check_in, check_out), quantity in Counter(rows).items():
+        inventory.release(room_type_id, check_in, check_out, quantity=quantity)
+    return len(rows)
+
+
+def sweep(now=None, batch=SWEEP_BATCH):
+    """Libera todos los holds vencidos, confirmando cada lote. Devuelve el total."""
+    total = 0
+    while True:
+        released = release_expired(now, batch)
+        db.session.commit()
+        total += released
+        if released < batch:
+            return total
+
+
+def _sweeper_loop(app, interval, stop):
+    while not stop.wait(interval):
+        with app.app_context():
+            try:
+                released = sweep()
+                if released:
+                    logger.info("%s inventory holds expired", released)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Error liberando holds caducados")
+            finally:
+                db.session.remove()
+
+
+def start_sweeper(app):
+    """Arranca el barrido en un hilo de fondo (0 segundos = desactivado)."""
+    interval = app.config.get("INVENTORY_HOLD_SWEEP_SECONDS", DEFAULT_SWEEP_SECONDS)
+    if not interval:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(target=_sweeper_loop, args=(app, interval, stop), name="hold-sweeper", daemon=True)
+    thread.start()
+    return stop
+
+
+def _create_booking(session, hold, payment):
+    if hold.status != ACTIVE:
+        # El barrido ya devolvió las noches: reservarlas otra vez si queda hueco
+        inventory.allocate(hold.room_type_id, hold.check_in, hold.check_out)
+
+    nights = (hold.check_out - hold.check_in).days
+    booking = Bookings(
+        user_id=hold.user_id,
+        room_type_id=hold.room_type_id,
+        check_in=hold.check_in,
+        check_out=hold.check_out,
+        nights=nights,
+        status="confirmed",
+        price_per_night=round(hold.total_price / nights, 2),
+        total_price=hold.total_price,
+        payment_status="paid",
+        payment_method=payment.method,
+        guest_name=hold.guest_name,
+        guest_email=hold.guest_email,
+        guest_phone=hold.guest_phone,
+        notes=hold.notes,
+    )
+    session.add(booking)
+    session.flush()
+
+    hold.status = CONVERTED
+    hold.booking_id = booking.id
+    _link_payments(session, hold, booking.id)
+    payment.booking_id = booking.id
+    return booking.id
+
+
+def _link_payments(session, hold, booking_id):
+    # Todos los pagos del hold (reintentos, cobros duplicados) quedan con la reserva para conciliarlos
+    unlinked = select(Payments).where(Payments.hold_id == hold.id, Payments.booking_id.is_(None))
+    for other in session.scalars(unlinked):
+        other.booking_id = booking_id
+
+
+def convert(session, hold, payment):
+    """
+    Crea la reserva pagada de un hold y la enlaza con el hold y con todos sus
+    pagos; un pago posterior de un hold ya convertido se enlaza con la misma
+    reserva. Nunca lanza: si no se puede crear, el hold queda en `conflict` con un
+    trabajo `resolve_hold_conflict` encolado y devuelve None.
+    """
+    if hold.status == CONVERTED:
+        # Otro pago del mismo hold que llega después: se enlaza con la misma reserva
+        logger.warning("Hold %s was already converted: payment %s linked to booking %s (duplicate charge?)",
+                       hold.id, payment.id, hold.booking_id)
+        payment.booking_id = hold.booking_id
+        return hold.booking_id
+    if hold.status == CONFLICT:
+        return None
+
+    try:
+        # En un savepoint: si falla, el descuento a medias del inventario se deshace
+        # y el cambio del pago que provocó la conversión sigue en la transacción
+        with session.begin_nested():
+            return _create_booking(session, hold, payment)
+    except InventoryError:
+        logger.warning("Hold %s was paid after expiring and its nights are sold out (payment %s)",
+                       hold.id, payment.id)
+    except Exception:
+        logger.exception("Error convirtiendo el hold %s pagado (pago %s)", hold.id, payment.id)
+
+    hold.status = CONFLICT
+    jobs.enqueue("resolve_hold_conflict", hold_id=hold.id, payment_id=payment.id)
+    return None
+
+
+@jobs.job("resolve_hold_conflict")
+def resolve_conflict(hold_id, payment_id):
+    """
+    Reintenta crear la reserva de un hold cobrado que se quedó sin hueco. Si
+    sigue sin haberlo, falla; agotados los intentos queda `failed` en la cola
+    con el motivo para devolver el cobro o recolocar al huésped a mano.
+    """
+    hold = db.session.get(InventoryHolds, hold_id, with_for_update=True)
+    payment = db.session.get(Payments, payment_id)
+    if hold is None or payment is None or hold.status != CONFLICT or payment.status != "paid":
+        return
+    try:
+        _create_booking(db.session, hold, payment)
+    except InventoryError:
+        raise InventoryError(
+            f"Hold {hold_id} was paid (payment {payment_id}) but its nights are sold out: "
+            "refund the payment or rebook the guest manually"
+        )
+
+
+@before_commit(Payments)
+def _convert_paid_holds(session, changes):
+    for change in changes:
+        values = change.values
+        if change.action == "delete" or values.get("status") != "paid":
+            continue
+        if not values.get("hold_id") or values.get("booking_id"):
+            continue
+
+        hold = session.get(InventoryHolds, values["hold_id"], with_for_update=True)
+        payment = session.get(Payments, values["id"])
+        if hold is not None and payment is not None:
+            convert(session, hold, payment)
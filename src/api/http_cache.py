@@ -0,0 +1,89 @@
+"""
+GET condicionales (ETag / Last-Modified) para el catálogo y la disponibilidad.
+
+Cada tabla vigilada tiene una fila en `change_counters` que se incrementa en
+la misma transacción que la modifica, así que la versión es la misma para
+todos los workers. Con ella se calcula el ETag de la respuesta antes de
+consultar o serializar nada: si coincide con `If-None-Match` (o no hay
+cambios desde `If-Modified-Since`) se responde 304 directamente.
+"""
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy import select, update, insert
+from werkzeug.http import is_resource_modified
+from api.events import before_commit
+from api.models import db, RoomTypes, Rooms, Availability, PricingRules, ChangeCounters
+
+
+@before_commit(RoomTypes, Rooms, Availability, PricingRules)
+def _bump_change_counters(session, changes):
+    now = datetime.utcnow()
+    for name in sorted({change.model.__tablename__ for change in changes}):
+        result = session.execute(
+            update(ChangeCounters)
+            .where(ChangeCounters.name == name)
+            .values(version=ChangeCounters.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            session.execute(insert(ChangeCounters).values(name=name, version=1, updated_at=now))
+
+
+def versions_stmt(names):
+    return (
+        select(ChangeCounters.name, ChangeCounters.version, ChangeCounters.updated_at)
+        .where(ChangeCounters.name.in_(names))
+    )
+
+
+def versions_from_rows(names, rows):
+    """{name: (version, updated_at)}; las tablas sin contador quedan en versión 0."""
+    found = {row.name: (row.version, row.updated_at) for row in rows}
+    return {name: found.get(name, (0, None)) for name in names}
+
+
+def validators(versions):
+    """ETag y Last-Modified que corresponden a unas versiones."""
+    etag = ".".join(f"{name}{version}" for name, (version, _) in versions.items())
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    return etag, max(stamps) if stamps else None
+
+
+def resource_versions(*names):
+    """Versión actual de cada tabla (una consulta por petición, se guarda en `g`)."""
+    cached = g.setdefault("resource_versions", {})
+    missing = [name for name in names if name not in cached]
+    if missing:
+        rows = db.session.execute(versions_stmt(missing)).all()
+        cached.update(versions_from_rows(missing, rows))
+    return {name: cached[name] for name in names}
+
+
+def conditional(*names):
+    """
+    Decorador para rutas GET cuyo contenido depende solo de las tablas `names`
+    (y de la URL). Añade ETag/Last-Modified y responde 304 si el cliente ya
+    tiene la versión actual.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = validators(resource_versions(*names))
+            g.etag = etag
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Se puede guardar, pero hay que revalidar siempre
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+    return decorator
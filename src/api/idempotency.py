@@ -0,0 +1,180 @@
+"""
+Peticiones POST idempotentes con la cabecera `Idempotency-Key`.
+
+Si el frontend no recibe respuesta a tiempo y reintenta POST /bookings, el
+reintento no debe crear otra reserva. El cliente envía la misma clave (un
+UUID por intento de compra) en todos los reintentos:
+
+1. La primera petición inserta la clave en `idempotency_keys` en estado
+   `processing` y la confirma antes de ejecutar la vista. La restricción
+   única (user_id, key) hace que, si llegan dos a la vez, solo una la
+   inserte: la otra espera unos segundos a que termine y, si no, responde
+   409 para que el cliente vuelva a intentarlo.
+2. Si la vista responde 2xx se guardan el código y el cuerpo, y los
+   reintentos reciben exactamente esa respuesta (con `Idempotent-Replayed:
+   true`) leyendo solo esta tabla, sin tocar reservas ni inventario.
+   Cualquier otra respuesta o excepción borra la clave, de modo que el
+   cliente puede corregir la petición y reintentar con la misma clave.
+3. Reutilizar la clave con otro cuerpo u otra ruta es un error (422).
+
+Las claves caducan a las `IDEMPOTENCY_TTL` segundos (24 h por defecto) y las
+que se quedan en `processing` porque el worker murió se pueden retomar pasados
+`IDEMPOTENCY_LOCK_SECONDS`. `flask purge-idempotency-keys` borra las
+caducadas usando el índice de expires_at.
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from api.models import db, IdempotencyKeys
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_LOCK_SECONDS = 60
+DEFAULT_WAIT_SECONDS = 2
+POLL_SECONDS = 0.1
+
+PURGE_BATCH = 1000
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _claim(user_id, key, fingerprint):
+    """
+    Intenta quedarse con la clave. Devuelve (registro, True) si esta petición
+    debe ejecutar la vista, o (registro existente, False) si no.
+    """
+    config = current_app.config
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=config.get("IDEMPOTENCY_TTL", DEFAULT_TTL))
+
+    record = db.session.scalars(
+        select(IdempotencyKeys).where(IdempotencyKeys.user_id == user_id, IdempotencyKeys.key == key)
+    ).first()
+
+    if record is None:
+        record = IdempotencyKeys(
+            user_id=user_id, key=key, endpoint=request.endpoint or request.path, request_hash=fingerprint,
+            status="processing", created_at=now, locked_at=now, expires_at=expires_at,
+        )
+        db.session.add(record)
+        try:
+            db.session.commit()
+            return record, True
+        except IntegrityError:
+            # Otra petición con la misma clave la insertó primero
+            db.session.rollback()
+            return None, False
+
+    stale = now - timedelta(seconds=config.get("IDEMPOTENCY_LOCK_SECONDS", DEFAULT_LOCK_SECONDS))
+    if record.expires_at > now and not (record.status == "processing" and record.locked_at < stale):
+        return record, False
+
+    # Caducada o abandonada: retomarla solo si nadie se ha adelantado
+    result = db.session.execute(
+        update(IdempotencyKeys)
+        .where(IdempotencyKeys.id == record.id, IdempotencyKeys.locked_at == record.locked_at)
+        .values(endpoint=request.endpoint or request.path, request_hash=fingerprint, status="processing",
+                response_status=None, response_body=None, response_mimetype=None,
+                created_at=now, locked_at=now, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        return None, False
+    db.session.refresh(record)
+    return record, True
+
+
+def _replay(record):
+    response = current_app.response_class(
+        record.response_body, status=record.response_status, mimetype=record.response_mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _finish(record, response):
+    if 200 <= response.status_code < 300:
+        record.status = "completed"
+        record.response_status = response.status_code
+        record.response_body = response.get_data(as_text=True)
+        record.response_mimetype = response.mimetype
+    else:
+        db.session.delete(record)
+    db.session.commit()
+
+
+def idempotent(view):
+    """
+    Decorador para rutas POST con JWT (ponerlo debajo de @jwt_required()).
+    Sin cabecera Idempotency-Key la vista se ejecuta como siempre.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters"}), 400
+
+        user_id = int(get_jwt_identity())
+        fingerprint = _fingerprint()
+        deadline = time.monotonic() + current_app.config.get("IDEMPOTENCY_WAIT_SECONDS", DEFAULT_WAIT_SECONDS)
+
+        while True:
+            record, claimed = _claim(user_id, key, fingerprint)
+            if claimed:
+                break
+            if record is not None:
+                if record.request_hash != fingerprint:
+                    return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+                if record.status == "completed":
+                    return _replay(record)
+            if time.monotonic() >= deadline:
+                response = jsonify({"error": f"A request with this {HEADER} is still being processed"})
+                response.headers["Retry-After"] = "1"
+                return response, 409
+            # Cerrar la transacción para ver lo que confirme la otra petición
+            db.session.rollback()
+            time.sleep(POLL_SECONDS)
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.execute(delete(IdempotencyKeys).where(IdempotencyKeys.id == record.id))
+            db.session.commit()
+            raise
+
+        _finish(record, response)
+        return response
+
+    return wrapper
+
+
+def purge_expired(now=None):
+    """Borra las claves caducadas por lotes. Devuelve cuántas."""
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        ids = db.session.scalars(
+            select(IdempotencyKeys.id).where(IdempotencyKeys.expires_at <= now).limit(PURGE_BATCH)
+        ).all()
+        if not ids:
+            return total
+        db.session.execute(delete(IdempotencyKeys).where(IdempotencyKeys.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
@@ -0,0 +1,274 @@
+"""
+Instrumentación por petición: tiempo total, número de sentencias SQL, tiempo
+en la base de datos y tiempo de serialización.
+
+- Las sentencias se cuentan con los eventos `before_cursor_execute` /
+  `after_cursor_execute` del motor de SQLAlchemy, así que entran también las
+  cargas perezosas de relaciones (los N+1 de los `serialize()`).
+- La serialización suma la codificación del proveedor JSON de la app
+  (api/json_provider.py) y los bloques marcados con `with timed("serialize"):` en las vistas.
+- Cada respuesta lleva la cabecera `Server-Timing` (visible en la pestaña
+  Network del navegador) salvo con `SERVER_TIMING=0`:
+
+      Server-Timing: app;dur=41.2, db;dur=30.5;desc="12 queries", serialize;dur=6.1
+
+- GET /metrics expone los acumulados de este worker en formato de texto de
+  Prometheus, por ruta: peticiones, histograma de duración, sentencias y
+  tiempo SQL y de serialización, más el estado del pool de conexiones
+  (api/database.py). Con varios workers de gunicorn cada uno tiene los suyos.
+  Está desactivado (404) salvo que se defina `METRICS_TOKEN`, y entonces
+  exige `Authorization: Bearer <METRICS_TOKEN>` (`bearer_token` en Prometheus).
+- Con `PROFILE_SAMPLE_RATE` (0-1) una fracción de las peticiones se ejecuta
+  bajo cProfile y se guarda en `PROFILE_DIR` como fichero .prof (se abre con
+  `python -m pstats` o snakeviz); `PROFILE_MIN_MS` descarta las rápidas.
+- `SQL_STATEMENTS_WARN` escribe un aviso en el log cuando una petición
+  ejecuta más sentencias que ese número.
+
+Las vistas asíncronas (async_hotel.py) no pasan por Flask y no se miden aquí.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from api.database import pool_metrics
+from api.models import db
+
+logger = logging.getLogger(__name__)
+
+# Límites (en segundos) del histograma de duración de las peticiones
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.sql_started = None
+        self.timings = defaultdict(float)
+
+
+def current_stats():
+    """Estadísticas de la petición en curso (None fuera de una petición)."""
+    if not has_request_context():
+        return None
+    return g.get("request_stats")
+
+
+@contextmanager
+def timed(name):
+    """Suma la duración del bloque a la métrica `name` de la petición en curso."""
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] += time.perf_counter() - started
+
+
+class RouteMetrics:
+    """Acumulados por (método, ruta) de este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)
+            self.buckets = defaultdict(lambda: [0] * len(BUCKETS))
+            self.seconds = defaultdict(float)
+            self.sql_statements = defaultdict(int)
+            self.sql_seconds = defaultdict(float)
+            self.serialize_seconds = defaultdict(float)
+
+    def record(self, method, route, status, seconds, stats):
+        key = (method, route)
+        with self._lock:
+            self.requests[key + (status,)] += 1
+            counts = self.buckets[key]
+            for i, limit in enumerate(BUCKETS):
+                if seconds <= limit:
+                    counts[i] += 1
+            self.seconds[key] += seconds
+            self.sql_statements[key] += stats.sql_count
+            self.sql_seconds[key] += stats.sql_seconds
+            self.serialize_seconds[key] += stats.timings["serialize"]
+
+    def render(self):
+        """Texto en formato de exposición de Prometheus."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("http_requests_total", "counter", "Peticiones atendidas por este worker.")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            family("http_request_duration_seconds", "histogram", "Duración de las peticiones.")
+            totals = defaultdict(int)
+            for (method, route, _), count in self.requests.items():
+                totals[(method, route)] += count
+            for (method, route), counts in sorted(self.buckets.items()):
+                labels = f'method="{method}",route="{route}"'
+                for limit, count in zip(BUCKETS, counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{limit}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {totals[(method, route)]}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {self.seconds[(method, route)]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {totals[(method, route)]}")
+
+            for name, values, help_text in (
+                ("db_statements_total", self.sql_statements, "Sentencias SQL ejecutadas."),
+                ("db_statement_seconds_total", self.sql_seconds, "Tiempo en sentencias SQL."),
+                ("serialize_seconds_total", self.serialize_seconds, "Tiempo serializando respuestas."),
+            ):
+                family(name, "counter", help_text)
+                for (method, route), value in sorted(values.items()):
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {value:g}')
+
+        family("db_pool_connections", "gauge", "Conexiones del pool por estado.")
+        pool = pool_metrics()
+        for state in ("size", "checked_in", "checked_out", "overflow"):
+            if state in pool:
+                lines.append(f'db_pool_connections{{state="{state}"}} {pool[state]}')
+        for name, key, kind, help_text in (
+            ("db_pool_checkouts_total", "checkouts", "counter", "Conexiones prestadas por el pool."),
+            ("db_pool_connects_total", "connects", "counter", "Conexiones nuevas abiertas."),
+            ("db_pool_timeouts_total", "timeouts", "counter", "Esperas de conexión agotadas."),
+            ("db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Tiempo esperando una conexión."),
+            ("db_pool_wait_seconds_max", "wait_seconds_max", "gauge", "Espera máxima por una conexión."),
+        ):
+            family(name, kind, help_text)
+            lines.append(f"{name} {pool[key]}")
+        return "\n".join(lines) + "\n"
+
+
+route_metrics = RouteMetrics()
+
+
+# -------------------------------------------------
+# Eventos de SQLAlchemy
+# -------------------------------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None:
+        stats.sql_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None and stats.sql_started is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += time.perf_counter() - stats.sql_started
+        stats.sql_started = None
+
+
+# -------------------------------------------------
+# Ciclo de la petición
+# -------------------------------------------------
+def _start_request():
+    g.request_stats = RequestStats()
+    sample_rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0)
+    if sample_rate and random.random() < sample_rate:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def _server_timing(stats, total):
+    parts = [
+        f"app;dur={total * 1000:.1f}",
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"',
+    ]
+    parts.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stats.timings.items())
+    return ", ".join(parts)
+
+
+def _dump_profile(profiler, total):
+    config = current_app.config
+    if total * 1000 < config.get("PROFILE_MIN_MS", 0):
+        return
+    route = re.sub(r"[^0-9A-Za-z]+", "_", request.url_rule.rule if request.url_rule else "unmatched").strip("_")
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{route}-{total * 1000:.0f}ms.prof"
+    directory = config.get("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "profiles")
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, name))
+
+
+def _finish_request(response):
+    stats = g.pop("request_stats", None)
+    if stats is None:
+        return response
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+    total = time.perf_counter() - stats.started
+
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    route_metrics.record(request.method, route, response.status_code, total, stats)
+
+    config = current_app.config
+    if config.get("SERVER_TIMING", True):
+        response.headers["Server-Timing"] = _server_timing(stats, total)
+    sql_warn = config.get("SQL_STATEMENTS_WARN", 0)
+    if sql_warn and stats.sql_count > sql_warn:
+        logger.warning("%s %s ran %s SQL statements (%.1f ms)",
+                       request.method, request.path, stats.sql_count, stats.sql_seconds * 1000)
+    if profiler is not None:
+        _dump_profile(profiler, total)
+    return response
+
+
+def _stop_profiler(exc):
+    # Si la petición falló antes de after_request, el perfil se descarta
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+
+
+def metrics():
+    """Métricas de este worker en formato de Prometheus."""
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token:
+        return Response("Not Found", status=404, mimetype="text/plain")
+    sent = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+        return Response("Unauthorized", status=401, mimetype="text/plain",
+                        headers={"WWW-Authenticate": "Bearer"})
+    return Response(route_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+
+    # Serialización JSON de jsonify() y de las respuestas que devuelven dict/list
+    provider = app.json
+    encode = provider.response
+
+    def timed_response(*args, **kwargs):
+        with timed("serialize"):
+            return encode(*args, **kwargs)
+
+    provider.response = timed_response
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_stop_profiler)
+    app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
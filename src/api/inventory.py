@@ -0,0 +1,234 @@
+"""
+Libro de inventario por (tipo de habitación, noche).
+
+Cada fila de `room_inventory` guarda cuántas habitaciones de un tipo están
+vendidas esa noche; la capacidad es `RoomTypes.total_rooms` menos las
+habitaciones fuera de servicio (bloqueo propio en Availability).
+
+Reservar una estancia es un único UPDATE condicional sobre todas sus noches:
+solo se incrementan las filas con hueco libre y, si el número de filas
+afectadas no coincide con el de noches, la operación falla y la transacción
+debe deshacerse. Al ser un UPDATE, la base de datos bloquea las filas
+afectadas, así que dos workers que compiten por la última habitación se
+serializan y el segundo ve el valor ya confirmado por el primero.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import db, RoomTypes, Rooms, Availability, Bookings, RoomInventory, InventoryHolds
+from api.utils import APIException
+
+# Estados de reserva que no ocupan inventario
+RELEASED_STATUSES = ("cancelled",)
+
+
+class InventoryError(APIException):
+    status_code = 409
+
+
+def _nights(check_in, check_out):
+    return [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
+
+
+def _insert_ignore(rows):
+    """INSERT ... ON CONFLICT DO NOTHING para las noches que otro worker ya creó."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(RoomInventory).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(RoomInventory).on_conflict_do_nothing()
+    else:
+        stmt = insert(RoomInventory)
+    db.session.execute(stmt, rows)
+
+
+def booked_counts(room_type_id, start, end):
+    """Cuenta por noche las reservas activas de un tipo en [start, end)."""
+    stays = db.session.execute(
+        select(Bookings.check_in, Bookings.check_out).where(
+            Bookings.room_type_id == room_type_id,
+            Bookings.status.notin_(RELEASED_STATUSES),
+            Bookings.check_in < end,
+            Bookings.check_out > start,
+        )
+    ).all()
+
+    counts = Counter()
+    for check_in, check_out in stays:
+        counts.update(_nights(max(check_in, start), min(check_out, end)))
+    return counts
+
+
+def ensure_nights(room_type_id, check_in, check_out):
+    """Crea las filas del libro que falten para el rango, partiendo de las reservas existentes."""
+    existing = set(db.session.scalars(
+        select(RoomInventory.night).where(
+            RoomInventory.room_type_id == room_type_id,
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+        )
+    ))
+    missing = [night for night in _nights(check_in, check_out) if night not in existing]
+    if not missing:
+        return
+
+    counts = booked_counts(room_type_id, missing[0], missing[-1] + timedelta(days=1))
+    _insert_ignore([
+        {"room_type_id": room_type_id, "night": night, "sold": counts.get(night, 0)}
+        for night in missing
+    ])
+
+
+def blocked_rooms_stmt(room_type_id, check_in, check_out):
+    """Número de habitaciones del tipo con algún bloqueo propio en [check_in, check_out)."""
+    return (
+        select(func.count(func.distinct(Availability.room_id)))
+        .join(Rooms, Rooms.id == Availability.room_id)
+        .where(
+            Rooms.room_type_id == room_type_id,
+            Availability.start_date < check_out,
+            Availability.end_date > check_in,
+        )
+    )
+
+
+def allocate(room_type_id, check_in, check_out, quantity=1):
+    """
+    Descuenta `quantity` habitaciones en todas las noches de la estancia con
+    una sola sentencia. La capacidad es `total_rooms` menos las habitaciones
+    bloqueadas en la estancia. Lanza InventoryError si alguna noche no tiene hueco.
+    """
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        raise InventoryError("check_out must be after check_in", status_code=400)
+
+    ensure_nights(room_type_id, check_in, check_out)
+
+    capacity = select(RoomTypes.total_rooms).where(
+        RoomTypes.id == room_type_id).scalar_subquery()
+    # Las habitaciones con bloqueo propio en la estancia no se pueden vender
+    # (misma regla que combine_free_counts) y un cierre del tipo lo agota
+    blocked = blocked_rooms_stmt(room_type_id, check_in, check_out).scalar_subquery()
+    closed = select(Availability.id).where(
+        Availability.room_type_id == room_type_id,
+        Availability.room_id.is_(None),
+        Availability.start_date < check_out,
+        Availability.end_date > check_in,
+    ).exists()
+
+    result = db.session.execute(
+        update(RoomInventory)
+        .where(
+            RoomInventory.room_type_id == room_type_id,
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+            RoomInventory.sold + quantity <= capacity - blocked,
+            ~closed,
+        )
+        .values(sold=RoomInventory.sold + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount != nights:
+        raise InventoryError("No rooms available for the selected dates")
+
+
+def release(room_type_id, check_in, check_out, quantity=1):
+    """Devuelve al inventario las noches de una estancia (una sola sentencia)."""
+    db.session.execute(
+        update(RoomInventory)
+        .where(
+            RoomInventory.room_type_id == room_type_id,
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+            RoomInventory.sold >= quantity,
+        )
+        .values(sold=RoomInventory.sold - quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def free_counts_statements(room_type_ids, check_in, check_out, blocked_room_ids=()):
+    """
+    Consultas de `free_counts`: máximo vendido por tipo en el rango y número
+    de habitaciones con bloqueo propio por tipo (None si no hay bloqueos).
+    Se comparten con la ruta asíncrona (api/async_hotel.py).
+    """
+    max_sold = (
+        select(RoomInventory.room_type_id, func.max(RoomInventory.sold))
+        .where(
+            RoomInventory.room_type_id.in_(room_type_ids),
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+        )
+        .group_by(RoomInventory.room_type_id)
+    )
+
+    blocked_rooms = None
+    if blocked_room_ids:
+        blocked_rooms = (
+            select(Rooms.room_type_id, func.count(Rooms.id))
+            .where(Rooms.id.in_(blocked_room_ids), Rooms.room_type_id.in_(room_type_ids))
+            .group_by(Rooms.room_type_id)
+        )
+    return max_sold, blocked_rooms
+
+
+def combine_free_counts(room_types, max_sold, blocked_rooms, blocked_type_ids=()):
+    """Capacidad menos vendidas y bloqueadas, por tipo, a partir de las dos consultas."""
+    counts = {}
+    for rt in room_types:
+        if rt.id in blocked_type_ids:
+            counts[rt.id] = 0
+            continue
+        free = rt.total_rooms - max_sold.get(rt.id, 0) - blocked_rooms.get(rt.id, 0)
+        counts[rt.id] = max(free, 0)
+    return counts
+
+
+def free_counts(room_types, check_in, check_out, blocked_room_ids=(), blocked_type_ids=()):
+    """
+    Habitaciones libres en todas las noches de [check_in, check_out) para
+    varios tipos a la vez: capacidad menos el máximo vendido en el rango y
+    menos las habitaciones con bloqueo propio. Como mucho dos consultas.
+    """
+    room_type_ids = [rt.id for rt in room_types]
+    if not room_type_ids:
+        return {}
+
+    max_sold_stmt, blocked_stmt = free_counts_statements(room_type_ids, check_in, check_out, blocked_room_ids)
+    max_sold = dict(db.session.execute(max_sold_stmt).all())
+    blocked_rooms = dict(db.session.execute(blocked_stmt).all()) if blocked_stmt is not None else {}
+    return combine_free_counts(room_types, max_sold, blocked_rooms, blocked_type_ids)
+
+
+def rebuild(since=None):
+    """Reconstruye el libro completo (o desde `since`) a partir de las reservas."""
+    stmt = select(Bookings.room_type_id, Bookings.check_in, Bookings.check_out).where(
+        Bookings.status.notin_(RELEASED_STATUSES))
+    purge = delete(RoomInventory)
+    if since is not None:
+        stmt = stmt.where(Bookings.check_out > since)
+        purge = purge.where(RoomInventory.night >= since)
+
+    # Los holds de pago aún vigentes también ocupan sus noches (api/holds.py)
+    holds = select(InventoryHolds.room_type_id, InventoryHolds.check_in, InventoryHolds.check_out).where(
+        InventoryHolds.status == "active", InventoryHolds.expires_at > datetime.utcnow())
+    if since is not None:
+        holds = holds.where(InventoryHolds.check_out > since)
+
+    counts = Counter()
+    for rows in (db.session.execute(stmt), db.session.execute(holds)):
+        for room_type_id, check_in, check_out in rows:
+            start = max(check_in, since) if since else check_in
+            counts.update((room_type_id, night) for night in _nights(start, check_out))
+
+    db.session.execute(purge)
+    if counts:
+        db.session.execute(insert(RoomInventory), [
+            {"room_type_id": room_type_id, "night": night, "sold": sold}
+            for (room_type_id, night), sold in counts.items()
+        ])
+    db.session.commit()
+    return len(counts)
@@ -0,0 +1,280 @@
+"""
+Cola de trabajos en segundo plano guardada en la base de datos (`jobs`).
+
+Lo que no hace falta para responder al huésped (asignar habitación y, más
+adelante, correos, conciliación de pagos...) se encola con `enqueue()` en la
+misma transacción que lo provoca: si la reserva no llega a confirmarse el
+trabajo tampoco existe, y si el proceso se reinicia sigue en la tabla.
+
+- `@job("nombre")` registra la función que lo ejecuta. Recibe el payload
+  como argumentos con nombre, no hace commit (el runner confirma su trabajo
+  junto con el estado `done`) y debe poder repetirse sin efectos dobles:
+  un trabajo se reintenta si falla o si su worker muere a medias.
+- `JobRunner` reparte los trabajos vencidos entre `JOBS_WORKERS` hilos. Cada
+  worker de gunicorn / uvicorn arranca uno (`start_job_runner`, 0 =
+  desactivado) y `flask jobs-worker` lo ejecuta como proceso aparte. Se
+  reclaman con un UPDATE ... RETURNING condicionado al estado, como el
+  barrido de holds, así que dos runners nunca se llevan el mismo trabajo.
+- Cada commit que encola algo despierta al runner de este proceso; los de
+  otros procesos lo ven en su siguiente sondeo (`JOBS_POLL_SECONDS`).
+- Un fallo se reintenta con espera exponencial (`JOBS_RETRY_BASE_SECONDS`
+  × 2^(intento - 1), ±20 % y como mucho una hora) hasta `max_attempts`;
+  después queda `failed` con el error en `last_error`. Los `running` que
+  llevan más de `JOBS_LOCK_TIMEOUT` segundos (worker caído) vuelven a la
+  cola, y los `done` se borran a los `JOBS_KEEP_DAYS` días.
+"""
+import json
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select, update
+from api.events import on_commit
+from api.models import db, Jobs
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+DEFAULT_WORKERS = 2
+DEFAULT_POLL_SECONDS = 5
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BASE_SECONDS = 10
+DEFAULT_LOCK_TIMEOUT = 10 * 60
+DEFAULT_KEEP_DAYS = 7
+MAX_RETRY_SECONDS = 3600
+# Cada cuánto el runner devuelve a la cola los trabajos abandonados y borra los antiguos
+MAINTENANCE_SECONDS = 60
+
+_handlers = {}
+_wakeup = threading.Event()
+
+
+def job(name, max_attempts=None):
+    """Registra la función que ejecuta los trabajos `name`."""
+    def decorator(fn):
+        _handlers[name] = (fn, max_attempts)
+        return fn
+    return decorator
+
+
+def enqueue(name, delay=0, **payload):
+    """Añade un trabajo a la sesión; se guarda con el commit de quien lo encola. No hace commit."""
+    if name not in _handlers:
+        raise ValueError(f"Unknown job: {name}")
+    _, max_attempts = _handlers[name]
+    now = datetime.utcnow()
+    entry = Jobs(
+        name=name,
+        payload=json.dumps(payload),
+        status=QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or current_app.config.get("JOBS_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS),
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+    )
+    db.session.add(entry)
+    return entry
+
+
+@on_commit(Jobs)
+def _wake_runner(changes):
+    if any(change.action == "insert" for change in changes):
+        _wakeup.set()
+
+
+def retry_delay(attempts, base):
+    """Segundos hasta el siguiente intento tras `attempts` fallos."""
+    delay = min(base * 2 ** (attempts - 1), MAX_RETRY_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(limit, now=None):
+    """
+    Pasa a `running` hasta `limit` trabajos vencidos y los devuelve como
+    filas (id, name, payload, attempts, max_attempts). Hace commit.
+    """
+    now = now or datetime.utcnow()
+    due = (
+        select(Jobs.id)
+        .where(Jobs.status == QUEUED, Jobs.run_at <= now)
+        .order_by(Jobs.run_at, Jobs.id)
+        .limit(limit)
+    )
+    # Solo son nuestros los que esta sentencia ha pasado de queued a running
+    rows = db.session.execute(
+        update(Jobs)
+        .where(Jobs.id.in_(due.scalar_subquery()), Jobs.status == QUEUED)
+        .values(status=RUNNING, locked_at=now, attempts=Jobs.attempts + 1)
+        .returning(Jobs.id, Jobs.name, Jobs.payload, Jobs.attempts, Jobs.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return rows
+
+
+def _finish(job_id, **values):
+    db.session.execute(
+        update(Jobs).where(Jobs.id == job_id, Jobs.status == RUNNING).values(locked_at=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def execute(row):
+    """Ejecuta un trabajo reclamado y guarda el resultado (o programa el reintento)."""
+    job_id, name, payload, attempts, max_attempts = row
+    try:
+        if name not in _handlers:
+            raise LookupError(f"No handler registered for job '{name}'")
+        handler, _ = _handlers[name]
+        handler(**json.loads(payload or "{}"))
+        _finish(job_id, status=DONE, finished_at=datetime.utcnow(), last_error=None)
+        return True
+    except Exception as e:
+        db.session.rollback()
+        error = f"{type(e).__name__}: {e}"
+        now = datetime.utcnow()
+        if attempts >= max_attempts:
+            logger.exception("Job %s (%s) failed after %s attempts", job_id, name, attempts)
+            _finish(job_id, status=FAILED, finished_at=now, last_error=error)
+        else:
+            base = current_app.config.get("JOBS_RETRY_BASE_SECONDS", DEFAULT_RETRY_BASE_SECONDS)
+            logger.warning("Job %s (%s) failed (attempt %s of %s): %s", job_id, name, attempts, max_attempts, error)
+            _finish(job_id, status=QUEUED, run_at=now + timedelta(seconds=retry_delay(attempts, base)),
+                    last_error=error)
+        return False
+
+
+def requeue_stale(now=None):
+    """Devuelve a la cola los `running` abandonados (o los da por fallidos si no quedan intentos). Hace commit."""
+    now = now or datetime.utcnow()
+    timeout = current_app.config.get("JOBS_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)
+    stale = (Jobs.status == RUNNING, Jobs.locked_at < now - timedelta(seconds=timeout))
+    requeued = db.session.execute(
+        update(Jobs).where(*stale, Jobs.attempts < Jobs.max_attempts)
+        .values(status=QUEUED, run_at=now, locked_at=None, last_error="Worker lost while running")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    failed = db.session.execute(
+        update(Jobs).where(*stale)
+        .values(status=FAILED, finished_at=now, locked_at=None, last_error="Worker lost while running")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return requeued, failed
+
+
+def purge_finished(now=None):
+    """Borra los trabajos `done` de hace más de JOBS_KEEP_DAYS días. Hace commit."""
+    now = now or datetime.utcnow()
+    keep_days = current_app.config.get("JOBS_KEEP_DAYS", DEFAULT_KEEP_DAYS)
+    deleted = db.session.execute(
+        delete(Jobs).where(Jobs.status == DONE, Jobs.finished_at < now - timedelta(days=keep_days))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+class JobRunner:
+    """Hilo que reclama trabajos vencidos y los ejecuta en un pool de hilos."""
+
+    def __init__(self, app, workers=None, poll_seconds=None):
+        self.app = app
+        self.workers = workers or app.config.get("JOBS_WORKERS", DEFAULT_WORKERS)
+        self.poll_seconds = poll_seconds or app.config.get("JOBS_POLL_SECONDS", DEFAULT_POLL_SECONDS)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+        self._lock = threading.Lock()
+        self._running = 0
+        self._stopping = threading.Event()
+        self._thread = None
+        self._last_maintenance = 0.0
+
+    def _run(self, row):
+        with self.app.app_context():
+            try:
+                execute(row)
+            except Exception:
+                logger.exception("Error guardando el resultado del trabajo %s", row[0])
+            finally:
+                db.session.remove()
+        with self._lock:
+            self._running -= 1
+        # Hay un hueco libre: reclamar el siguiente sin esperar al sondeo
+        _wakeup.set()
+
+    def _maintenance(self):
+        now = datetime.utcnow()
+        if now.timestamp() - self._last_maintenance < MAINTENANCE_SECONDS:
+            return
+        self._last_maintenance = now.timestamp()
+        requeued, failed = requeue_stale(now)
+        if requeued or failed:
+            logger.warning("%s stale jobs requeued, %s marked as failed", requeued, failed)
+        purge_finished(now)
+
+    def dispatch(self):
+        """Reclama tantos trabajos como hilos libres y los lanza. Devuelve cuántos."""
+        with self._lock:
+            free = self.workers - self._running
+        if free <= 0:
+            return 0
+        with self.app.app_context():
+            try:
+                self._maintenance()
+                rows = claim(free)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Error reclamando trabajos")
+                return 0
+            finally:
+                db.session.remove()
+        with self._lock:
+            self._running += len(rows)
+        for row in rows:
+            self._pool.submit(self._run, row)
+        return len(rows)
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            self.dispatch()
+            _wakeup.wait(self.poll_seconds)
+            _wakeup.clear()
+        # Dejar terminar los que están en marcha; los no reclamados siguen en la tabla
+        self._pool.shutdown(wait=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=False):
+        self._stopping.set()
+        _wakeup.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def drain(self):
+        """Ejecuta todos los trabajos ya vencidos y vuelve (para cron y `--once`). Devuelve cuántos."""
+        total = 0
+        while True:
+            claimed = self.dispatch()
+            total += claimed
+            if not claimed:
+                with self._lock:
+                    if not self._running:
+                        break
+                _wakeup.wait(0.1)
+                _wakeup.clear()
+        self._pool.shutdown(wait=True)
+        return total
+
+
+def start_job_runner(app):
+    """Arranca el runner de este proceso en segundo plano (JOBS_WORKERS=0 = desactivado)."""
+    if not app.config.get("JOBS_WORKERS", DEFAULT_WORKERS):
+        return None
+    return JobRunner(app).start()
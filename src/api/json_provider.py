@@ -0,0 +1,80 @@
+"""
+Proveedor JSON de la app (jsonify, respuestas dict/list, request.get_json).
+
+Los `serialize()` de los modelos devuelven los valores tal cual (date,
+datetime, Decimal, Enum) y es este proveedor el que los convierte al
+codificar, en lugar de llamar a isoformat() y float() campo a campo en
+Python:
+
+- date / datetime -> ISO 8601 ("2025-11-05", "2025-11-05T10:30:00")
+- Decimal -> número
+- Enum -> su valor
+
+Si está instalado `orjson` las respuestas se codifican directamente a bytes
+con él, que trata fechas y enums de forma nativa. Sin orjson se usa el json
+de la biblioteca estándar con las mismas conversiones, así que la salida
+tiene la misma forma en los dos casos.
+"""
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from enum import Enum
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """Tipos que no son JSON nativo (para orjson, solo Decimal y los raros)."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def _orjson(self, obj, indent=False, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        # orjson no admite cls, ensure_ascii, etc.: esos casos van por json
+        if orjson is None or set(kwargs) - {"indent", "separators", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        return self._orjson(obj, kwargs.get("indent"), kwargs.get("sort_keys")).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None:
+            return super().response(obj)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._orjson(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def backend():
+    """Codificador en uso, para métricas y benchmarks."""
+    return "orjson" if orjson is not None else "json"
@@ -2,11 +2,24 @@ from datetime import datetime
 from enum import Enum
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
-from datetime import timedelta
+from sqlalchemy.orm import selectinload
 
 db = SQLAlchemy()
 
 
+class SerializeMixin:
+    """
+    Declara las relaciones que usa serialize() para que los listados las
+    carguen por adelantado (una consulta por relación, no una por fila):
+        Rooms.query.options(*Rooms.serialize_options()).all()
+    """
+    serialize_relations = ()
+
+    @classmethod
+    def serialize_options(cls):
+        return [selectinload(getattr(cls, name)) for name in cls.serialize_relations]
+
+
 class UserRole(Enum):
     GUEST = 'guest'
     ADMIN = 'admin'
@@ -62,10 +75,10 @@ class User(db.Model):
             "last_name": self.last_name,
             "email": self.email,
             "phone": self.phone,
-            "role": self.role.value if self.role else None,
+            "role": self.role,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "last_login": self.last_login.isoformat() if self.last_login else None,
+            "created_at": self.created_at,
+            "last_login": self.last_login,
         }
 
         data.update({
@@ -126,12 +139,13 @@ class RoomTypes(db.Model):
             "rooms_per_floor": self.rooms_per_floor,
             "image_url": self.image_url,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
 
 
-class Rooms(db.Model):
+class Rooms(SerializeMixin, db.Model):
     __tablename__ = "rooms"
+    serialize_relations = ("room_type",)
 
     id = db.Column(db.Integer, primary_key=True)
     room_number = db.Column(db.String(20), unique=True, nullable=False)
@@ -144,6 +158,10 @@ class Rooms(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
 
+    __table_args__ = (
+        db.Index("ix_rooms_status_available_type", "status", "is_available", "room_type_id"),
+    )
+
     # Relaciones
     availabilities = db.relationship('Availability', back_populates='room', lazy=True)
     bookings = db.relationship("Bookings", back_populates="room", lazy=True)
@@ -164,12 +182,13 @@ class Rooms(db.Model):
             "status": self.status,
             "is_available": self.is_available,
             "notes": self.notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
 
 
-class Availability(db.Model):
+class Availability(SerializeMixin, db.Model):
     __tablename__ = "availability"
+    serialize_relations = ("room", "room_type")
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -187,6 +206,12 @@ class Availability(db.Model):
     reason = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_availability_dates", "start_date", "end_date"),
+        db.Index("ix_availability_room_id", "room_id"),
+        db.Index("ix_availability_room_type_id", "room_type_id"),
+    )
+
     # 🔹 Relaciones ORM
     room = db.relationship("Rooms", backref=db.backref("availability_blocks", lazy=True))
     room_type = db.relationship("RoomTypes", backref=db.backref("availability_blocks", lazy=True))
@@ -194,8 +219,8 @@ class Availability(db.Model):
     def serialize(self):
         return {
             "id": self.id,
-            "start_date": self.start_date.isoformat(),
-            "end_date": self.end_date.isoformat(),
+            "start_date": self.start_date,
+            "end_date": self.end_date,
             "room_id": self.room_id,
             "room_number": self.room.room_number if self.room else None,
             "room_type_id": self.room_type_id,
@@ -203,12 +228,52 @@ class Availability(db.Model):
             "closed_manually": self.closed_manually,
             "maintenance_block": self.maintenance_block,
             "reason": self.reason,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
+        }
+
+
+class AvailabilityHistory(db.Model):
+    """Bloqueos ya vencidos (end_date pasado), archivados por `flask compact-availability`."""
+    __tablename__ = "availability_history"
+
+    id = db.Column(db.Integer, primary_key=True)
+    original_id = db.Column(db.Integer, nullable=False)
+
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    # Sin FK: el histórico se conserva aunque se borre la habitación o el tipo
+    room_id = db.Column(db.Integer, nullable=True)
+    room_type_id = db.Column(db.Integer, nullable=True)
+
+    closed_manually = db.Column(db.Boolean, default=False)
+    maintenance_block = db.Column(db.Boolean, default=False)
+    reason = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_availability_history_end_date", "end_date"),
+    )
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "original_id": self.original_id,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "room_id": self.room_id,
+            "room_type_id": self.room_type_id,
+            "closed_manually": self.closed_manually,
+            "maintenance_block": self.maintenance_block,
+            "reason": self.reason,
+            "created_at": self.created_at,
+            "archived_at": self.archived_at,
         }
 
 
-class Bookings(db.Model):
+class Bookings(SerializeMixin, db.Model):
     __tablename__ = 'bookings'
+    serialize_relations = ("user", "room", "room_type")
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -239,6 +304,13 @@ class Bookings(db.Model):
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
     notes = db.Column(db.Text)
 
+    # La restricción EXCLUDE que impide solapes por habitación solo existe en
+    # PostgreSQL y se crea en la migración 5b9f0c3d7a21
+    __table_args__ = (
+        db.Index("ix_bookings_user_id_id", "user_id", "id"),
+        db.Index("ix_bookings_type_stay_status", "room_type_id", "check_in", "check_out", "status"),
+    )
+
     # 🔹 Relaciones ORM
     user = db.relationship('User', back_populates='bookings')
     room = db.relationship('Rooms', back_populates='bookings')
@@ -253,19 +325,19 @@ class Bookings(db.Model):
             "room_number": self.room.room_number if self.room else None,
             "room_type_id": self.room_type_id,
             "room_type_name": self.room_type.name if self.room_type else None,
-            "check_in": self.check_in.isoformat(),
-            "check_out": self.check_out.isoformat(),
+            "check_in": self.check_in,
+            "check_out": self.check_out,
             "nights": self.nights,
             "status": self.status,
-            "price_per_night": float(self.price_per_night),
-            "total_price": float(self.total_price),
+            "price_per_night": self.price_per_night,
+            "total_price": self.total_price,
             "payment_status": self.payment_status,
             "payment_method": self.payment_method,
             "guest_name": self.guest_name,
             "guest_email": self.guest_email,
             "guest_phone": self.guest_phone,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
             "notes": self.notes
         }
 
@@ -276,7 +348,9 @@ class Payments(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     # 🔹 Relaciones clave
-    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False)
+    # Un pago de un bloqueo temporal (hold_id) no tiene reserva hasta que se cobra
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=True)
+    hold_id = db.Column(db.Integer, db.ForeignKey('inventory_holds.id'), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
     # 🔹 Datos del pago
@@ -300,47 +374,75 @@ class Payments(db.Model):
         return {
             "id": self.id,
             "booking_id": self.booking_id,
+            "hold_id": self.hold_id,
             "user_id": self.user_id,
-            "amount": float(self.amount),
+            "amount": self.amount,
             "currency": self.currency,
             "method": self.method,
             "status": self.status,
             "transaction_id": self.transaction_id,
-            "payment_date": self.payment_date.isoformat() if self.payment_date else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "payment_date": self.payment_date,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
             "notes": self.notes
         }
 
 
-def update_availability_for_booking(booking, make_available=False):
-    """Marca o libera disponibilidad según el estado de la reserva"""
-    current_date = booking.check_in
-    while current_date < booking.check_out:
-        availability = Availability.query.filter_by(
-            room_id=booking.room_id,
-            date=current_date
-        ).first()
-
-        if availability:
-            availability.is_available = make_available
-            availability.booked_by_booking_id = None if make_available else booking.id
-        else:
-            if not make_available:
-                new_availability = Availability(
-                    date=current_date,
-                    room_id=booking.room_id,
-                    room_type_id=booking.room_type_id,
-                    is_available=False,
-                    booked_by_booking_id=booking.id
-                )
-                db.session.add(new_availability)
-
-        current_date += timedelta(days=1)
-
-
-class PricingRules(db.Model):
+class InventoryHolds(db.Model):
+    """
+    Reserva temporal de inventario durante el pago (ver api/holds.py). Ocupa
+    noches en `room_inventory` hasta expires_at; al cobrarse el pago se
+    convierte en reserva y si no, la libera el barrido.
+    """
+    __tablename__ = "inventory_holds"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=True)
+
+    check_in = db.Column(db.Date, nullable=False)
+    check_out = db.Column(db.Date, nullable=False)
+    total_price = db.Column(db.Numeric(10, 2), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="active")  # active, converted, released, expired, conflict
+
+    # 🔹 Datos del huésped para crear la reserva al cobrar
+    guest_name = db.Column(db.String(150))
+    guest_email = db.Column(db.String(120))
+    guest_phone = db.Column(db.String(50))
+    notes = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    # El barrido busca status = 'active' AND expires_at <= ahora por este índice
+    __table_args__ = (
+        db.Index("ix_inventory_holds_status_expires_at", "status", "expires_at"),
+    )
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "room_type_id": self.room_type_id,
+            "booking_id": self.booking_id,
+            "check_in": self.check_in,
+            "check_out": self.check_out,
+            "nights": (self.check_out - self.check_in).days,
+            "total_price": self.total_price,
+            "status": self.status,
+            "guest_name": self.guest_name,
+            "guest_email": self.guest_email,
+            "guest_phone": self.guest_phone,
+            "notes": self.notes,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+        }
+
+
+class PricingRules(SerializeMixin, db.Model):
     __tablename__ = "pricing_rules"
+    serialize_relations = ("room_type",)
 
     id = db.Column(db.Integer, primary_key=True)
     room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), nullable=False)
@@ -366,6 +468,10 @@ class PricingRules(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_pricing_rules_type_active_start", "room_type_id", "is_active", "start_date"),
+    )
+
     # Relación inversa con RoomType
     room_type = db.relationship('RoomTypes', back_populates='pricing_rules')
 
@@ -378,9 +484,131 @@ class PricingRules(db.Model):
             "name": self.name,
             "price_modifier": self.price_modifier,
             "fixed_price": self.fixed_price,
-            "start_date": self.start_date.isoformat() if self.start_date else None,
-            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
             "color": self.color,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
+        }
+
+
+class RoomInventory(db.Model):
+    """Noches vendidas por tipo de habitación (libro de inventario)."""
+    __tablename__ = "room_inventory"
+
+    room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    sold = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.CheckConstraint("sold >= 0", name="ck_room_inventory_sold_positive"),
+    )
+
+    def serialize(self):
+        return {
+            "room_type_id": self.room_type_id,
+            "night": self.night,
+            "sold": self.sold,
+        }
+
+
+class DailyRollups(db.Model):
+    """Totales diarios por tipo de habitación para los informes (ver api/rollups.py)."""
+    __tablename__ = "daily_rollups"
+
+    room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    rooms_sold = db.Column(db.Integer, nullable=False, default=0)
+    rooms_blocked = db.Column(db.Integer, nullable=False, default=0)
+    closed = db.Column(db.Boolean, nullable=False, default=False)  # bloqueo del tipo completo
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    payments_received = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_daily_rollups_night", "night"),
+    )
+
+    def serialize(self):
+        return {
+            "room_type_id": self.room_type_id,
+            "night": self.night,
+            "rooms_sold": self.rooms_sold,
+            "rooms_blocked": self.rooms_blocked,
+            "closed": self.closed,
+            "revenue": self.revenue,
+            "payments_received": self.payments_received,
+        }
+
+
+class ChangeCounters(db.Model):
+    """Versión de cada tabla del catálogo; se incrementa en cada commit que la modifica."""
+    __tablename__ = "change_counters"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class IdempotencyKeys(db.Model):
+    """Respuesta guardada de cada petición con cabecera Idempotency-Key (ver api/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    endpoint = db.Column(db.String(120), nullable=False)
+    # Huella (sha256) del método, la ruta y el cuerpo de la petición original
+    request_hash = db.Column(db.String(64), nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default="processing")  # processing, completed
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+        db.Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+
+class Jobs(db.Model):
+    """Trabajo en segundo plano pendiente o ya ejecutado (ver api/jobs.py)."""
+    __tablename__ = "jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")  # argumentos en JSON
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.name} {self.status}>"
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_at": self.run_at,
+            "last_error": self.last_error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
         }
@@ -0,0 +1,366 @@
+"""
+Ocupación por habitación y noche en mapas de bits.
+
+Cada habitación tiene un entero de Python usado como mapa de bits: el bit i
+representa la noche `start + i`, desde hoy hasta `OCCUPANCY_HORIZON_DAYS`
+noches después (el horizonte de venta). Una estancia [check_in, check_out)
+es la máscara de bits contiguos ((1 << noches) - 1) << desplazamiento, así
+que:
+
+"¿está libre la habitación 12 del 3 al 7?" es un AND con la máscara,
+`occupied & mask == 0`, sin consultar reservas ni bloqueos.
+
+Una noche está ocupada si tiene una reserva activa asignada a la habitación
+o un bloqueo de la habitación o de su tipo. Las reservas sin habitación se
+guardan aparte, por tipo.
+
+Cada habitación guarda además sus intervalos por id de reserva y de bloqueo
+y los mapas se recalculan a partir de ellos: así una modificación o
+cancelación quita exactamente sus noches aunque otra reserva solape con
+ella. El almacén se carga al arrancar (`flask rebuild-occupancy` o wsgi.py),
+se mantiene con los cambios confirmados de Bookings, Availability y Rooms y
+se recarga entero si otro worker ha cambiado bloqueos o habitaciones
+(contadores de `change_counters`), si cambia el día o si supera
+`OCCUPANCY_MAX_AGE`.
+
+Las reservas no tienen contador: cada reserva lo movería y todas esperarían
+a la misma fila, y cada worker recargaría el almacén entero en cuanto otro
+reservase. Las de otros workers llegan con la recarga por antigüedad, así que
+el almacén es un filtro rápido: quien escribe lo confirma en la base de datos
+con la fila de la habitación bloqueada (`room_is_free_db`) y el reparto en
+bloque (`assignment.assign_window`) lo recarga antes de planificar. Las
+estancias que salen del horizonte se comprueban en la base de datos.
+"""
+import threading
+import time
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import select, exists, or_
+from api.events import on_commit
+from api.http_cache import versions_stmt, versions_from_rows
+from api.inventory import RELEASED_STATUSES
+from api.models import db, Rooms, Bookings, Availability
+
+DEFAULT_HORIZON_DAYS = 730
+DEFAULT_MAX_AGE = 300
+
+# Tablas cuyos contadores de `change_counters` invalidan el almacén
+TRACKED = ("availability", "rooms")
+
+
+def night_mask(lo, hi):
+    """Bits [lo, hi) a 1."""
+    return ((1 << (hi - lo)) - 1) << lo if hi > lo else 0
+
+
+def _union(intervals):
+    bits = 0
+    for lo, hi in intervals:
+        bits |= night_mask(lo, hi)
+    return bits
+
+
+def _sellable(room):
+    """Misma condición que la búsqueda: habitación activa y disponible."""
+    return room["status"] == "active" and bool(room["is_available"])
+
+
+class _Room:
+    __slots__ = ("room_type_id", "sellable", "stays", "blocks", "booked", "blocked")
+
+    def __init__(self, room_type_id, sellable):
+        self.room_type_id = room_type_id
+        self.sellable = sellable
+        self.stays = {}
+        self.blocks = {}
+        self.booked = 0
+        self.blocked = 0
+
+
+class OccupancyStore:
+    """Mapas de bits de noches ocupadas por habitación."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rooms = {}
+        self._type_blocks = {}
+        self._type_blocked = {}
+        self._unassigned = {}
+        self._owners = {}
+        self.start = None
+        self.days = 0
+        self._loaded_at = None
+        self._versions = None
+
+    # -------------------------------------------------
+    # Carga
+    # -------------------------------------------------
+    def load(self, versions=None, today=None, days=None):
+        """Lee habitaciones, reservas activas y bloqueos del horizonte (tres consultas)."""
+        start = today or date.today()
+        days = days or current_app.config.get("OCCUPANCY_HORIZON_DAYS", DEFAULT_HORIZON_DAYS)
+        end = start + timedelta(days=days)
+
+        rooms = db.session.execute(
+            select(Rooms.id, Rooms.room_type_id, Rooms.status, Rooms.is_available)
+        ).all()
+        bookings = db.session.execute(
+            select(Bookings.id, Bookings.room_id, Bookings.room_type_id, Bookings.status,
+                   Bookings.check_in, Bookings.check_out)
+            .where(Bookings.status.notin_(RELEASED_STATUSES), Bookings.check_in < end, Bookings.check_out > start)
+        ).all()
+        blocks = db.session.execute(
+            select(Availability.id, Availability.room_id, Availability.room_type_id,
+                   Availability.start_date, Availability.end_date)
+            .where(Availability.start_date < end, Availability.end_date > start)
+        ).all()
+
+        with self._lock:
+            self._rooms, self._type_blocks, self._type_blocked = {}, {}, {}
+            self._unassigned, self._owners = {}, {}
+            self.start, self.days = start, days
+            for room in rooms:
+                self._rooms[room.id] = _Room(room.room_type_id, _sellable(room._mapping))
+            for booking in bookings:
+                self._add_booking(booking._mapping)
+            for block in blocks:
+                self._add_block(block._mapping)
+
+            for room in self._rooms.values():
+                room.booked = _union(room.stays.values())
+                room.blocked = _union(room.blocks.values())
+            for room_type_id, intervals in self._type_blocks.items():
+                self._type_blocked[room_type_id] = _union(intervals.values())
+
+            self._loaded_at = time.monotonic()
+            self._versions = versions
+        return len(rooms), len(bookings), len(blocks)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def needs_reload(self, versions, max_age=DEFAULT_MAX_AGE):
+        """Si otro worker cambió las tablas, cambió el día o la copia es antigua."""
+        if self._loaded_at is None or versions != self._versions or self.start != date.today():
+            return True
+        return time.monotonic() - self._loaded_at > max_age
+
+    def sync(self, versions):
+        max_age = current_app.config.get("OCCUPANCY_MAX_AGE", DEFAULT_MAX_AGE)
+        if self.needs_reload(versions, max_age):
+            self.load(versions)
+
+    # -------------------------------------------------
+    # Mantenimiento (llamado con el lock tomado)
+    # -------------------------------------------------
+    def span(self, first, last):
+        """Fechas [first, last) a bits del horizonte, recortadas."""
+        lo = max((first - self.start).days, 0)
+        hi = min((last - self.start).days, self.days)
+        return (lo, hi) if lo < hi else None
+
+    def _add_booking(self, values):
+        span = self.span(values["check_in"], values["check_out"])
+        if span is None or values.get("status") in RELEASED_STATUSES:
+            return None
+        room = self._rooms.get(values["room_id"]) if values["room_id"] else None
+        if room is not None:
+            room.stays[values["id"]] = span
+            self._owners[("booking", values["id"])] = ("room", values["room_id"])
+            return ("room", values["room_id"])
+        self._unassigned.setdefault(values["room_type_id"], {})[values["id"]] = span
+        self._owners[("booking", values["id"])] = ("type", values["room_type_id"])
+        return ("type", values["room_type_id"])
+
+    def _add_block(self, values):
+        span = self.span(values["start_date"], values["end_date"])
+        if span is None:
+            return None
+        if values["room_id"]:
+            room = self._rooms.get(values["room_id"])
+            if room is None:
+                return None
+            room.blocks[values["id"]] = span
+            owner = ("room", values["room_id"])
+        elif values["room_type_id"]:
+            self._type_blocks.setdefault(values["room_type_id"], {})[values["id"]] = span
+            owner = ("type", values["room_type_id"])
+        else:
+            return None
+        self._owners[("block", values["id"])] = owner
+        return owner
+
+    def _discard(self, kind, record_id):
+        owner = self._owners.pop((kind, record_id), None)
+        if owner is None:
+            return None
+        target, target_id = owner
+        if target == "room":
+            room = self._rooms.get(target_id)
+            if room is not None:
+                (room.stays if kind == "booking" else room.blocks).pop(record_id, None)
+        elif kind == "booking":
+            self._unassigned.get(target_id, {}).pop(record_id, None)
+        else:
+            self._type_blocks.get(target_id, {}).pop(record_id, None)
+        return owner
+
+    def _refresh(self, owners):
+        for target, target_id in owners:
+            if target == "room":
+                room = self._rooms.get(target_id)
+                if room is not None:
+                    room.booked = _union(room.stays.values())
+                    room.blocked = _union(room.blocks.values())
+            elif target_id in self._type_blocks:
+                self._type_blocked[target_id] = _union(self._type_blocks[target_id].values())
+
+    def apply_bookings(self, changes):
+        if self.start is None:
+            return
+        with self._lock:
+            touched = set()
+            for change in changes:
+                touched.add(self._discard("booking", change.values["id"]))
+                if change.action != "delete":
+                    touched.add(self._add_booking(change.values))
+            self._refresh(touched - {None})
+
+    def apply_blocks(self, changes):
+        if self.start is None:
+            return
+        with self._lock:
+            touched = set()
+            for change in changes:
+                touched.add(self._discard("block", change.values["id"]))
+                if change.action != "delete":
+                    touched.add(self._add_block(change.values))
+            self._refresh(touched - {None})
+
+    def apply_rooms(self, changes):
+        if self.start is None:
+            return
+        with self._lock:
+            for change in changes:
+                values = change.values
+                if change.action == "delete":
+                    self._rooms.pop(values["id"], None)
+                    continue
+                room = self._rooms.get(values["id"])
+                if room is None:
+                    self._rooms[values["id"]] = _Room(values["room_type_id"], _sellable(values))
+                else:
+                    room.room_type_id = values["room_type_id"]
+                    room.sellable = _sellable(values)
+
+    # -------------------------------------------------
+    # Consultas
+    # -------------------------------------------------
+    def covers(self, check_in, check_out):
+        return (
+            self.start is not None
+            and check_in >= self.start
+            and (check_out - self.start).days <= self.days
+        )
+
+    def occupied(self, room_id, exclude_booking_id=None):
+        """Mapa de noches ocupadas de una habitación (None si no existe)."""
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                return None
+            booked = room.booked
+            if exclude_booking_id in room.stays:
+                booked = _union(span for booking_id, span in room.stays.items() if booking_id != exclude_booking_id)
+            return booked | room.blocked | self._type_blocked.get(room.room_type_id, 0)
+
+    def is_free(self, room_id, check_in, check_out, exclude_booking_id=None):
+        """
+        Si la habitación no tiene reservas ni bloqueos en [check_in, check_out).
+        `exclude_booking_id` ignora esa reserva (al mover sus propias fechas).
+        """
+        with self._lock:
+            occupied = self.occupied(room_id, exclude_booking_id)
+            if occupied is None:
+                return False
+            lo = (check_in - self.start).days
+            return occupied & night_mask(lo, (check_out - self.start).days) == 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "start": self.start.isoformat() if self.start else None,
+                "days": self.days,
+                "rooms": len(self._rooms),
+                "assigned_stays": sum(len(room.stays) for room in self._rooms.values()),
+                "unassigned_stays": sum(len(stays) for stays in self._unassigned.values()),
+                "blocks": sum(1 for kind, _ in self._owners if kind == "block"),
+                "booked_nights": sum(room.booked.bit_count() for room in self._rooms.values()),
+            }
+
+
+occupancy = OccupancyStore()
+
+
+def current_versions():
+    rows = db.session.execute(versions_stmt(TRACKED)).all()
+    return tuple(version for version, _ in versions_from_rows(TRACKED, rows).values())
+
+
+def refresh_occupancy():
+    """Sincroniza el almacén con los contadores actuales (fuera de una petición)."""
+    occupancy.sync(current_versions())
+
+
+def reload_occupancy():
+    """Recarga el almacén entero, también con las reservas de otros workers."""
+    occupancy.load(current_versions())
+
+
+def room_is_free_db(room_id, check_in, check_out, exclude_booking_id=None):
+    """La misma comprobación con una consulta de solape sobre reservas y bloqueos."""
+    room = db.session.get(Rooms, room_id)
+    if room is None:
+        return False
+    booked = select(Bookings.id).where(
+        Bookings.room_id == room_id,
+        Bookings.status.notin_(RELEASED_STATUSES),
+        Bookings.check_in < check_out,
+        Bookings.check_out > check_in,
+    )
+    if exclude_booking_id is not None:
+        booked = booked.where(Bookings.id != exclude_booking_id)
+    blocked = select(Availability.id).where(
+        or_(Availability.room_id == room_id,
+            Availability.room_id.is_(None) & (Availability.room_type_id == room.room_type_id)),
+        Availability.start_date < check_out,
+        Availability.end_date > check_in,
+    )
+    return not db.session.scalar(select(exists(booked) | exists(blocked)))
+
+
+def room_is_free(room_id, check_in, check_out, exclude_booking_id=None):
+    """
+    En el almacén si la estancia cae en el horizonte; si no, en la base de
+    datos. Un "ocupada" del almacén también se confirma en la base de datos:
+    puede que aún no tenga la cancelación hecha en otro worker.
+    """
+    if occupancy.covers(check_in, check_out) and occupancy.is_free(room_id, check_in, check_out, exclude_booking_id):
+        return True
+    return room_is_free_db(room_id, check_in, check_out, exclude_booking_id)
+
+
+@on_commit(Bookings)
+def _sync_bookings(changes):
+    occupancy.apply_bookings(changes)
+
+
+@on_commit(Availability)
+def _sync_blocks(changes):
+    occupancy.apply_blocks(changes)
+
+
+@on_commit(Rooms)
+def _sync_rooms(changes):
+    occupancy.apply_rooms(changes)
@@ -0,0 +1,199 @@
+"""
+Calendario de precios por noche para cada tipo de habitación.
+
+Para cada tipo se construye un array denso de precios (uno por noche) sobre
+un horizonte de `PRICING_HORIZON_DAYS` días a partir de hoy. Se parte de
+`base_price` y se pinta cada regla activa sobre su rango de fechas con una
+asignación por tramos (slice), sin recorrer noche a noche:
+
+- `fixed_price` sustituye al precio base.
+- si no, se aplica `base_price * price_modifier`.
+- si varias reglas se solapan gana la primera (menor id), igual que antes.
+
+Cotizar una estancia es entonces cortar el array y sumar.
+
+Cada worker guarda sus calendarios y los descarta todos cuando cambian los
+contadores de `room_types` o `pricing_rules` en `change_counters` (como el
+índice de bloqueos), así que un cambio de precio hecho en otro worker se
+cobra en la siguiente petición y no al caducar `PRICING_CALENDAR_MAX_AGE`.
+"""
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import date, timedelta
+from flask import current_app
+from sqlalchemy import select
+from api.events import on_commit
+from api.http_cache import resource_versions
+from api.models import db, RoomTypes, PricingRules
+
+DEFAULT_HORIZON_DAYS = 730
+DEFAULT_MAX_AGE = 300
+
+# Tablas cuyos contadores de `change_counters` invalidan los calendarios
+TRACKED = ("room_types", "pricing_rules")
+
+Quote = namedtuple("Quote", ["nightly", "total"])
+
+
+def build_prices(base_price, rules, start, days):
+    """Devuelve un array('d') con el precio de cada noche de [start, start + days)."""
+    base_price = float(base_price or 0)
+    prices = array("d", [round(base_price, 2)]) * days
+
+    # Se pintan en orden inverso para que la primera regla quede encima
+    for rule in reversed(rules):
+        lo = max((rule.start_date - start).days, 0)
+        hi = min((rule.end_date - start).days + 1, days)  # end_date inclusive
+        if lo >= hi:
+            continue
+
+        if rule.fixed_price is not None:
+            value = rule.fixed_price
+        else:
+            value = base_price * rule.price_modifier
+        prices[lo:hi] = array("d", [round(value, 2)]) * (hi - lo)
+
+    return prices
+
+
+class PriceCalendar:
+    def __init__(self, room_type_id, start, prices):
+        self.room_type_id = room_type_id
+        self.start = start
+        self.prices = prices
+        self.built_at = time.monotonic()
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=len(self.prices))
+
+    def covers(self, check_in, check_out):
+        return self.start <= check_in and check_out <= self.end
+
+    def quote(self, check_in, check_out):
+        lo = (check_in - self.start).days
+        hi = (check_out - self.start).days
+        nightly = self.prices[lo:hi]
+        return Quote(
+            [(check_in + timedelta(days=i), price) for i, price in enumerate(nightly)],
+            round(sum(nightly), 2),
+        )
+
+
+def active_rules_stmt(room_type_ids):
+    return (
+        select(PricingRules)
+        .where(PricingRules.room_type_id.in_(room_type_ids), PricingRules.is_active == True)
+        .order_by(PricingRules.id)
+    )
+
+
+def group_rules(room_type_ids, rules):
+    by_type = {room_type_id: [] for room_type_id in room_type_ids}
+    for rule in rules:
+        by_type[rule.room_type_id].append(rule)
+    return by_type
+
+
+def _active_rules(room_type_ids):
+    rules = db.session.execute(active_rules_stmt(room_type_ids)).scalars().all()
+    return group_rules(room_type_ids, rules)
+
+
+class PriceCalendarCache:
+    """Calendarios ya construidos, por tipo de habitación, para este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calendars = {}
+        self._versions = None
+
+    def sync(self, versions):
+        """Descarta los calendarios si tipos o reglas cambiaron desde que se construyeron."""
+        with self._lock:
+            if versions != self._versions:
+                self._calendars.clear()
+                self._versions = versions
+
+    def invalidate(self, room_type_id=None):
+        with self._lock:
+            if room_type_id is None:
+                self._calendars.clear()
+            else:
+                self._calendars.pop(room_type_id, None)
+
+    def lookup(self, room_types):
+        """Separa los calendarios vigentes de los que hay que (re)construir: (found, missing)."""
+        today = date.today()
+        # Cada worker tiene su copia: se reconstruye tras PRICING_CALENDAR_MAX_AGE segundos
+        max_age = current_app.config.get("PRICING_CALENDAR_MAX_AGE", DEFAULT_MAX_AGE)
+        oldest = time.monotonic() - max_age
+        with self._lock:
+            found = {}
+            for rt in room_types:
+                calendar = self._calendars.get(rt.id)
+                if calendar is not None and calendar.start == today and calendar.built_at > oldest:
+                    found[rt.id] = calendar
+        return found, [rt for rt in room_types if rt.id not in found]
+
+    def build(self, room_types, rules):
+        """Construye y guarda los calendarios a partir de las reglas agrupadas por tipo."""
+        today = date.today()
+        days = current_app.config.get("PRICING_HORIZON_DAYS", DEFAULT_HORIZON_DAYS)
+        built = {
+            rt.id: PriceCalendar(rt.id, today, build_prices(rt.base_price, rules[rt.id], today, days))
+            for rt in room_types
+        }
+        with self._lock:
+            self._calendars.update(built)
+        return built
+
+    def get_many(self, room_types):
+        """
+        Calendarios para una lista de RoomTypes. Los que falten se construyen
+        con una única consulta de reglas para todos ellos.
+        """
+        self.sync(current_versions())
+        found, missing = self.lookup(room_types)
+        if missing:
+            found.update(self.build(missing, _active_rules([rt.id for rt in missing])))
+        return found
+
+    def get(self, room_type):
+        return self.get_many([room_type])[room_type.id]
+
+
+price_calendars = PriceCalendarCache()
+
+
+def current_versions():
+    """Versiones de los contadores de TRACKED (una consulta por petición)."""
+    return tuple(version for version, _ in resource_versions(*TRACKED).values())
+
+
+def stay_calendar(room_type, check_in, check_out, rules):
+    """Calendario puntual para una estancia fuera del horizonte (fechas pasadas o muy lejanas)."""
+    prices = build_prices(room_type.base_price, rules, check_in, (check_out - check_in).days)
+    return PriceCalendar(room_type.id, check_in, prices)
+
+
+def quote_stay(room_type, check_in, check_out):
+    """Precio por noche y total de una estancia para un tipo de habitación."""
+    calendar = price_calendars.get(room_type)
+    if not calendar.covers(check_in, check_out):
+        rules = _active_rules([room_type.id])[room_type.id]
+        calendar = stay_calendar(room_type, check_in, check_out, rules)
+    return calendar.quote(check_in, check_out)
+
+
+@on_commit(RoomTypes, PricingRules)
+def _invalidate_price_calendars(changes):
+    for change in changes:
+        if change.model is RoomTypes:
+            price_calendars.invalidate(change.values["id"])
+        else:
+            price_calendars.invalidate(change.values["room_type_id"])
+            if "room_type_id" in change.previous:
+                price_calendars.invalidate(change.previous["room_type_id"])
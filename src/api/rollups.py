@@ -0,0 +1,382 @@
+"""
+Totales diarios por (tipo de habitación, noche) para los informes de
+ocupación e ingresos (`daily_rollups`).
+
+- Vendidas e ingresos: reservas no canceladas. El total de cada reserva se
+  reparte entre sus noches en céntimos (la última noche se queda el resto),
+  así la suma de las noches es siempre el total de la reserva.
+- Cobros: pagos `paid`, en el día de `payment_date` y en el tipo de su
+  reserva (o del hold, si todavía no la tiene).
+- Bloqueadas: habitaciones distintas del tipo con bloqueo propio esa noche;
+  `closed` si hay un bloqueo del tipo completo. Cuentan también los
+  bloqueos ya archivados (availability_history) para conservar el histórico.
+
+Se mantienen en la misma transacción que el cambio (before_commit). Las
+reservas y los pagos suman o restan su aportación con
+`UPDATE ... SET x = x + delta`, que conmuta: dos workers que tocan la misma
+noche no se pisan. Los bloqueos son un estado y se recalculan desde las
+tablas para las noches afectadas. `flask rebuild-rollups` lo reconstruye
+todo (tras aplicar la migración o si se sospecha de un desajuste).
+
+`report()` (GET /hotel/reports) solo lee esta tabla: ocupación, ADR
+(ingreso medio por habitación vendida) y RevPAR (ingreso por habitación
+disponible), con la capacidad actual de cada tipo menos lo bloqueado.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from sqlalchemy import bindparam, delete, event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from api.events import before_commit
+from api.inventory import RELEASED_STATUSES
+from api.models import (
+    db, RoomTypes, Rooms, Availability, AvailabilityHistory, Bookings, Payments, InventoryHolds, DailyRollups
+)
+
+CENT = Decimal("0.01")
+MAX_REPORT_DAYS = 731
+
+# Columnas que cambian la aportación de una fila a los totales
+TRACKED_FIELDS = {
+    Bookings: {"room_type_id", "check_in", "check_out", "status", "total_price"},
+    Payments: {"booking_id", "hold_id", "amount", "status", "payment_date"},
+    Availability: {"room_id", "room_type_id", "start_date", "end_date"},
+}
+
+_table = DailyRollups.__table__
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    return value
+
+
+# Sin esto, al cambiar un atributo ya expirado (p. ej. tras un commit) el
+# valor anterior no se carga y no llega en `Change.previous`: no se sabría
+# qué restar. Con active_history SQLAlchemy lo lee antes de sobrescribirlo.
+for _model, _fields in TRACKED_FIELDS.items():
+    for _field in _fields:
+        event.listen(getattr(_model, _field), "set", _keep_previous, active_history=True)
+
+
+def _nights(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days)]
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def stay_nights(check_in, check_out, total_price):
+    """(noche, ingreso) de una estancia; la última noche se queda los céntimos sobrantes."""
+    nights = _nights(check_in, check_out)
+    if not nights:
+        return []
+    total = Decimal(total_price or 0)
+    share = (total / len(nights)).quantize(CENT)
+    revenue = [share] * (len(nights) - 1) + [total - share * (len(nights) - 1)]
+    return list(zip(nights, revenue))
+
+
+def blocked_nights(session, start=None, end=None, room_type_ids=None):
+    """
+    Habitaciones bloqueadas por (tipo, noche) y conjunto de (tipo, noche)
+    con el tipo completo cerrado, en [start, end). Incluye los bloqueos archivados.
+    """
+    rooms, closed = defaultdict(set), set()
+    for model in (Availability, AvailabilityHistory):
+        stmt = (
+            select(model.room_id, model.room_type_id, Rooms.room_type_id, model.start_date, model.end_date)
+            .outerjoin(Rooms, Rooms.id == model.room_id)
+        )
+        if start is not None:
+            stmt = stmt.where(model.end_date > start)
+        if end is not None:
+            stmt = stmt.where(model.start_date < end)
+
+        for room_id, block_type_id, room_type_id, block_start, block_end in session.execute(stmt):
+            type_id = room_type_id if room_id else block_type_id
+            if type_id is None or (room_type_ids is not None and type_id not in room_type_ids):
+                continue
+            first = max(block_start, start) if start else block_start
+            last = min(block_end, end) if end else block_end
+            for night in _nights(first, last):
+                if room_id:
+                    rooms[(type_id, night)].add(room_id)
+                else:
+                    closed.add((type_id, night))
+    return {key: len(ids) for key, ids in rooms.items()}, closed
+
+
+# -------------------------------------------------
+# Mantenimiento incremental
+# -------------------------------------------------
+def _empty_row(room_type_id, night):
+    return {
+        "room_type_id": room_type_id, "night": night, "rooms_sold": 0, "rooms_blocked": 0,
+        "closed": False, "revenue": 0, "payments_received": 0,
+    }
+
+
+def _insert_ignore(session, rows):
+    """INSERT ... ON CONFLICT DO NOTHING para las noches que otro worker ya creó."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(_table).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(_table).on_conflict_do_nothing()
+    else:
+        stmt = insert(_table)
+    session.execute(stmt, rows)
+
+
+def _by_key():
+    return (_table.c.room_type_id == bindparam("key_room_type_id")) & (_table.c.night == bindparam("key_night"))
+
+
+def _payment_room_type(session, values):
+    if values.get("booking_id"):
+        return session.scalar(select(Bookings.room_type_id).where(Bookings.id == values["booking_id"]))
+    if values.get("hold_id"):
+        return session.scalar(select(InventoryHolds.room_type_id).where(InventoryHolds.id == values["hold_id"]))
+    return None
+
+
+def _add_booking(deltas, values, sign):
+    if values.get("status") in RELEASED_STATUSES or not values.get("check_in") or not values.get("check_out"):
+        return
+    for night, revenue in stay_nights(values["check_in"], values["check_out"], values.get("total_price")):
+        delta = deltas[(values["room_type_id"], night)]
+        delta[0] += sign
+        delta[1] += sign * revenue
+
+
+def _add_payment(session, deltas, values, sign, moved=None):
+    """`moved`: {booking_id: tipo anterior} de las reservas que cambian de tipo en esta transacción."""
+    if values.get("status") != "paid" or not values.get("payment_date"):
+        return
+    if moved and values.get("booking_id") in moved:
+        room_type_id = moved[values["booking_id"]]
+    else:
+        room_type_id = _payment_room_type(session, values)
+    if room_type_id is not None:
+        deltas[(room_type_id, _day(values["payment_date"]))][2] += sign * Decimal(values.get("amount") or 0)
+
+
+def _move_payments(session, deltas, booking_id, old_type_id, new_type_id, skip=()):
+    """
+    Los cobros de una reserva que cambia de tipo pasan al tipo nuevo. Los de
+    `skip` cambian en la misma transacción y ya los cuenta su propio cambio.
+    """
+    stmt = select(Payments.payment_date, Payments.amount).where(
+        Payments.booking_id == booking_id, Payments.status == "paid", Payments.payment_date.isnot(None))
+    if skip:
+        stmt = stmt.where(Payments.id.notin_(skip))
+    paid = session.execute(stmt)
+    for payment_date, amount in paid:
+        deltas[(old_type_id, _day(payment_date))][2] -= amount
+        deltas[(new_type_id, _day(payment_date))][2] += amount
+
+
+def _add_block_range(session, ranges, values):
+    start, end = values.get("start_date"), values.get("end_date")
+    if not start or not end or end <= start:
+        return
+    room_type_id = values.get("room_type_id")
+    if values.get("room_id"):
+        room_type_id = session.scalar(select(Rooms.room_type_id).where(Rooms.id == values["room_id"]))
+    if room_type_id is None:
+        return
+    first, last = ranges.get(room_type_id, (start, end))
+    ranges[room_type_id] = (min(first, start), max(last, end))
+
+
+def _apply_deltas(session, deltas):
+    rows = [(key, delta) for key, delta in deltas.items() if any(delta)]
+    if not rows:
+        return
+    _insert_ignore(session, [_empty_row(*key) for key, _ in rows])
+    session.execute(
+        update(_table).where(_by_key()).values(
+            rooms_sold=_table.c.rooms_sold + bindparam("sold"),
+            revenue=_table.c.revenue + bindparam("revenue"),
+            payments_received=_table.c.payments_received + bindparam("payments"),
+        ),
+        [
+            {"key_room_type_id": room_type_id, "key_night": night, "sold": sold, "revenue": revenue,
+             "payments": payments}
+            for (room_type_id, night), (sold, revenue, payments) in rows
+        ],
+    )
+
+
+def _refresh_blocks(session, room_type_id, start, end):
+    """Recalcula bloqueadas y cierre de un tipo en [start, end)."""
+    blocked, closed = blocked_nights(session, start, end, {room_type_id})
+    keys = set(blocked) | closed
+    if keys:
+        _insert_ignore(session, [_empty_row(*key) for key in sorted(keys)])
+    # También las noches que ya no tienen bloqueo, para dejarlas a cero
+    session.execute(
+        update(_table).where(_by_key()).values(
+            rooms_blocked=bindparam("blocked"), closed=bindparam("is_closed")),
+        [
+            {"key_room_type_id": room_type_id, "key_night": night,
+             "blocked": blocked.get((room_type_id, night), 0), "is_closed": (room_type_id, night) in closed}
+            for night in _nights(start, end)
+        ],
+    )
+
+
+@before_commit(Bookings, Payments, Availability)
+def _update_rollups(session, changes):
+    deltas = defaultdict(lambda: [0, Decimal(0), Decimal(0)])  # vendidas, ingresos, cobros
+    block_ranges = {}
+
+    # El estado anterior de un pago se resta del tipo que tenía su reserva antes de esta transacción
+    moved = {
+        change.values["id"]: change.previous["room_type_id"] for change in changes
+        if change.model is Bookings and change.action == "update" and "room_type_id" in change.previous
+    }
+    changed_payments = {change.values["id"] for change in changes if change.model is Payments}
+
+    for change in changes:
+        values, previous = change.values, change.previous
+        if change.action == "update" and TRACKED_FIELDS[change.model].isdisjoint(previous):
+            continue
+
+        states = []
+        if change.action == "update":
+            states.append(({**values, **previous}, -1))
+        elif change.action == "delete":
+            states.append((values, -1))
+        if change.action != "delete":
+            states.append((values, 1))
+
+        for state, sign in states:
+            if change.model is Bookings:
+                _add_booking(deltas, state, sign)
+            elif change.model is Payments:
+                _add_payment(session, deltas, state, sign, moved if sign < 0 else None)
+            else:
+                _add_block_range(session, block_ranges, state)
+
+        if change.model is Bookings and change.action == "update" and "room_type_id" in previous:
+            _move_payments(session, deltas, values["id"], previous["room_type_id"], values["room_type_id"],
+                           skip=changed_payments)
+
+    _apply_deltas(session, deltas)
+    for room_type_id, (start, end) in block_ranges.items():
+        _refresh_blocks(session, room_type_id, start, end)
+
+
+# -------------------------------------------------
+# Reconstrucción
+# -------------------------------------------------
+def rebuild(since=None):
+    """Reconstruye los totales (todos o desde `since`) a partir de reservas, pagos y bloqueos."""
+    totals = {}
+
+    def row(room_type_id, night):
+        key = (room_type_id, night)
+        if key not in totals:
+            totals[key] = _empty_row(room_type_id, night)
+        return totals[key]
+
+    stays = select(Bookings.room_type_id, Bookings.check_in, Bookings.check_out, Bookings.total_price).where(
+        Bookings.status.notin_(RELEASED_STATUSES))
+    if since is not None:
+        stays = stays.where(Bookings.check_out > since)
+    for room_type_id, check_in, check_out, total_price in db.session.execute(stays):
+        for night, revenue in stay_nights(check_in, check_out, total_price):
+            if since is None or night >= since:
+                cell = row(room_type_id, night)
+                cell["rooms_sold"] += 1
+                cell["revenue"] += revenue
+
+    paid = (
+        select(func.coalesce(Bookings.room_type_id, InventoryHolds.room_type_id), Payments.payment_date,
+               Payments.amount)
+        .outerjoin(Bookings, Bookings.id == Payments.booking_id)
+        .outerjoin(InventoryHolds, InventoryHolds.id == Payments.hold_id)
+        .where(Payments.status == "paid", Payments.payment_date.isnot(None))
+    )
+    if since is not None:
+        paid = paid.where(Payments.payment_date >= datetime.combine(since, time.min))
+    for room_type_id, payment_date, amount in db.session.execute(paid):
+        if room_type_id is not None:
+            row(room_type_id, _day(payment_date))["payments_received"] += amount
+
+    blocked, closed = blocked_nights(db.session, since)
+    for key, count in blocked.items():
+        row(*key)["rooms_blocked"] = count
+    for key in closed:
+        row(*key)["closed"] = True
+
+    purge = delete(DailyRollups)
+    if since is not None:
+        purge = purge.where(DailyRollups.night >= since)
+    db.session.execute(purge)
+    if totals:
+        db.session.execute(insert(_table), list(totals.values()))
+    db.session.commit()
+    return len(totals)
+
+
+# -------------------------------------------------
+# Informes
+# -------------------------------------------------
+def _metrics(available, sold, blocked, revenue, payments):
+    return {
+        "rooms_available": available,
+        "rooms_sold": sold,
+        "rooms_blocked": blocked,
+        "revenue": revenue,
+        "payments_received": payments,
+        "occupancy_pct": round(sold * 100 / available, 2) if available else None,
+        "adr": (revenue / sold).quantize(CENT) if sold else None,
+        "revpar": (revenue / available).quantize(CENT) if available else None,
+    }
+
+
+def report(first, last, room_type_id=None):
+    """
+    Totales de [first, last) por tipo de habitación, por noche y en conjunto.
+    Las noches sin fila cuentan con toda la capacidad libre y sin ingresos.
+    """
+    rows = select(DailyRollups).where(DailyRollups.night >= first, DailyRollups.night < last)
+    types = select(RoomTypes).order_by(RoomTypes.id)
+    if room_type_id is not None:
+        rows = rows.where(DailyRollups.room_type_id == room_type_id)
+        types = types.where(RoomTypes.id == room_type_id)
+
+    cells = {(r.room_type_id, r.night): r for r in db.session.scalars(rows)}
+    with_rows = {key[0] for key in cells}
+    room_types = [rt for rt in db.session.scalars(types) if rt.is_active or rt.id in with_rows]
+
+    zero = Decimal(0)
+    by_type = {rt.id: [0, 0, 0, zero, zero] for rt in room_types}
+    by_night = {night: [0, 0, 0, zero, zero] for night in _nights(first, last)}
+    for rt in room_types:
+        capacity = rt.total_rooms or 0
+        for night, acc in by_night.items():
+            cell = cells.get((rt.id, night))
+            if cell is None:
+                values = (capacity, 0, 0, zero, zero)
+            else:
+                blocked = capacity if cell.closed else min(cell.rooms_blocked, capacity)
+                values = (capacity - blocked, cell.rooms_sold, blocked, Decimal(cell.revenue),
+                          Decimal(cell.payments_received))
+            for target in (acc, by_type[rt.id]):
+                for i, value in enumerate(values):
+                    target[i] += value
+
+    totals = [sum(acc[i] for acc in by_type.values()) for i in range(5)]
+    return {
+        "from": first,
+        "to": last,
+        "totals": _metrics(*totals),
+        "room_types": [
+            {"room_type_id": rt.id, "name": rt.name, **_metrics(*by_type[rt.id])} for rt in room_types
+        ],
+        "nights": [{"night": night, **_metrics(*acc)} for night, acc in by_night.items()],
+    }
@@ -0,0 +1,128 @@
+"""
+Calendario de ocupación para recepción: estado de cada habitación en cada
+noche de un rango (60-90 días), en una sola respuesta.
+
+Se construye con tres lecturas: las habitaciones, las reservas activas que
+solapan con el rango y los bloqueos (del índice en memoria). Cada
+habitación se pinta como una fila de noches por tramos (slices) y se
+devuelve codificada por tramos (run-length), no celda a celda:
+
+    "spans": [[0, 10], [1, 3, 812], [0, 47]]
+
+= 10 noches libres, 3 noches con la reserva 812 y 47 libres. El primer
+valor es el índice en `STATES`, el segundo el número de noches y el
+tercero, si lo hay, el id de la reserva o del bloqueo.
+
+Si una noche tiene reserva y bloqueo a la vez manda la reserva (hay un
+huésped), y el mantenimiento manda sobre el cierre normal. Las reservas sin
+habitación asignada no caben en ninguna fila: se devuelven aparte, por tipo,
+como tramos [número de reservas, noches].
+"""
+from datetime import timedelta
+from sqlalchemy import select
+from api.availability_index import availability_index
+from api.inventory import RELEASED_STATUSES
+from api.models import db, Rooms, Bookings
+
+STATES = ("free", "booked", "blocked", "maintenance")
+FREE, BOOKED, BLOCKED, MAINTENANCE = range(len(STATES))
+
+DEFAULT_DAYS = 60
+MAX_DAYS = 120
+
+
+def _runs(values):
+    """Codificación por tramos: [a, a, b] -> [[a, 2], [b, 1]]"""
+    runs = []
+    for value in values:
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    return runs
+
+
+def _encode(cells):
+    """[(estado, ref), ...] -> [[estado, noches(, ref)], ...]"""
+    return [[state, length, ref] if ref is not None else [state, length] for (state, ref), length in _runs(cells)]
+
+
+def _paint(cells, start, end, first_night, value):
+    lo = max((start - first_night).days, 0)
+    hi = min((end - first_night).days, len(cells))
+    if lo < hi:
+        cells[lo:hi] = [value] * (hi - lo)
+
+
+def build_calendar(first_night, days, room_type_id=None, floor=None):
+    last_night = first_night + timedelta(days=days)
+
+    stmt = select(Rooms.id, Rooms.room_number, Rooms.room_type_id, Rooms.floor, Rooms.status).order_by(
+        Rooms.floor, Rooms.room_number)
+    if room_type_id is not None:
+        stmt = stmt.where(Rooms.room_type_id == room_type_id)
+    if floor is not None:
+        stmt = stmt.where(Rooms.floor == floor)
+    rooms = db.session.execute(stmt).all()
+    room_type_ids = {room.room_type_id for room in rooms}
+
+    bookings = db.session.execute(
+        select(Bookings.id, Bookings.room_id, Bookings.room_type_id, Bookings.check_in, Bookings.check_out)
+        .where(
+            Bookings.room_type_id.in_(room_type_ids),
+            Bookings.status.notin_(RELEASED_STATUSES),
+            Bookings.check_in < last_night,
+            Bookings.check_out > first_night,
+        )
+    ).all() if rooms else []
+
+    rows = {room.id: [(FREE, None)] * days for room in rooms}
+    rooms_by_type = {}
+    for room in rooms:
+        rooms_by_type.setdefault(room.room_type_id, []).append(room.id)
+
+    # Orden de pintado: lo último gana (cierre < mantenimiento < reserva)
+    blocks = availability_index.overlapping(first_night, last_night)
+    blocks.sort(key=lambda b: b.maintenance_block)
+    for block in blocks:
+        value = (MAINTENANCE if block.maintenance_block else BLOCKED, block.id)
+        if block.room_id:
+            targets = [block.room_id] if block.room_id in rows else []
+        else:
+            targets = rooms_by_type.get(block.room_type_id, [])
+        for room_id in targets:
+            _paint(rows[room_id], block.start_date, block.end_date, first_night, value)
+
+    unassigned = {}
+    for booking in bookings:
+        if booking.room_id in rows:
+            _paint(rows[booking.room_id], booking.check_in, booking.check_out, first_night, (BOOKED, booking.id))
+        elif booking.room_id is None:
+            counts = unassigned.setdefault(booking.room_type_id, [0] * days)
+            lo = max((booking.check_in - first_night).days, 0)
+            hi = min((booking.check_out - first_night).days, days)
+            for i in range(lo, hi):
+                counts[i] += 1
+
+    return {
+        "from": first_night.isoformat(),
+        "to": last_night.isoformat(),
+        "days": days,
+        "states": list(STATES),
+        "rooms": [
+            {
+                "id": room.id,
+                "room_number": room.room_number,
+                "room_type_id": room.room_type_id,
+                "floor": room.floor,
+                "status": room.status,
+                "spans": _encode(rows[room.id]),
+            }
+            for room in rooms
+        ],
+        "unassigned": {
+            str(type_id): _runs(counts)
+            for type_id, counts in unassigned.items()
+        },
+    }
+
@@ -1,22 +1,74 @@
-from flask import Blueprint, jsonify, request
-from api.models import db, RoomTypes, Rooms, Availability, Bookings
-from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from api.models import db, User, UserRole, RoomTypes, Rooms, Availability, Bookings, Payments, InventoryHolds
+from datetime import datetime, timedelta
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from api.models import db, Bookings, update_availability_for_booking
-from api.utils import apply_pricing_rules
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from api.utils import APIException, apply_pricing_rules, paginate_keyset, jsonify_page, parse_date_arg, parse_stay_args
+from api.availability_index import availability_index
+from api.occupancy import occupancy, room_is_free, room_is_free_db, TRACKED as OCCUPANCY_TABLES
+from api import inventory
+from api.inventory import InventoryError
+from api.blocks import BlockError, parse_ids, parse_ranges, create_blocks
+from api.pricing import price_calendars, quote_stay
+from api import exports
+from api import room_calendar
+from api import assignment
+from api import holds
+from api import jobs
+from api import rollups
+from api.cache import catalog_cache
+from api.http_cache import conditional, resource_versions
+from api.idempotency import idempotent
+from api.instrumentation import timed
+from api.catalog import (
+    room_types_stmt, rooms_stmt, available_rooms_stmt, quotable_types_stmt, search_result, quote_result
+)
 
 hotel_bp = Blueprint('hotel_bp', __name__)
 
 
+def sync_availability_index():
+    """Recarga el índice de bloqueos si otro worker los ha cambiado."""
+    version, _ = resource_versions("availability")["availability"]
+    availability_index.sync(version)
+
+
+def sync_occupancy():
+    """Recarga el almacén de ocupación si otro worker ha cambiado reservas, bloqueos o habitaciones."""
+    versions = resource_versions(*OCCUPANCY_TABLES)
+    occupancy.sync(tuple(version for version, _ in versions.values()))
+
+
+def lock_free_room(room_id, check_in, check_out, exclude_booking_id=None):
+    """
+    Bloquea la fila de la habitación y confirma en la base de datos, dentro de
+    la transacción, que sigue libre: el almacén de ocupación puede ir por
+    detrás y dos peticiones a la vez pueden pasar su comprobación.
+    """
+    db.session.execute(select(Rooms.id).where(Rooms.id == room_id).with_for_update())
+    return room_is_free_db(room_id, check_in, check_out, exclude_booking_id=exclude_booking_id)
+
+
 
 
 # Room types
 
 @hotel_bp.route('/room_types', methods=['GET'])
+@conditional("room_types")
+@catalog_cache.cached
 def get_room_types():
-    room_types = RoomTypes.query.all()
-    results = [room.serialize() for room in room_types]
-    return jsonify(results), 200
+    """
+    Lista paginada de tipos de habitación.
+    Filtros: ?is_active=true|false. Paginación (opcional): ?limit=&cursor=
+    """
+    try:
+        room_types, next_cursor = paginate_keyset(room_types_stmt(request.args), [RoomTypes.id], request.args)
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    with timed("serialize"):
+        results = [room.serialize() for room in room_types]
+    return jsonify_page(results, next_cursor), 200
 
 
 @hotel_bp.route('/room_types', methods=['POST'])
@@ -81,10 +133,20 @@ def delete_room_type(room_type_id):
 
 
 @hotel_bp.route('/rooms', methods=['GET'])
+@conditional("rooms", "room_types")
+@catalog_cache.cached
 def get_rooms():
-    rooms = Rooms.query.all()
-    results = [room.serialize() for room in rooms]
-    return jsonify(results), 200
+    """
+    Lista paginada de habitaciones.
+    Filtros: ?room_type_id=&status=&floor=. Paginación (opcional): ?limit=&cursor=
+    """
+    try:
+        rooms, next_cursor = paginate_keyset(rooms_stmt(request.args), [Rooms.id], request.args)
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    with timed("serialize"):
+        results = [room.serialize() for room in rooms]
+    return jsonify_page(results, next_cursor), 200
 
 
 @hotel_bp.route('/rooms', methods=['POST'])
@@ -151,14 +213,39 @@ def delete_room(room_id):
 # 🔹 RUTA 1: Listar todos los bloqueos creados
 # =====================================================
 @hotel_bp.route('/availability', methods=['GET'])
+@conditional("availability", "rooms", "room_types")
 def get_availability_blocks():
     """
-    Devuelve todos los bloqueos de disponibilidad (cierres, mantenimiento...).
+    Devuelve los bloqueos de disponibilidad (cierres, mantenimiento...),
+    del más reciente al más antiguo y paginados.
     Por defecto, si no hay registros, se considera todo disponible.
+    Filtros: ?from=&to= (solapan con el rango), ?room_id=, ?room_type_id=
+    Paginación (opcional): ?limit=&cursor=
     """
-    blocks = Availability.query.order_by(Availability.start_date.desc()).all()
-    results = [b.serialize() for b in blocks]
-    return jsonify(results), 200
+    query = Availability.query.options(*Availability.serialize_options())
+
+    try:
+        date_from = parse_date_arg(request.args, "from")
+        date_to = parse_date_arg(request.args, "to")
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    if date_from:
+        query = query.filter(Availability.end_date > date_from)
+    if date_to:
+        query = query.filter(Availability.start_date < date_to)
+    if request.args.get("room_id"):
+        query = query.filter(Availability.room_id == request.args.get("room_id", type=int))
+    if request.args.get("room_type_id"):
+        query = query.filter(Availability.room_type_id == request.args.get("room_type_id", type=int))
+
+    try:
+        blocks, next_cursor = paginate_keyset(
+            query, [Availability.start_date, Availability.id], request.args, descending=True)
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    with timed("serialize"):
+        results = [b.serialize() for b in blocks]
+    return jsonify_page(results, next_cursor), 200
 
 
 # =====================================================
@@ -196,6 +283,54 @@ def block_availability():
     return jsonify(block.serialize()), 201
 
 
+# =====================================================
+# 🔹 RUTA 2b: Crear bloqueos en bloque (muchas habitaciones y rangos)
+# =====================================================
+@hotel_bp.route('/availability/bulk', methods=['POST'])
+def bulk_block_availability():
+    """
+    Crea de una vez los bloqueos de varias habitaciones, plantas y/o tipos
+    para uno o varios rangos de fechas (end_date exclusivo). Los rangos que
+    se solapan o se tocan se fusionan y no se duplican los días que ya
+    estaban bloqueados.
+    Body: {"room_ids": [..], "floors": [..], "room_type_ids": [..],
+           "ranges": [{"start_date": "2025-11-01", "end_date": "2025-11-15"}],
+           "maintenance_block": true, "closed_manually": true, "reason": "..."}
+    """
+    data = request.get_json() or {}
+
+    try:
+        ranges = parse_ranges(data.get("ranges"))
+        rows, skipped = create_blocks(
+            ranges,
+            room_ids=parse_ids(data.get("room_ids"), "room_ids"),
+            room_type_ids=parse_ids(data.get("room_type_ids"), "room_type_ids"),
+            floors=parse_ids(data.get("floors"), "floors"),
+            closed_manually=data.get("closed_manually", True),
+            maintenance_block=data.get("maintenance_block", False),
+            reason=data.get("reason", "Cierre manual"),
+        )
+        db.session.commit()
+    except BlockError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status_code
+
+    return jsonify({
+        "created": len(rows),
+        "skipped_nights": skipped,
+        "blocks": [
+            {
+                "id": row["id"],
+                "room_id": row["room_id"],
+                "room_type_id": row["room_type_id"],
+                "start_date": row["start_date"].isoformat(),
+                "end_date": row["end_date"].isoformat(),
+            }
+            for row in rows
+        ],
+    }), 201
+
+
 # =====================================================
 # 🔹 RUTA 3: Editar un bloqueo existente
 # =====================================================
@@ -250,72 +385,154 @@ def delete_availability_block(block_id):
 # 🔹 RUTA 5: Consultar disponibilidad real (para el cliente)
 # =====================================================
 @hotel_bp.route('/availability/search', methods=['GET'])
+@conditional("availability", "rooms", "room_types")
+@catalog_cache.cached
 def get_available_rooms():
     """
     Devuelve habitaciones disponibles para un rango de fechas,
     excluyendo las bloqueadas o en mantenimiento.
     Ejemplo: /availability/search?checkin=2025-11-05&checkout=2025-11-08
     """
-    check_in = request.args.get("checkin")
-    check_out = request.args.get("checkout")
-
-    if not check_in or not check_out:
-        return jsonify({"error": "Missing required query params: checkin and checkout"}), 400
-
     try:
-        check_in = datetime.strptime(check_in, "%Y-%m-%d").date()
-        check_out = datetime.strptime(check_out, "%Y-%m-%d").date()
-    except ValueError:
-        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        check_in, check_out, _ = parse_stay_args(request.args)
+    except APIException as e:
+        return jsonify({"error": e.message}), 400
 
-    # 1️⃣ Bloqueos que solapan con el rango solicitado
-    blocked = Availability.query.filter(
-        Availability.start_date < check_out,
-        Availability.end_date > check_in
-    ).all()
-
-    blocked_room_ids = [b.room_id for b in blocked if b.room_id]
-    blocked_type_ids = [b.room_type_id for b in blocked if b.room_type_id]
+    # 1️⃣ Bloqueos que solapan con el rango solicitado (índice en memoria)
+    sync_availability_index()
+    blocked_room_ids, blocked_type_ids = availability_index.blocked_ids(check_in, check_out)
 
     # 2️⃣ Habitaciones activas y no bloqueadas
-    available_rooms = Rooms.query.filter(
-        Rooms.status == "active",
-        Rooms.is_available == True,
-        ~Rooms.id.in_(blocked_room_ids),
-        ~Rooms.room_type_id.in_(blocked_type_ids)
-    ).all()
+    available_rooms = db.session.scalars(available_rooms_stmt(blocked_room_ids, blocked_type_ids)).all()
 
     # 3️⃣ Serializar resultado
-    results = []
-    for room in available_rooms:
-        results.append({
-            **room.serialize(),
-            "room_type": room.room_type.serialize() if room.room_type else None
-        })
+    with timed("serialize"):
+        results = search_result(available_rooms)
+    return jsonify(results), 200
+
 
+# =====================================================
+# 🔹 RUTA 6: Cotización de todos los tipos para unas fechas
+# =====================================================
+@hotel_bp.route('/quote', methods=['GET'])
+def get_quote():
+    """
+    Devuelve, para cada tipo de habitación activo con capacidad suficiente,
+    cuántas habitaciones quedan libres y el precio por noche y total
+    calculados en el servidor con las reglas de precio.
+    Ejemplo: /quote?checkin=2025-11-05&checkout=2025-11-08&guests=2
+    """
+    try:
+        check_in, check_out, guests = parse_stay_args(request.args, with_guests=True)
+    except APIException as e:
+        return jsonify({"error": e.message}), 400
+
+    room_types = db.session.scalars(quotable_types_stmt(guests)).all()
+
+    sync_availability_index()
+    blocked_room_ids, blocked_type_ids = availability_index.blocked_ids(check_in, check_out)
+    free = inventory.free_counts(room_types, check_in, check_out, blocked_room_ids, blocked_type_ids)
+    calendars = price_calendars.get_many(room_types)
+
+    quotes = {}
+    for room_type in room_types:
+        calendar = calendars[room_type.id]
+        if calendar.covers(check_in, check_out):
+            quotes[room_type.id] = calendar.quote(check_in, check_out)
+        else:
+            quotes[room_type.id] = quote_stay(room_type, check_in, check_out)
+
+    with timed("serialize"):
+        results = quote_result(check_in, check_out, guests, room_types, free, quotes)
     return jsonify(results), 200
 
 
+# =====================================================
+# 🔹 RUTA 7: Calendario de ocupación (habitaciones × noches) para recepción
+# =====================================================
+@hotel_bp.route('/calendar', methods=['GET'])
+@jwt_required()
+def get_occupancy_calendar():
+    """
+    Estado de cada habitación en cada noche (libre, reservada, cerrada o en
+    mantenimiento) codificado por tramos. Ver api/room_calendar.py.
+    Ejemplo: /calendar?from=2025-11-01&days=90&floor=2
+    Filtros: ?room_type_id=, ?floor=
+    """
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or user.role not in (UserRole.ADMIN, UserRole.STAFF):
+        return jsonify({"error": "Only staff can see the occupancy calendar"}), 403
+
+    try:
+        first_night = parse_date_arg(request.args, "from") or datetime.utcnow().date()
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    days = request.args.get("days", room_calendar.DEFAULT_DAYS, type=int)
+    if not days or not 1 <= days <= room_calendar.MAX_DAYS:
+        return jsonify({"error": f"days must be between 1 and {room_calendar.MAX_DAYS}"}), 400
+
+    sync_availability_index()
+    calendar = room_calendar.build_calendar(
+        first_night, days,
+        room_type_id=request.args.get("room_type_id", type=int),
+        floor=request.args.get("floor", type=int),
+    )
+    return jsonify(calendar), 200
+
+
 # Bookings
 
 
 @hotel_bp.route('/bookings', methods=['GET'])
 @jwt_required()
 def get_user_bookings():
+    """
+    Reservas del usuario, de la más reciente a la más antigua y paginadas.
+    Filtros: ?status=, ?room_type_id=, ?from=&to= (estancias que solapan)
+    Paginación (opcional): ?limit=&cursor=
+    """
     user_id = int(get_jwt_identity())
 
-    bookings = Bookings.query.filter_by(user_id=user_id).order_by(
-        Bookings.created_at.desc()).all()
+    query = Bookings.query.options(*Bookings.serialize_options()).filter_by(user_id=user_id)
+
+    try:
+        date_from = parse_date_arg(request.args, "from")
+        date_to = parse_date_arg(request.args, "to")
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    if date_from:
+        query = query.filter(Bookings.check_out > date_from)
+    if date_to:
+        query = query.filter(Bookings.check_in < date_to)
+    if request.args.get("status"):
+        query = query.filter(Bookings.status == request.args["status"])
+    if request.args.get("room_type_id"):
+        query = query.filter(Bookings.room_type_id == request.args.get("room_type_id", type=int))
+
+    # El id crece con created_at, así que ordenar por id equivale y no tiene nulos
+    try:
+        bookings, next_cursor = paginate_keyset(query, [Bookings.id], request.args, descending=True)
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
 
-    if not bookings:
+    if not bookings and not request.args.get("cursor"):
         return jsonify({"message": "No bookings found for this user"}), 200
 
-    return jsonify([b.serialize() for b in bookings]), 200
+    with timed("serialize"):
+        results = [b.serialize() for b in bookings]
+    return jsonify_page(results, next_cursor), 200
 
 
 @hotel_bp.route('/bookings', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_booking():
+    """
+    Crea una reserva por tipo de habitación. Con la cabecera Idempotency-Key
+    los reintentos devuelven la respuesta original en lugar de otra reserva.
+    Lo que no hace falta para responder (asignar habitación) se encola como
+    trabajo en la misma transacción (api/jobs.py).
+    """
     user_id = int(get_jwt_identity())
     data = request.get_json()
 
@@ -327,16 +544,56 @@ def create_booking():
         return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
 
     try:
+        check_in = datetime.strptime(data.get("check_in"), "%Y-%m-%d").date()
+        check_out = datetime.strptime(data.get("check_out"), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+    if check_out <= check_in:
+        return jsonify({"error": "check_out must be after check_in"}), 400
+
+    room_type = RoomTypes.query.get(data.get("room_type_id"))
+    if not room_type:
+        return jsonify({"error": "Room type not found"}), 404
+
+    room_type_id = room_type.id
+    sync_availability_index()
+    _, blocked_type_ids = availability_index.blocked_ids(check_in, check_out)
+    if room_type_id in blocked_type_ids:
+        return jsonify({"error": "Room type is closed for the selected dates"}), 409
+
+    # 🔹 Si se pide una habitación concreta, debe ser del tipo y estar libre
+    room_id = data.get("room_id")
+    if room_id:
+        room = Rooms.query.get(room_id)
+        if not room or room.room_type_id != room_type_id:
+            return jsonify({"error": "Room not found for this room type"}), 404
+        room_id = room.id
+        sync_occupancy()
+        if not room_is_free(room_id, check_in, check_out):
+            return jsonify({"error": "Room is not free for the selected dates"}), 409
+
+    # 🔹 El precio lo calcula el servidor, no se acepta el del cliente
+    quote = quote_stay(room_type, check_in, check_out)
+    nights = len(quote.nightly)
+
+    try:
+        # 🔹 Reservar inventario de todas las noches en una sola sentencia
+        inventory.allocate(room_type_id, check_in, check_out)
+        if room_id and not lock_free_room(room_id, check_in, check_out):
+            db.session.rollback()
+            return jsonify({"error": "Room is not free for the selected dates"}), 409
+
         booking = Bookings(
             user_id=user_id,
-            room_id=data.get("room_id"),
-            room_type_id=data.get("room_type_id"),
-            check_in=datetime.strptime(data.get("check_in"), "%Y-%m-%d").date(),
-            check_out=datetime.strptime(data.get("check_out"), "%Y-%m-%d").date(),
-            nights=data.get("nights", 1),
+            room_id=room_id or None,
+            room_type_id=room_type_id,
+            check_in=check_in,
+            check_out=check_out,
+            nights=nights,
             status="pending",
-            price_per_night=data.get("price_per_night", 0),
-            total_price=data.get("total_price", 0),
+            price_per_night=round(quote.total / nights, 2),
+            total_price=quote.total,
             payment_status="unpaid",
             guest_name=data.get("guest_name").strip(),
             guest_email=data.get("guest_email").strip(),
@@ -345,13 +602,28 @@ def create_booking():
         )
 
         db.session.add(booking)
-        db.session.commit()
 
-        # 🔹 Actualizar disponibilidad (bloquear fechas)
-        update_availability_for_booking(booking)
+        # 🔹 La habitación de mejor ajuste (ROOM_AUTO_ASSIGN) se asigna en segundo plano
+        if not booking.room_id and current_app.config.get("ROOM_AUTO_ASSIGN"):
+            db.session.flush()
+            jobs.enqueue("assign_room", booking_id=booking.id)
+
+        # 🔹 Serializar antes del commit: después la reserva caduca y cada relación sería otra consulta
+        db.session.flush()
+        with timed("serialize"):
+            result = booking.serialize()
         db.session.commit()
 
-        return jsonify(booking.serialize()), 201
+        return jsonify(result), 201
+
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status_code
+
+    except IntegrityError:
+        # La restricción de solape de la base de datos ganó la carrera
+        db.session.rollback()
+        return jsonify({"error": "Room is not free for the selected dates"}), 409
 
     except Exception as e:
         db.session.rollback()
@@ -373,19 +645,58 @@ def update_booking(booking_id):
     data = request.get_json()
 
     try:
+        check_in, check_out = booking.check_in, booking.check_out
         if "check_in" in data:
-            booking.check_in = datetime.strptime(
-                data["check_in"], "%Y-%m-%d").date()
+            check_in = datetime.strptime(data["check_in"], "%Y-%m-%d").date()
         if "check_out" in data:
-            booking.check_out = datetime.strptime(
-                data["check_out"], "%Y-%m-%d").date()
-        if "status" in data:
-            booking.status = data["status"]
+            check_out = datetime.strptime(data["check_out"], "%Y-%m-%d").date()
+        status = data.get("status", booking.status)
+        if check_out <= check_in:
+            return jsonify({"error": "check_out must be after check_in"}), 400
+
+        # 🔹 Mover el inventario antes de tocar la reserva si cambian las fechas o se cancela
+        still_active = status not in inventory.RELEASED_STATUSES
+        dates_changed = (check_in, check_out) != (booking.check_in, booking.check_out)
+        if booking.room_id and dates_changed and still_active:
+            sync_occupancy()
+            if not room_is_free(booking.room_id, check_in, check_out, exclude_booking_id=booking.id):
+                return jsonify({"error": "Room is not free for the selected dates"}), 409
+
+        if dates_changed or not still_active:
+            inventory.release(booking.room_type_id, booking.check_in, booking.check_out)
+            if still_active:
+                inventory.allocate(booking.room_type_id, check_in, check_out)
+        if booking.room_id and dates_changed and still_active:
+            if not lock_free_room(booking.room_id, check_in, check_out, exclude_booking_id=booking.id):
+                db.session.rollback()
+                return jsonify({"error": "Room is not free for the selected dates"}), 409
+
+        booking.check_in = check_in
+        booking.check_out = check_out
+        booking.status = status
+        if dates_changed:
+            # 🔹 Nuevas fechas, nuevo precio: el mismo cálculo que al crearla
+            quote = quote_stay(booking.room_type, check_in, check_out)
+            booking.nights = len(quote.nightly)
+            booking.price_per_night = round(quote.total / booking.nights, 2)
+            booking.total_price = quote.total
         if "notes" in data:
             booking.notes = data["notes"]
 
+        db.session.flush()
+        with timed("serialize"):
+            result = booking.serialize()
         db.session.commit()
-        return jsonify(booking.serialize()), 200
+        return jsonify(result), 200
+
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status_code
+
+    except IntegrityError:
+        # La restricción de solape de la base de datos ganó la carrera
+        db.session.rollback()
+        return jsonify({"error": "Room is not free for the selected dates"}), 409
 
     except Exception as e:
         db.session.rollback()
@@ -406,7 +717,7 @@ def cancel_booking(booking_id):
 
     try:
         booking.status = "cancelled"
-        update_availability_for_booking(booking, make_available=True)
+        inventory.release(booking.room_type_id, booking.check_in, booking.check_out)
         db.session.commit()
         return jsonify({"message": "Booking cancelled and availability updated"}), 200
 
@@ -415,7 +726,260 @@ def cancel_booking(booking_id):
         return jsonify({"error": str(e)}), 500
 
 
+# =====================================================
+# 🔹 Asignación automática de habitaciones (recepción)
+# =====================================================
+@hotel_bp.route('/bookings/<int:booking_id>/assign', methods=['POST'])
+@jwt_required()
+def assign_booking_room(booking_id):
+    """
+    Asigna la habitación de mejor ajuste a una reserva sin habitación.
+    Body opcional: {"floor": 2} (planta preferida)
+    """
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or user.role not in (UserRole.ADMIN, UserRole.STAFF):
+        return jsonify({"error": "Only staff can assign rooms"}), 403
+
+    booking = Bookings.query.get(booking_id)
+    if not booking:
+        return jsonify({"error": "Booking not found"}), 404
+    if booking.room_id:
+        return jsonify({"error": "Booking already has a room"}), 400
+    if booking.status in inventory.RELEASED_STATUSES:
+        return jsonify({"error": "Booking is cancelled"}), 400
+
+    data = request.get_json(silent=True) or {}
+    try:
+        room_id = assignment.assign_booking(booking, floor=data.get("floor"))
+        if room_id is None:
+            db.session.rollback()
+            return jsonify({"error": "No free room of this type for the selected dates"}), 409
+        db.session.flush()
+        with timed("serialize"):
+            result = booking.serialize()
+        db.session.commit()
+        return jsonify(result), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@hotel_bp.route('/bookings/assign', methods=['POST'])
+@jwt_required()
+def assign_rooms():
+    """
+    Asigna habitación a todas las reservas sin habitación de un rango.
+    Body: {"from": "2025-11-01", "to": "2025-12-01", "room_type_id": 3, "floor": 2, "dry_run": false}
+    """
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or user.role not in (UserRole.ADMIN, UserRole.STAFF):
+        return jsonify({"error": "Only staff can assign rooms"}), 403
+
+    data = request.get_json() or {}
+    try:
+        first = datetime.strptime(data["from"], "%Y-%m-%d").date()
+        last = datetime.strptime(data["to"], "%Y-%m-%d").date()
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "from and to are required in YYYY-MM-DD format"}), 400
+    if last <= first:
+        return jsonify({"error": "to must be after from"}), 400
+
+    try:
+        result = assignment.assign_window(first, last, room_type_id=data.get("room_type_id"), floor=data.get("floor"))
+        if data.get("dry_run"):
+            db.session.rollback()
+        else:
+            db.session.commit()
+        return jsonify({
+            "assigned": [{"booking_id": booking_id, "room_id": room_id} for booking_id, room_id in result["assigned"]],
+            "unplaced": result["unplaced"],
+            "dry_run": bool(data.get("dry_run")),
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+# =====================================================
+# 🔹 Holds: inventario reservado mientras el huésped paga
+# =====================================================
+@hotel_bp.route('/holds', methods=['POST'])
+@jwt_required()
+def create_hold():
+    """
+    Reserva una habitación del tipo durante INVENTORY_HOLD_TTL segundos.
+    Body: mismos campos que POST /bookings. Al cobrarse su pago se convierte en reserva.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+
+    required_fields = ["guest_name", "guest_email", "guest_phone", "check_in", "check_out", "room_type_id"]
+    missing = [field for field in required_fields if not data.get(field)]
+    if missing:
+        return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
+
+    try:
+        check_in = datetime.strptime(data.get("check_in"), "%Y-%m-%d").date()
+        check_out = datetime.strptime(data.get("check_out"), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+    if check_out <= check_in:
+        return jsonify({"error": "check_out must be after check_in"}), 400
+
+    room_type = RoomTypes.query.get(data.get("room_type_id"))
+    if not room_type:
+        return jsonify({"error": "Room type not found"}), 404
+
+    sync_availability_index()
+    _, blocked_type_ids = availability_index.blocked_ids(check_in, check_out)
+    if room_type.id in blocked_type_ids:
+        return jsonify({"error": "Room type is closed for the selected dates"}), 409
+
+    try:
+        hold = holds.create_hold(
+            user_id, room_type, check_in, check_out,
+            guest_name=data.get("guest_name").strip(),
+            guest_email=data.get("guest_email").strip(),
+            guest_phone=data.get("guest_phone").strip(),
+            notes=data.get("notes"),
+        )
+        db.session.commit()
+        return jsonify(hold.serialize()), 201
+
+    except InventoryError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), e.status_code
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@hotel_bp.route('/holds/<int:hold_id>', methods=['GET'])
+@jwt_required()
+def get_hold(hold_id):
+    hold = InventoryHolds.query.filter_by(id=hold_id, user_id=int(get_jwt_identity())).first()
+    if not hold:
+        return jsonify({"error": "Hold not found"}), 404
+    return jsonify(hold.serialize()), 200
+
+
+@hotel_bp.route('/holds/<int:hold_id>', methods=['DELETE'])
+@jwt_required()
+def release_hold(hold_id):
+    hold = InventoryHolds.query.filter_by(id=hold_id, user_id=int(get_jwt_identity())).first()
+    if not hold:
+        return jsonify({"error": "Hold not found"}), 404
+
+    try:
+        if not holds.release_hold(hold):
+            db.session.rollback()
+            return jsonify({"error": f"Hold is already {hold.status}"}), 400
+        db.session.commit()
+        return jsonify({"message": "Hold released and availability updated"}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@hotel_bp.route('/holds/<int:hold_id>/payments', methods=['POST'])
+@jwt_required()
+def create_hold_payment(hold_id):
+    """
+    Crea el pago pendiente del hold. Cuando se marque como `paid` (pasarela o
+    admin) el hold se convierte en una reserva confirmada.
+    Body: {"method": "stripe", "transaction_id": "..."}
+    """
+    user_id = int(get_jwt_identity())
+    hold = InventoryHolds.query.filter_by(id=hold_id, user_id=user_id).first()
+    if not hold:
+        return jsonify({"error": "Hold not found"}), 404
+    if hold.status != holds.ACTIVE or hold.expires_at <= datetime.utcnow():
+        return jsonify({"error": "Hold has expired"}), 409
+
+    data = request.get_json(silent=True) or {}
+    payment = Payments(
+        hold_id=hold.id,
+        user_id=user_id,
+        amount=hold.total_price,
+        method=data.get("method"),
+        transaction_id=data.get("transaction_id"),
+        status="pending",
+    )
+    db.session.add(payment)
+    db.session.commit()
+    return jsonify(payment.serialize()), 201
+
+
 @hotel_bp.route('/pricing/apply/<int:room_type_id>', methods=['POST'])
 def update_prices(room_type_id):
     result = apply_pricing_rules(room_type_id)
     return jsonify(result), 200
+
+
+# =====================================================
+# 🔹 Exportaciones para contabilidad (streaming)
+# =====================================================
+@hotel_bp.route('/exports/<string:kind>', methods=['GET'])
+@jwt_required()
+def export_records(kind):
+    """
+    Exporta todas las reservas o pagos como NDJSON o CSV sin cargarlos en memoria.
+    Ejemplo: /exports/payments?format=csv&from=2025-10-01&to=2025-11-01&status=paid
+    """
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or user.role not in (UserRole.ADMIN, UserRole.STAFF):
+        return jsonify({"error": "Only staff can export data"}), 403
+
+    if kind not in exports.EXPORTS:
+        return jsonify({"error": f"Unknown export: {kind}"}), 404
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in exports.FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    try:
+        date_from = parse_date_arg(request.args, "from")
+        date_to = parse_date_arg(request.args, "to")
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+
+    rows = exports.iter_rows(kind, date_from=date_from, date_to=date_to, status=request.args.get("status"))
+
+    response = Response(stream_with_context(exports.stream(kind, fmt, rows)), mimetype=exports.FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+# =====================================================
+# 🔹 Informes de ocupación e ingresos (totales diarios precalculados)
+# =====================================================
+@hotel_bp.route('/reports', methods=['GET'])
+@jwt_required()
+def get_report():
+    """
+    Ocupación, ADR y RevPAR de un rango de noches, por tipo de habitación y
+    por noche, leídos de daily_rollups (ver api/rollups.py).
+    Ejemplo: /reports?from=2025-10-01&to=2025-11-01&room_type_id=2
+    `from` incluida y `to` excluida; por defecto, el mes en curso.
+    """
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or user.role not in (UserRole.ADMIN, UserRole.STAFF):
+        return jsonify({"error": "Only staff can see reports"}), 403
+
+    today = datetime.utcnow().date()
+    try:
+        first = parse_date_arg(request.args, "from") or today.replace(day=1)
+        last = parse_date_arg(request.args, "to") or (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    if last <= first:
+        return jsonify({"error": "'to' must be after 'from'"}), 400
+    if (last - first).days > rollups.MAX_REPORT_DAYS:
+        return jsonify({"error": f"The range cannot exceed {rollups.MAX_REPORT_DAYS} nights"}), 400
+
+    return jsonify(rollups.report(first, last, request.args.get("room_type_id", type=int))), 200
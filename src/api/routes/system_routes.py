@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from api.database import pool_metrics
+from api.models import User, UserRole
+
+system_bp = Blueprint('system_bp', __name__)
+
+
+@system_bp.route('/db-pool', methods=['GET'])
+@jwt_required()
+def get_db_pool():
+    """Métricas del pool de conexiones de este worker (solo personal)."""
+    user = User.query.get(int(get_jwt_identity()))
+    if not user or user.role not in (UserRole.ADMIN, UserRole.STAFF):
+        return jsonify({"error": "Only staff can view system metrics"}), 403
+
+    return jsonify(pool_metrics()), 200
@@ -1,6 +1,14 @@
-from flask import jsonify, url_for
-from api.models import RoomTypes, Availability, PricingRules
-from datetime import datetime
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from flask import jsonify, url_for, request
+from sqlalchemy import Select, literal, tuple_
+from api.models import db, RoomTypes
+from api.pricing import price_calendars
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
 
 class APIException(Exception):
     status_code = 400
@@ -17,6 +25,120 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def parse_date_arg(args, name):
+    """Lee un parámetro YYYY-MM-DD opcional de la query string."""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise APIException(f"Invalid date for '{name}'. Use YYYY-MM-DD")
+
+
+def _encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, columns):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = []
+        for column, value in zip(columns, raw, strict=True):
+            python_type = column.type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            values.append(literal(value, column.type))
+        return values
+    except (ValueError, TypeError, binascii.Error):
+        raise APIException("Invalid cursor")
+
+
+def keyset_page(query, columns, args, descending=False):
+    """
+    Aplica el cursor, el orden y el límite de una página a una Query o a un
+    select(). Devuelve (query, limit); se pide una fila de más para saber si
+    hay página siguiente.
+
+    Sin `limit` ni `cursor` la respuesta es la lista completa, como antes de
+    paginar (limit None): los clientes que no siguen el cursor no pierden filas.
+    """
+    cursor = args.get("cursor")
+    order = [column.desc() if descending else column.asc() for column in columns]
+    if "limit" not in args and not cursor:
+        return query.order_by(*order), None
+
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise APIException("limit must be an integer")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        key, bound = tuple_(*columns), tuple_(*_decode_cursor(cursor, columns))
+        query = query.filter(key < bound if descending else key > bound)
+
+    return query.order_by(*order).limit(limit + 1), limit
+
+
+def split_page(items, columns, limit):
+    """Recorta la fila de más y devuelve (items, next_cursor)."""
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return items, next_cursor
+
+
+def paginate_keyset(query, columns, args, descending=False):
+    """
+    Paginación por cursor (keyset) sobre las columnas dadas, que deben
+    identificar cada fila de forma única (p. ej. (start_date, id)).
+    Acepta una Query o un select() de un modelo.
+    Devuelve (items, next_cursor); next_cursor es None en la última página
+    (y siempre sin `limit` ni `cursor`: ver keyset_page).
+    """
+    query, limit = keyset_page(query, columns, args, descending)
+    items = db.session.scalars(query).all() if isinstance(query, Select) else query.all()
+    return split_page(items, columns, limit)
+
+
+def parse_stay_args(args, with_guests=False):
+    """
+    Lee checkin, checkout (y guests) de la query string.
+    Lanza APIException con el mensaje que devuelven las rutas de búsqueda.
+    """
+    check_in = args.get("checkin")
+    check_out = args.get("checkout")
+
+    if not check_in or not check_out:
+        raise APIException("Missing required query params: checkin and checkout")
+
+    try:
+        check_in = datetime.strptime(check_in, "%Y-%m-%d").date()
+        check_out = datetime.strptime(check_out, "%Y-%m-%d").date()
+        guests = int(args.get("guests", 1)) if with_guests else None
+    except ValueError:
+        if with_guests:
+            raise APIException("Invalid params. Use YYYY-MM-DD dates and an integer guests")
+        raise APIException("Invalid date format. Use YYYY-MM-DD")
+
+    if with_guests and check_out <= check_in:
+        raise APIException("checkout must be after checkin")
+    return check_in, check_out, guests
+
+
+def jsonify_page(results, next_cursor):
+    """Respuesta JSON de una página: el cursor siguiente va en cabeceras."""
+    response = jsonify(results)
+    if next_cursor:
+        args = {**request.view_args, **request.args.to_dict(), "cursor": next_cursor}
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
+
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
@@ -44,35 +166,11 @@ def generate_sitemap(app):
 
 
 def apply_pricing_rules(room_type_id):
-    """Aplica las reglas de precios activas a la disponibilidad de un tipo de habitación."""
+    """Reconstruye el calendario de precios de un tipo de habitación con sus reglas activas."""
     room_type = RoomTypes.query.get(room_type_id)
     if not room_type:
         return {"error": "Room type not found"}
 
-    base_price = float(room_type.base_price if hasattr(room_type, 'base_price') else room_type.price_per_night)
-
-    # Obtener reglas activas para este tipo de habitación
-    rules = PricingRules.query.filter_by(room_type_id=room_type_id, is_active=True).all()
-
-    # Recorrer todas las disponibilidades futuras
-    availabilities = Availability.query.filter(
-        Availability.room_type_id == room_type_id,
-        Availability.date >= datetime.utcnow().date()
-    ).all()
-
-    for avail in availabilities:
-        final_price = base_price
-
-        # Buscar si hay alguna regla que se aplique a esta fecha
-        for rule in rules:
-            if rule.start_date <= avail.date <= rule.end_date:
-                if rule.fixed_price:
-                    final_price = rule.fixed_price
-                else:
-                    final_price = base_price * rule.price_modifier
-                break  # aplica la primera regla válida
-
-        avail.daily_price = round(final_price, 2)
-
-    db.session.commit()
-    return {"message": f"Pricing rules applied to {len(availabilities)} availability records"}
+    price_calendars.invalidate(room_type_id)
+    calendar = price_calendars.get(room_type)
+    return {"message": f"Pricing rules applied to {len(calendar.prices)} nights from {calendar.start.isoformat()}"}
@@ -2,33 +2,73 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for, send_from_directory
+import re
+from flask import Flask, request, jsonify, url_for
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from flask_cors import CORS
 from api.utils import APIException, generate_sitemap
 from api.models import db
+from api.database import setup_database
 from api.routes import api
 from api.admin import setup_admin
 from api.commands import setup_commands
 from flask_jwt_extended import JWTManager
 from api.routes.hotel_routes import hotel_bp
+from api.cache import catalog_cache
+from api import compaction  # noqa: F401 (compactación de bloqueos al escribir)
+from api import instrumentation
+from api import compression
+from api.json_provider import FastJSONProvider
 
 # from models import Person
 
 ENV = "development" if os.getenv("FLASK_DEBUG") == "1" else "production"
 static_file_dir = os.path.join(os.path.dirname(
     os.path.realpath(__file__)), '../dist/')
+# Ficheros que Vite genera con hash en el nombre (assets/index-ceae11ce.js)
+HASHED_ASSET = re.compile(r"^assets/.+-[0-9A-Za-z_-]{8,}\.\w+$")
 app = Flask(__name__)
 app.url_map.strict_slashes = False
-CORS(app, origins="*", supports_credentials=True)
-
-# database condiguration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'local.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Fechas, Decimal y Enum se codifican en el proveedor JSON (orjson si está instalado)
+app.json = FastJSONProvider(app)
+CORS(app, origins="*", supports_credentials=True, expose_headers=["X-Next-Cursor", "Link"])
 
+# database condiguration (DATABASE_URL, pool y timeouts desde el entorno)
+setup_database(app)
 MIGRATE = Migrate(app, db, compare_type=True)
-db.init_app(app)
+catalog_cache.init_app(app)
+# Fusionar bloqueos de disponibilidad contiguos en cada escritura (api/compaction.py)
+app.config["AVAILABILITY_COMPACT_ON_WRITE"] = os.getenv("AVAILABILITY_COMPACT_ON_WRITE") == "1"
+# Noches por habitación que guarda el almacén de ocupación en memoria (api/occupancy.py)
+app.config["OCCUPANCY_HORIZON_DAYS"] = int(os.getenv("OCCUPANCY_HORIZON_DAYS", 730))
+# Asignar habitación al crear cada reserva (api/assignment.py)
+app.config["ROOM_AUTO_ASSIGN"] = os.getenv("ROOM_AUTO_ASSIGN") == "1"
+# Segundos que se guarda la respuesta de cada Idempotency-Key (api/idempotency.py)
+app.config["IDEMPOTENCY_TTL"] = int(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+# Duración de los holds de pago y cada cuánto se liberan los caducados (api/holds.py)
+app.config["INVENTORY_HOLD_TTL"] = int(os.getenv("INVENTORY_HOLD_TTL", 15 * 60))
+app.config["INVENTORY_HOLD_SWEEP_SECONDS"] = int(os.getenv("INVENTORY_HOLD_SWEEP_SECONDS", 60))
+# Cola de trabajos en segundo plano: hilos por worker, sondeo y reintentos (api/jobs.py)
+app.config["JOBS_WORKERS"] = int(os.getenv("JOBS_WORKERS", 2))
+app.config["JOBS_POLL_SECONDS"] = float(os.getenv("JOBS_POLL_SECONDS", 5))
+app.config["JOBS_MAX_ATTEMPTS"] = int(os.getenv("JOBS_MAX_ATTEMPTS", 5))
+app.config["JOBS_RETRY_BASE_SECONDS"] = int(os.getenv("JOBS_RETRY_BASE_SECONDS", 10))
+app.config["JOBS_LOCK_TIMEOUT"] = int(os.getenv("JOBS_LOCK_TIMEOUT", 600))
+app.config["JOBS_KEEP_DAYS"] = int(os.getenv("JOBS_KEEP_DAYS", 7))
+# Server-Timing, /metrics y muestreo con cProfile (api/instrumentation.py)
+app.config["SERVER_TIMING"] = os.getenv("SERVER_TIMING", "1") == "1"
+app.config["SQL_STATEMENTS_WARN"] = int(os.getenv("SQL_STATEMENTS_WARN", 0))
+app.config["PROFILE_SAMPLE_RATE"] = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+app.config["PROFILE_MIN_MS"] = float(os.getenv("PROFILE_MIN_MS", 0))
+app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR")
+# Sin token, /metrics no existe (404)
+app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+instrumentation.init_app(app)
+# Compresión gzip/brotli de las respuestas (api/compression.py)
+app.config["COMPRESS"] = os.getenv("COMPRESS", "1") == "1"
+app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+compression.init_app(app)
 
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "default-fallback-key")
 jwt = JWTManager(app)
@@ -57,15 +97,22 @@ def handle_invalid_usage(error):
 def sitemap():
     if ENV == "development":
         return generate_sitemap(app)
-    return send_from_directory(static_file_dir, 'index.html')
+    return compression.send_static(static_file_dir, 'index.html')
 
 # any other endpoint will try to serve it like a static file
 @app.route('/<path:path>', methods=['GET'])
 def serve_any_other_file(path):
     if not os.path.isfile(os.path.join(static_file_dir, path)):
         path = 'index.html'
-    response = send_from_directory(static_file_dir, path)
-    response.cache_control.max_age = 0  # avoid cache memory
+    # Versión .br/.gz generada en el build (flask precompress-static) si existe
+    response = compression.send_static(static_file_dir, path)
+    if HASHED_ASSET.match(path):
+        # El nombre cambia con el contenido: se puede cachear para siempre
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = 0  # avoid cache memory
     return response
 
 
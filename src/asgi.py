@@ -0,0 +1,10 @@
+# Alternativa a wsgi.py para servir la API con un servidor ASGI (uvicorn).
+# Las rutas de lectura de hotel_bp (tipos, habitaciones, búsqueda y
+# cotización) se atienden de forma asíncrona; el resto pasa a la app Flask.
+#
+#   uvicorn asgi:application --app-dir src --workers 2
+
+from app import app as flask_app
+from api.async_hotel import HotelASGI
+
+application = HotelASGI(flask_app)
@@ -2,6 +2,19 @@
 # Read more about it here: https://devcenter.heroku.com/articles/python-gunicorn
 
 from app import app as application
+from api.routes.hotel_routes import sync_availability_index, sync_occupancy
+from api.holds import start_sweeper
+from api.jobs import start_job_runner
+
+# Cargar el índice de bloqueos y la ocupación por habitación al arrancar cada worker
+with application.app_context():
+    sync_availability_index()
+    sync_occupancy()
+
+# Liberar en segundo plano los holds de pago caducados
+start_sweeper(application)
+# Ejecutar los trabajos encolados (asignación de habitación...) en hilos de este worker
+start_job_runner(application)
 
 if __name__ == "__main__":
     application.run()
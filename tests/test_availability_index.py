@@ -0,0 +1,66 @@
+import random
+from datetime import date, timedelta
+
+from api.availability_index import AvailabilityIndex, Block, _build_tree, _query_tree
+
+
+def _block(id, start, end, room_id=None, room_type_id=None):
+    return Block(id, start, end, room_id, room_type_id, True, False)
+
+
+def test_tree_returns_the_same_overlaps_as_a_linear_scan():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(300):
+        start = rng.randrange(0, 400)
+        intervals.append((start, start + rng.randrange(1, 30), i))
+    tree = _build_tree(intervals)
+
+    for _ in range(500):
+        start = rng.randrange(-10, 420)
+        end = start + rng.randrange(1, 40)
+        found = []
+        _query_tree(tree, start, end, found)
+        # Intervalos semiabiertos: solapan si s < end y e > start
+        expected = [i for s, e, i in intervals if s < end and e > start]
+        assert sorted(found) == sorted(expected)
+
+
+def test_tree_treats_touching_intervals_as_free():
+    tree = _build_tree([(10, 15, "a"), (20, 25, "b")])
+
+    found = []
+    _query_tree(tree, 15, 20, found)
+    assert found == []
+
+    found = []
+    _query_tree(tree, 14, 21, found)
+    assert sorted(found) == ["a", "b"]
+
+    found = []
+    _query_tree(None, 0, 100, found)
+    assert found == []
+
+
+def test_index_filters_by_room_and_type(app):
+    first = date(2030, 5, 1)
+    index = AvailabilityIndex()
+    index.replace([
+        _block(1, first, first + timedelta(days=5), room_id=3),
+        _block(2, first + timedelta(days=3), first + timedelta(days=10), room_type_id=2),
+        _block(3, first + timedelta(days=20), first + timedelta(days=22), room_id=4),
+        # Vacío o invertido: nunca bloquea nada
+        _block(4, first, first, room_id=5),
+    ])
+
+    stay = (first + timedelta(days=4), first + timedelta(days=6))
+    assert sorted(b.id for b in index.overlapping(*stay)) == [1, 2]
+    assert [b.id for b in index.overlapping(*stay, room_id=3)] == [1]
+    assert [b.id for b in index.overlapping(*stay, room_type_id=2)] == [2]
+    assert index.blocked_ids(*stay) == ({3}, {2})
+    assert index.blocked_ids(first + timedelta(days=10), first + timedelta(days=20)) == (set(), set())
+
+    # Los cambios confirmados se aplican sin recargar
+    index.remove(1)
+    index.upsert(_block(5, first + timedelta(days=5), first + timedelta(days=6), room_id=6))
+    assert index.blocked_ids(*stay) == ({6}, {2})
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+from api.compaction import compact
+from api.models import db, Availability, AvailabilityHistory, RoomTypes, Rooms
+
+TODAY = date(2030, 1, 15)
+
+
+def _day(offset):
+    return TODAY + timedelta(days=offset)
+
+
+def test_compact_merges_touching_blocks_and_archives_expired(app):
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=2)
+    db.session.add(room_type)
+    db.session.flush()
+    room = Rooms(room_number="101", room_type_id=room_type.id)
+    other_room = Rooms(room_number="102", room_type_id=room_type.id)
+    db.session.add_all([room, other_room])
+    db.session.flush()
+
+    def block(room_id, start, end, **flags):
+        return Availability(room_id=room_id, start_date=_day(start), end_date=_day(end),
+                            closed_manually=flags.get("closed", True),
+                            maintenance_block=flags.get("maintenance", False), reason=flags.get("reason"))
+
+    db.session.add_all([
+        # [1, 5) + [5, 8) + [3, 6) -> [1, 8)
+        block(room.id, 1, 5), block(room.id, 5, 8), block(room.id, 3, 6),
+        # Separado por una noche libre: no se fusiona
+        block(room.id, 9, 10),
+        # Otro motivo, otra marca u otra habitación: tampoco
+        block(room.id, 2, 4, reason="Pintura"),
+        block(room.id, 2, 4, maintenance=True),
+        block(other_room.id, 4, 6),
+        # Vencidos: se archivan (end_date <= hoy)
+        block(room.id, -10, -5), block(room.id, -5, 0),
+    ])
+    db.session.commit()
+
+    stats = compact(today=TODAY)
+    db.session.commit()
+    assert stats == {"archived": 2, "merged": 1, "deleted": 2}
+
+    remaining = sorted(
+        (b.room_id, b.start_date, b.end_date, b.maintenance_block, b.reason) for b in Availability.query.all())
+    assert remaining == sorted([
+        (room.id, _day(1), _day(8), False, None),
+        (room.id, _day(9), _day(10), False, None),
+        (room.id, _day(2), _day(4), False, "Pintura"),
+        (room.id, _day(2), _day(4), True, None),
+        (other_room.id, _day(4), _day(6), False, None),
+    ])
+    assert sorted((h.start_date, h.end_date) for h in AvailabilityHistory.query.all()) == [
+        (_day(-10), _day(-5)), (_day(-5), _day(0))]
+
+    # Repetirla no cambia nada
+    assert compact(today=TODAY) == {"archived": 0, "merged": 0, "deleted": 0}
+
+
+def test_compact_on_write_keeps_the_new_block(app):
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=1)
+    db.session.add(room_type)
+    db.session.flush()
+    old = Availability(room_type_id=room_type.id, start_date=_day(1), end_date=_day(4), closed_manually=True)
+    db.session.add(old)
+    db.session.commit()
+
+    app.config["AVAILABILITY_COMPACT_ON_WRITE"] = True
+    try:
+        new = Availability(room_type_id=room_type.id, start_date=_day(4), end_date=_day(6), closed_manually=True)
+        db.session.add(new)
+        db.session.commit()
+    finally:
+        app.config.pop("AVAILABILITY_COMPACT_ON_WRITE")
+
+    db.session.expire_all()
+    assert [(b.id, b.start_date, b.end_date) for b in Availability.query.all()] == [(new.id, _day(1), _day(6))]
@@ -0,0 +1,104 @@
+import json
+from datetime import date, datetime, timedelta
+
+from api import holds, inventory, jobs
+from api.models import db, Bookings, DailyRollups, InventoryHolds, Jobs, Payments, RoomTypes, User
+
+
+def _run_due_job():
+    rows = jobs.claim(1, now=datetime.utcnow() + timedelta(hours=2))
+    assert len(rows) == 1
+    return jobs.execute(rows[0])
+
+
+def test_paid_hold_without_inventory_is_kept_as_conflict(app):
+    room_type = RoomTypes(name="Suite", capacity=2, base_price=100, total_rooms=1)
+    user = User(first_name="Ana", email="ana@example.com", password_hash="x")
+    db.session.add_all([room_type, user])
+    db.session.commit()
+
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=2)
+    hold = holds.create_hold(user.id, room_type, check_in, check_out, guest_name="Ana")
+    db.session.commit()
+    payment = Payments(hold_id=hold.id, user_id=user.id, amount=hold.total_price, status="pending")
+    db.session.add(payment)
+    db.session.commit()
+
+    # El hold caduca y otra reserva se lleva la única suite
+    assert holds.sweep(now=datetime.utcnow() + timedelta(hours=1)) == 1
+    inventory.allocate(room_type.id, check_in, check_out)
+    other = Bookings(user_id=user.id, room_type_id=room_type.id, check_in=check_in, check_out=check_out,
+                     nights=2, status="confirmed", price_per_night=100, total_price=200)
+    db.session.add(other)
+    db.session.commit()
+
+    # El cobro llega tarde: se guarda aunque ya no haya hueco
+    payment.status = "paid"
+    db.session.commit()
+    db.session.expire_all()
+
+    assert db.session.get(Payments, payment.id).status == "paid"
+    assert db.session.get(Payments, payment.id).booking_id is None
+    assert db.session.get(InventoryHolds, hold.id).status == holds.CONFLICT
+    assert Bookings.query.count() == 1
+    job = Jobs.query.filter_by(name="resolve_hold_conflict").one()
+    assert json.loads(job.payload) == {"hold_id": hold.id, "payment_id": payment.id}
+    # La reserva deshecha en el savepoint no llega a los totales diarios
+    assert db.session.get(DailyRollups, (room_type.id, check_in)).rooms_sold == 1
+
+    # Sigue sin hueco: el trabajo falla y queda para reintentar
+    assert not _run_due_job()
+    db.session.expire_all()
+    assert db.session.get(Jobs, job.id).status == jobs.QUEUED
+    assert db.session.get(InventoryHolds, hold.id).status == holds.CONFLICT
+
+    # Se cancela la otra reserva: el reintento crea la reserva pagada
+    other = db.session.get(Bookings, other.id)
+    other.status = "cancelled"
+    inventory.release(room_type.id, check_in, check_out)
+    db.session.commit()
+
+    assert _run_due_job()
+    db.session.expire_all()
+    hold = db.session.get(InventoryHolds, hold.id)
+    assert hold.status == holds.CONVERTED
+    booking = db.session.get(Bookings, hold.booking_id)
+    assert (booking.status, booking.payment_status) == ("confirmed", "paid")
+    assert db.session.get(Payments, payment.id).booking_id == booking.id
+
+
+def test_every_payment_of_a_hold_is_linked_to_its_booking(app):
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=3)
+    user = User(first_name="Luis", email="luis@example.com", password_hash="x")
+    db.session.add_all([room_type, user])
+    db.session.commit()
+
+    check_in = date.today() + timedelta(days=10)
+    hold = holds.create_hold(user.id, room_type, check_in, check_in + timedelta(days=1))
+    db.session.commit()
+    payments = [Payments(hold_id=hold.id, user_id=user.id, amount=hold.total_price, status="pending")
+                for _ in range(3)]
+    db.session.add_all(payments)
+    db.session.commit()
+
+    # El primer cobro convierte el hold y enlaza también los pagos pendientes
+    payments[0].status = "paid"
+    db.session.commit()
+    db.session.expire_all()
+    hold = db.session.get(InventoryHolds, hold.id)
+    assert hold.status == holds.CONVERTED
+    assert {db.session.get(Payments, p.id).booking_id for p in payments} == {hold.booking_id}
+
+    # Un cobro duplicado posterior no crea otra reserva
+    payment = db.session.get(Payments, payments[1].id)
+    payment.status = "paid"
+    db.session.commit()
+    assert Bookings.query.count() == 1
+    assert db.session.get(Payments, payment.id).booking_id == hold.booking_id
+
+    # Un pago creado después de convertir (p. ej. desde el admin) también se enlaza al cobrarse
+    late = Payments(hold_id=hold.id, user_id=user.id, amount=hold.total_price, status="paid")
+    db.session.add(late)
+    db.session.commit()
+    assert db.session.get(Payments, late.id).booking_id == hold.booking_id
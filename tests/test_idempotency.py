@@ -0,0 +1,88 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from api.models import db, Bookings, IdempotencyKeys, RoomTypes, User
+
+URL = "/api/hotel/bookings"
+
+
+def _setup():
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=90, total_rooms=5)
+    user = User(first_name="Marta", email="marta@example.com", password_hash="x")
+    db.session.add_all([room_type, user])
+    db.session.commit()
+    check_in = date.today() + timedelta(days=20)
+    body = json.dumps({
+        "guest_name": "Marta", "guest_email": "marta@example.com", "guest_phone": "600000000",
+        "check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat(),
+        "room_type_id": room_type.id,
+    })
+    return user, body
+
+
+def _post(client, user, body, key):
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}", "Idempotency-Key": key}
+    return client.post(URL, data=body, content_type="application/json", headers=headers)
+
+
+def test_retry_replays_the_original_booking(app):
+    user, body = _setup()
+    client = app.test_client()
+
+    first = _post(client, user, body, "compra-1")
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    again = _post(client, user, body, "compra-1")
+    assert again.status_code == 201
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
+    assert Bookings.query.count() == 1
+
+    # Otra clave es otra compra
+    assert _post(client, user, body, "compra-2").status_code == 201
+    assert Bookings.query.count() == 2
+
+
+def test_same_key_with_another_body_is_rejected(app):
+    user, body = _setup()
+    client = app.test_client()
+    assert _post(client, user, body, "compra-1").status_code == 201
+
+    other = json.dumps({**json.loads(body), "guest_name": "Otra"})
+    response = _post(client, user, other, "compra-1")
+    assert response.status_code == 422
+    assert Bookings.query.count() == 1
+
+
+def test_failed_request_frees_the_key(app):
+    user, body = _setup()
+    client = app.test_client()
+
+    invalid = json.dumps({**json.loads(body), "room_type_id": 999})
+    assert _post(client, user, invalid, "compra-1").status_code == 404
+    assert IdempotencyKeys.query.count() == 0
+    assert _post(client, user, body, "compra-1").status_code == 201
+
+
+def test_key_still_processing_returns_409(app):
+    user, body = _setup()
+    app.config["IDEMPOTENCY_WAIT_SECONDS"] = 0
+    fingerprint = hashlib.sha256(f"POST {URL}\n".encode() + body.encode()).hexdigest()
+    now = datetime.utcnow()
+    db.session.add(IdempotencyKeys(
+        user_id=user.id, key="compra-1", endpoint="hotel_bp.create_booking", request_hash=fingerprint,
+        status="processing", created_at=now, locked_at=now, expires_at=now + timedelta(hours=1),
+    ))
+    db.session.commit()
+
+    try:
+        response = _post(app.test_client(), user, body, "compra-1")
+    finally:
+        app.config.pop("IDEMPOTENCY_WAIT_SECONDS")
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert Bookings.query.count() == 0
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+
+from api import inventory
+from api.inventory import InventoryError
+from api.models import db, Availability, RoomInventory, RoomTypes, Rooms
+
+
+def _room_type(total_rooms, rooms=0):
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=total_rooms)
+    db.session.add(room_type)
+    db.session.flush()
+    db.session.add_all([Rooms(room_number=f"{100 + i}", room_type_id=room_type.id) for i in range(rooms)])
+    db.session.commit()
+    return room_type
+
+
+def _sold(room_type_id, check_in, check_out):
+    return dict(db.session.execute(
+        db.select(RoomInventory.night, RoomInventory.sold).where(
+            RoomInventory.room_type_id == room_type_id,
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+        )
+    ).all())
+
+
+def test_allocate_until_sold_out_and_release(app):
+    room_type = _room_type(total_rooms=2)
+    check_in = date(2030, 3, 10)
+    check_out = check_in + timedelta(days=3)
+
+    inventory.allocate(room_type.id, check_in, check_out)
+    inventory.allocate(room_type.id, check_in + timedelta(days=1), check_out, quantity=1)
+    assert _sold(room_type.id, check_in, check_out) == {
+        check_in: 1, check_in + timedelta(days=1): 2, check_in + timedelta(days=2): 2}
+
+    # Una sola noche llena basta para rechazar la estancia entera
+    with pytest.raises(InventoryError) as error:
+        inventory.allocate(room_type.id, check_in, check_out)
+    assert error.value.status_code == 409
+
+    inventory.release(room_type.id, check_in, check_out)
+    inventory.allocate(room_type.id, check_in, check_out)
+    assert set(_sold(room_type.id, check_in, check_out).values()) == {2}
+
+    # Liberar nunca deja noches por debajo de cero
+    inventory.release(room_type.id, check_in, check_out, quantity=5)
+    assert set(_sold(room_type.id, check_in, check_out).values()) == {2}
+
+
+def test_allocate_rejects_empty_stays(app):
+    room_type = _room_type(total_rooms=1)
+    with pytest.raises(InventoryError) as error:
+        inventory.allocate(room_type.id, date(2030, 3, 10), date(2030, 3, 10))
+    assert error.value.status_code == 400
+
+
+def test_blocked_rooms_reduce_capacity(app):
+    room_type = _room_type(total_rooms=2, rooms=2)
+    room = Rooms.query.filter_by(room_type_id=room_type.id).first()
+    check_in = date(2030, 4, 1)
+    db.session.add(Availability(room_id=room.id, start_date=check_in + timedelta(days=2),
+                                end_date=check_in + timedelta(days=4), maintenance_block=True))
+    db.session.commit()
+
+    # Con una habitación fuera de servicio en la estancia solo queda una
+    inventory.allocate(room_type.id, check_in, check_in + timedelta(days=3))
+    with pytest.raises(InventoryError):
+        inventory.allocate(room_type.id, check_in, check_in + timedelta(days=3))
+
+    # Antes del bloqueo siguen las dos
+    inventory.allocate(room_type.id, check_in, check_in + timedelta(days=1))
+
+
+def test_closed_room_type_is_sold_out(app):
+    room_type = _room_type(total_rooms=5)
+    check_in = date(2030, 6, 1)
+    db.session.add(Availability(room_type_id=room_type.id, start_date=check_in,
+                                end_date=check_in + timedelta(days=2), closed_manually=True))
+    db.session.commit()
+
+    with pytest.raises(InventoryError):
+        inventory.allocate(room_type.id, check_in + timedelta(days=1), check_in + timedelta(days=3))
+    # El cierre no alcanza a las noches siguientes (end_date no incluida)
+    inventory.allocate(room_type.id, check_in + timedelta(days=2), check_in + timedelta(days=3))
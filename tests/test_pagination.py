@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from api.models import db, Bookings, RoomTypes, User
+
+
+def _user_with_bookings(count):
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=10)
+    user = User(first_name="Eva", email="eva@example.com", password_hash="x")
+    db.session.add_all([room_type, user])
+    db.session.commit()
+
+    check_in = date(2030, 2, 1)
+    db.session.add_all([
+        Bookings(user_id=user.id, room_type_id=room_type.id, check_in=check_in + timedelta(days=i),
+                 check_out=check_in + timedelta(days=i + 1), nights=1, status="confirmed",
+                 price_per_night=80, total_price=80)
+        for i in range(count)
+    ])
+    db.session.commit()
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+
+
+def test_cursor_pages_cover_every_booking_once(app):
+    headers = _user_with_bookings(7)
+    client = app.test_client()
+
+    ids, pages, cursor = [], 0, None
+    while True:
+        query = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/hotel/bookings", query_string=query, headers=headers)
+        assert response.status_code == 200
+        ids.extend(booking["id"] for booking in response.get_json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            assert "Link" not in response.headers
+            break
+        assert 'rel="next"' in response.headers["Link"]
+
+    assert pages == 3
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 7
+
+    # Sin limit ni cursor, la lista completa y sin cabeceras de página
+    response = client.get("/api/hotel/bookings", headers=headers)
+    assert [booking["id"] for booking in response.get_json()] == ids
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_invalid_cursor_and_limit_are_rejected(app):
+    headers = _user_with_bookings(2)
+    client = app.test_client()
+
+    for cursor in ("not-a-cursor", "WyJhIiwgImIiXQ", "e30"):
+        response = client.get("/api/hotel/bookings", query_string={"cursor": cursor}, headers=headers)
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Invalid cursor"}
+
+    response = client.get("/api/hotel/bookings", query_string={"limit": "ten"}, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "limit must be an integer"}
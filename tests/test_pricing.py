@@ -0,0 +1,75 @@
+import random
+from datetime import date, timedelta
+
+from api.models import db, PricingRules, RoomTypes
+from api.pricing import build_prices, quote_stay
+
+
+def _legacy_price(base_price, rules, night):
+    """El cálculo de la antigua apply_pricing_rules (api/utils.py) para una noche."""
+    final_price = base_price
+    for rule in rules:
+        if rule.start_date <= night <= rule.end_date:
+            if rule.fixed_price:
+                final_price = rule.fixed_price
+            else:
+                final_price = base_price * rule.price_modifier
+            break
+    return round(final_price, 2)
+
+
+def _random_rules(rng, room_type_id, start, count):
+    rules = []
+    for i in range(count):
+        first = start + timedelta(days=rng.randrange(-20, 120))
+        rules.append(PricingRules(
+            room_type_id=room_type_id,
+            name=f"Regla {i}",
+            price_modifier=rng.choice([0.8, 0.9, 1.15, 1.333, 2.0]),
+            fixed_price=rng.choice([None, None, 59.99, 120.0, 210.5]),
+            start_date=first,
+            end_date=first + timedelta(days=rng.randrange(0, 30)),
+            is_active=True,
+        ))
+    return rules
+
+
+def test_calendar_matches_the_rule_by_rule_calculation():
+    rng = random.Random(11)
+    start = date(2030, 1, 1)
+    for _ in range(20):
+        base_price = rng.choice([49.9, 75, 100.33])
+        rules = _random_rules(rng, 1, start, rng.randrange(0, 12))
+        prices = build_prices(base_price, rules, start, 100)
+        expected = [_legacy_price(base_price, rules, start + timedelta(days=i)) for i in range(100)]
+        assert list(prices) == expected
+
+
+def test_quote_stay_applies_active_rules_in_id_order(app):
+    room_type = RoomTypes(name="Suite", capacity=2, base_price=100, total_rooms=3)
+    db.session.add(room_type)
+    db.session.commit()
+
+    check_in = date.today() + timedelta(days=10)
+    rules = [
+        PricingRules(room_type_id=room_type.id, name="Puente", price_modifier=1.5,
+                     start_date=check_in + timedelta(days=1), end_date=check_in + timedelta(days=2)),
+        PricingRules(room_type_id=room_type.id, name="Oferta", price_modifier=1, fixed_price=80,
+                     start_date=check_in, end_date=check_in + timedelta(days=5)),
+        PricingRules(room_type_id=room_type.id, name="Inactiva", price_modifier=3,
+                     start_date=check_in, end_date=check_in + timedelta(days=5), is_active=False),
+    ]
+    db.session.add_all(rules)
+    db.session.commit()
+
+    quote = quote_stay(room_type, check_in, check_in + timedelta(days=4))
+    assert [price for _, price in quote.nightly] == [80, 150, 150, 80]
+    assert quote.total == 460
+
+    active = [rule for rule in rules if rule.is_active]
+    assert quote.nightly == [(night, _legacy_price(100, active, night)) for night, _ in quote.nightly]
+
+    # Un cambio confirmado se cobra en la siguiente cotización
+    rules[0].is_active = False
+    db.session.commit()
+    assert quote_stay(room_type, check_in, check_in + timedelta(days=4)).total == 320
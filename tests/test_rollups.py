@@ -0,0 +1,83 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from api import rollups
+from api.models import db, Availability, Bookings, DailyRollups, Payments, RoomTypes, Rooms, User
+
+FIRST = date(2030, 7, 1)
+
+
+def _day(offset):
+    return FIRST + timedelta(days=offset)
+
+
+def _snapshot():
+    # Las filas a cero equivalen a que no exista la fila
+    return {
+        (row.room_type_id, row.night): (row.rooms_sold, row.rooms_blocked, row.closed, row.revenue,
+                                        row.payments_received)
+        for row in DailyRollups.query.all()
+        if row.rooms_sold or row.rooms_blocked or row.closed or row.revenue or row.payments_received
+    }
+
+
+def test_incremental_rollups_match_a_full_rebuild(app):
+    double = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=3)
+    suite = RoomTypes(name="Suite", capacity=2, base_price=150, total_rooms=1)
+    user = User(first_name="Pablo", email="pablo@example.com", password_hash="x")
+    db.session.add_all([double, suite, user])
+    db.session.flush()
+    room = Rooms(room_number="101", room_type_id=double.id)
+    db.session.add(room)
+    db.session.commit()
+
+    def booking(room_type, start, nights, total):
+        return Bookings(user_id=user.id, room_type_id=room_type.id, check_in=_day(start),
+                        check_out=_day(start + nights), nights=nights, status="confirmed",
+                        price_per_night=round(total / nights, 2), total_price=total)
+
+    first, second, third = booking(double, 0, 3, 100), booking(double, 1, 2, 160), booking(suite, 2, 1, 150)
+    db.session.add_all([first, second, third])
+    db.session.commit()
+
+    paid = Payments(booking_id=first.id, user_id=user.id, amount=100, status="paid",
+                    payment_date=datetime(2030, 6, 20, 12))
+    pending = Payments(booking_id=second.id, user_id=user.id, amount=160, status="pending",
+                       payment_date=datetime(2030, 6, 21, 9))
+    deposit = Payments(booking_id=second.id, user_id=user.id, amount=50, status="paid",
+                       payment_date=datetime(2030, 6, 18, 10))
+    balance = Payments(booking_id=second.id, user_id=user.id, amount=30, status="paid",
+                       payment_date=datetime(2030, 6, 19, 10))
+    db.session.add_all([paid, pending, deposit, balance])
+    db.session.commit()
+
+    # Los céntimos que sobran van a la última noche
+    assert db.session.get(DailyRollups, (double.id, _day(0))).revenue == Decimal("33.33")
+    assert db.session.get(DailyRollups, (double.id, _day(2))).revenue == Decimal("33.34") + Decimal("80")
+
+    # Cambios de fechas, precio, tipo y estado, cobros y bloqueos. Los pagos de
+    # la reserva que cambia de tipo se mueven con ella, cambien o no a la vez
+    first.check_out = _day(4)
+    first.total_price = 120
+    second.room_type_id = suite.id
+    third.status = "cancelled"
+    pending.status = "paid"
+    deposit.amount = 60
+    room_block = Availability(room_id=room.id, start_date=_day(1), end_date=_day(3), maintenance_block=True)
+    closure = Availability(room_type_id=suite.id, start_date=_day(5), end_date=_day(7), closed_manually=True)
+    db.session.add_all([room_block, closure])
+    db.session.commit()
+
+    closure.end_date = _day(6)
+    db.session.delete(room_block)
+    db.session.delete(paid)
+    db.session.commit()
+
+    incremental = _snapshot()
+    assert incremental[(double.id, _day(3))][:1] == (1,)
+    assert incremental[(suite.id, _day(5))][2] is True
+    assert incremental[(double.id, _day(1))][1] == 0
+    assert {night for type_id, night in incremental if night < FIRST and type_id == double.id} == set()
+
+    rollups.rebuild()
+    assert _snapshot() == incremental
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from api.availability_index import availability_index
+from api.models import db, Availability, Bookings, RoomTypes, Rooms, User
+from api.room_calendar import BLOCKED, BOOKED, FREE, MAINTENANCE, _encode, _runs, build_calendar
+
+FIRST = date(2030, 9, 1)
+
+
+def _day(offset):
+    return FIRST + timedelta(days=offset)
+
+
+def test_runs_and_encoding():
+    assert _runs([]) == []
+    assert _runs([0, 0, 2, 2, 2, 0]) == [[0, 2], [2, 3], [0, 1]]
+    cells = [(FREE, None)] * 2 + [(BOOKED, 7)] * 3 + [(BOOKED, 8)] + [(FREE, None)]
+    assert _encode(cells) == [[FREE, 2], [BOOKED, 3, 7], [BOOKED, 1, 8], [FREE, 1]]
+
+
+def test_calendar_paints_bookings_over_blocks(app):
+    room_type = RoomTypes(name="Doble", capacity=2, base_price=80, total_rooms=3)
+    user = User(first_name="Sara", email="sara@example.com", password_hash="x")
+    db.session.add_all([room_type, user])
+    db.session.flush()
+    first_room = Rooms(room_number="101", room_type_id=room_type.id, floor=1)
+    second_room = Rooms(room_number="102", room_type_id=room_type.id, floor=1)
+    db.session.add_all([first_room, second_room])
+    db.session.flush()
+
+    def booking(room_id, start, end, status="confirmed"):
+        return Bookings(user_id=user.id, room_type_id=room_type.id, room_id=room_id, check_in=_day(start),
+                        check_out=_day(end), nights=end - start, status=status, price_per_night=80,
+                        total_price=80 * (end - start))
+
+    # Empieza antes del rango: se recorta a la primera noche
+    stay = booking(first_room.id, -2, 3)
+    cancelled = booking(first_room.id, 5, 7, status="cancelled")
+    unassigned = [booking(None, 1, 3), booking(None, 2, 4)]
+    closure = Availability(room_type_id=room_type.id, start_date=_day(2), end_date=_day(6), closed_manually=True)
+    repair = Availability(room_id=second_room.id, start_date=_day(4), end_date=_day(12), maintenance_block=True)
+    db.session.add_all([stay, cancelled, *unassigned, closure, repair])
+    db.session.commit()
+    availability_index.invalidate()
+
+    calendar = build_calendar(FIRST, 10, room_type_id=room_type.id)
+    assert (calendar["from"], calendar["to"], calendar["days"]) == (FIRST.isoformat(), _day(10).isoformat(), 10)
+
+    rooms = {room["id"]: room["spans"] for room in calendar["rooms"]}
+    # La reserva manda sobre el cierre y la cancelada no ocupa
+    assert rooms[first_room.id] == [[BOOKED, 3, stay.id], [BLOCKED, 3, closure.id], [FREE, 4]]
+    # El mantenimiento manda sobre el cierre y se recorta al final del rango
+    assert rooms[second_room.id] == [[FREE, 2], [BLOCKED, 2, closure.id], [MAINTENANCE, 6, repair.id]]
+    assert sum(span[1] for spans in rooms.values() for span in spans) == 10 * len(rooms)
+
+    assert calendar["unassigned"] == {str(room_type.id): [[0, 1], [1, 1], [2, 1], [1, 1], [0, 6]]}